@@ -1,6 +1,10 @@
 import sqlite3
+import time
 
 class BaseDBHandler:
+    # Optional hook called as query_observer(handler_name, query, seconds) after every query
+    query_observer = None
+
     def __init__(self, db_name):
         """Initializes the database connection."""
         self.db_name = db_name
@@ -20,6 +24,13 @@ class BaseDBHandler:
 
     def _execute(self, query, params=()):
         """Executes a SQL query."""
+        observer = BaseDBHandler.query_observer
+        if observer is None:
+            self.cursor.execute(query, params)
+            self.conn.commit()
+            return self.cursor
+        start = time.perf_counter()
         self.cursor.execute(query, params)
         self.conn.commit()
+        observer(type(self).__name__, query, time.perf_counter() - start)
         return self.cursor
@@ -0,0 +1,192 @@
+"""Microbenchmarks for the DB handlers and the server's filesystem helpers.
+
+Builds synthetic repository/grant/user databases and an ftp_root tree of
+increasing size in a temp directory, times each helper at every size, and
+estimates how its cost grows (the exponent k in time ~ size**k). A helper
+that grows faster than expected - e.g. a linear scan where an indexed lookup
+should be - is flagged, as are slowdowns against a saved baseline:
+
+    python Benchmarks.py --sizes 10000,100000,1000000 --max-files 100000 --json bench.json
+    python Benchmarks.py --baseline bench.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPOS_PER_USER = 100  # so per-user results stay the same size as the dataset grows
+GROWTH_SLACK = 0.4  # allowed excess over the expected exponent before flagging
+
+
+class Dataset:
+    """N repositories, N grants and N/REPOS_PER_USER users, plus (optionally) one
+    directory with one file per repository under ftp_root."""
+    def __init__(self, root, size, with_files):
+        from DBHandler import DBHandler
+        from UserHandler import UserHandler
+        self.size = size
+        self.users = max(10, size // REPOS_PER_USER)
+        self.root = os.path.join(root, str(size))
+        self.ftp_root = os.path.join(self.root, "ftp_root")
+        os.makedirs(self.ftp_root, exist_ok=True)
+        rng = random.Random(size)
+
+        self.file_db = DBHandler(os.path.join(self.root, "ReposDB.sqlite"))
+        self.file_db.conn.executemany("INSERT INTO files (id, fileName, ownerHash) VALUES (?, ?, ?)",
+                                      ((i + 1, f"repo{i}", f"user{i % self.users}") for i in range(size)))
+        self.file_db.conn.executemany("INSERT INTO file_access (fileId, accessUser) VALUES (?, ?)",
+                                      ((i + 1, f"user{rng.randrange(self.users)}") for i in range(size)))
+        self.file_db.conn.commit()
+
+        self.user_db = UserHandler(os.path.join(self.root, "UserDB.sqlite"))
+        self.user_db.conn.executemany("INSERT INTO users (username, hashed_password) VALUES (?, ?)",
+                                      ((f"user{i}", "0" * 64) for i in range(self.users)))
+        self.user_db.conn.commit()
+
+        self.with_files = with_files
+        if with_files:
+            for i in range(size):
+                repo_dir = os.path.join(self.ftp_root, f"repo{i}")
+                os.mkdir(repo_dir)
+                open(os.path.join(repo_dir, f"file{i}.txt"), "wb").close()
+
+    def user(self, i):
+        return f"user{i % self.users}"
+
+    def close(self):
+        self.file_db.close()
+        self.user_db.close()
+
+
+def benchmarks():
+    """(name, expected exponent, needs files, fn(dataset, i)) for every benchmark."""
+    import Server
+
+    def search_user_repos(ds, i):
+        repos = [repo[1] for repo in ds.file_db.get_user_files(ds.user(i), include_shared=False)]
+        return Server.search_by_name("file1", repos)
+
+    def have_access(ds, i):
+        repo = i % ds.size  # owned by ds.user(repo), so every call takes the granted path
+        if not Server.have_access(ds.user(repo), os.path.join(Server.BASE_DIR, f"repo{repo}"), ds.file_db):
+            raise AssertionError(f"have_access denied {ds.user(repo)} their own repo{repo}")
+
+    return [
+        ("DBHandler.get_user_files", 0, False, lambda ds, i: ds.file_db.get_user_files(ds.user(i))),
+        ("DBHandler.get_user_files(owned)", 0, False,
+         lambda ds, i: ds.file_db.get_user_files(ds.user(i), include_shared=False)),
+        ("DBHandler.has_access", 0, False, lambda ds, i: ds.file_db.has_access(ds.user(i), f"repo{i % ds.size}")),
+        ("DBHandler.get_all_files", 1, False, lambda ds, i: ds.file_db.get_all_files()),
+        ("UserHandler.get_user", 0, False, lambda ds, i: ds.user_db.get_user(ds.user(i))),
+        ("Server.have_access", 0, True, have_access),
+        ("Server.list_files", 0, True, lambda ds, i: Server.list_files(os.path.join(Server.BASE_DIR, f"repo{i % ds.size}"))),
+        ("Server.search_by_name(all)", 1, True, lambda ds, i: Server.search_by_name("file1")),
+        ("Server.search_by_name(user repos)", 0, True, search_user_repos),
+    ]
+
+
+def time_call(fn, ds, repeat):
+    """Median wall time of fn over repeat calls, each with a different user/path."""
+    fn(ds, 0)  # warm up caches and SQLite's statement cache
+    timings = []
+    for i in range(1, repeat + 1):
+        start = time.perf_counter()
+        fn(ds, i * 7919)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def growth_exponent(points):
+    """Least-squares slope of log(time) against log(size)."""
+    points = [(math.log(size), math.log(max(seconds, 1e-9))) for size, seconds in points]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark FileNet helpers on synthetic data.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="dataset sizes (repos, grants, files)")
+    parser.add_argument("--max-files", type=int, default=100000, help="skip filesystem benchmarks above this size")
+    parser.add_argument("--repeat", type=int, default=7, help="timed calls per benchmark and size")
+    parser.add_argument("--only", default=None, help="run benchmarks whose name contains this text")
+    parser.add_argument("--workdir", default=None, help="build datasets here and keep them")
+    parser.add_argument("--json", default=None, help="write the results here")
+    parser.add_argument("--baseline", default=None, help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="filenet-bench-")
+    previous_dir = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)  # Server creates its ftp_root on import
+    try:
+        import Server
+        from BaseDBHandler import BaseDBHandler
+        BaseDBHandler.query_observer = None  # time the queries, not the metrics hook
+        selected = [bench for bench in benchmarks() if not args.only or args.only in bench[0]]
+        results = {name: {} for name, _, _, _ in selected}
+        for size in sizes:
+            with_files = size <= args.max_files
+            start = time.perf_counter()
+            ds = Dataset(workdir, size, with_files)
+            print(f"size {size}: dataset built in {time.perf_counter() - start:.1f}s"
+                  + ("" if with_files else " (no files; above --max-files)"))
+            Server.BASE_DIR = os.path.relpath(ds.ftp_root)  # relative, like the server's own "ftp_root"
+            for name, _, needs_files, fn in selected:
+                if needs_files and not with_files:
+                    continue
+                results[name][size] = time_call(fn, ds, args.repeat)
+            ds.close()
+    finally:
+        os.chdir(previous_dir)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    flagged = []
+    print(f"\n{'benchmark':<34}" + "".join(f"{size:>12}" for size in sizes) + f"{'growth':>9}{'expect':>8}")
+    report = {}
+    for name, expected, _, _ in selected:
+        timings = results[name]
+        exponent = growth_exponent(sorted(timings.items()))
+        flag = exponent is not None and exponent > expected + GROWTH_SLACK
+        if flag:
+            flagged.append(f"{name} grows like n^{exponent:.2f}, expected n^{expected}")
+        cells = "".join(f"{timings[size] * 1000:>10.3f}ms" if size in timings else f"{'-':>12}" for size in sizes)
+        shown = f"{exponent:.2f}" if exponent is not None else "-"
+        print(f"{name:<34}{cells}{shown:>9}{expected:>8}{'  FLAG' if flag else ''}")
+        report[name] = {"expected": expected, "exponent": exponent,
+                        "seconds": {str(size): seconds for size, seconds in timings.items()}}
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for name, entry in report.items():
+            for size, seconds in entry["seconds"].items():
+                old = baseline.get(name, {}).get("seconds", {}).get(size)
+                if old and seconds > old * (1 + args.tolerance):
+                    flagged.append(f"{name} at {size}: {old * 1000:.3f}ms -> {seconds * 1000:.3f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if flagged:
+        print("\nFlagged:")
+        for line in flagged:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
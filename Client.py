@@ -1,9 +1,19 @@
 import os
+import json
+import time
+import queue
+import codecs
 import hashlib
+import functools
+import threading
+import contextlib
+import concurrent.futures
 import typing as t
 import customtkinter as ctk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, Menu
 import socket
+import select
+from collections import OrderedDict
 from typing import List, Optional
 
 # ---------- Color Theme ----------
@@ -18,15 +28,196 @@ G_ACCENT_2 = "#3fb950"  # success green
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# ---------- Client Cache ----------
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".filenet", "cache")
+LISTING_TTL = 5.0  # seconds a listing is trusted without asking the server again
+
+class ClientCache:
+    """Bounded in-memory + on-disk cache for listings and file contents.
+
+    Each entry keeps the validator the server reported for it (see STAT), so a
+    stale entry can be revalidated with one small request instead of a re-download.
+    """
+    INDEX_NAME = "index.json"
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = 64 * 1024 * 1024,
+                 max_memory_entries: int = 256, max_item_bytes: int = 4 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+        self.max_item_bytes = max_item_bytes
+        self.index: "OrderedDict[str, dict]" = OrderedDict()  # key -> meta, least recent first
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+        self._load_index()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(key.encode()).hexdigest())
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.root, self.INDEX_NAME), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, meta in entries:
+            if os.path.exists(self._blob_path(key)):
+                self.index[key] = meta
+                self.total_bytes += meta["size"]
+
+    def _save_index(self):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = os.path.join(self.root, self.INDEX_NAME + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self.index.items()), f)
+            os.replace(tmp, os.path.join(self.root, self.INDEX_NAME))
+        except OSError:
+            pass
+
+    def get(self, key: str, validator=None, max_age: Optional[float] = None) -> Optional[bytes]:
+        """Return cached bytes if the entry matches validator and is younger than max_age."""
+        with self.lock:
+            meta = self.index.get(key)
+            if meta is None:
+                return None
+            if validator is not None and meta["validator"] != list(validator):
+                return None
+            if max_age is not None and time.time() - meta["stored"] > max_age:
+                return None
+            self.index.move_to_end(key)
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                return data
+        try:
+            with open(self._blob_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self.invalidate(key)
+            return None
+        with self.lock:
+            self._remember(key, data)
+        return data
+
+    def meta(self, key: str) -> Optional[dict]:
+        with self.lock:
+            return self.index.get(key)
+
+    def touch(self, key: str):
+        """Mark an entry as freshly revalidated."""
+        with self.lock:
+            if key in self.index:
+                self.index[key]["stored"] = time.time()
+                self.index.move_to_end(key)
+
+    def put(self, key: str, data: bytes, validator=None, save_index: bool = True):
+        """Store data; batch writers pass save_index=False and call flush() once at the end."""
+        if len(data) > self.max_item_bytes:
+            self.invalidate(key)
+            return
+        with self.lock:
+            self._drop(key)
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                with open(self._blob_path(key), "wb") as f:
+                    f.write(data)
+            except OSError:
+                return
+            self.index[key] = {"validator": list(validator) if validator else None,
+                               "size": len(data), "stored": time.time()}
+            self.total_bytes += len(data)
+            self._remember(key, data)
+            while self.total_bytes > self.max_bytes and self.index:
+                self._drop(next(iter(self.index)))
+            if save_index:
+                self._save_index()
+
+    def flush(self):
+        with self.lock:
+            self._save_index()
+
+    def invalidate(self, key: str):
+        with self.lock:
+            if key in self.index:
+                self._drop(key)
+                self._save_index()
+
+    def _remember(self, key: str, data: bytes):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _drop(self, key: str):
+        meta = self.index.pop(key, None)
+        self.memory.pop(key, None)
+        if meta is None:
+            return
+        self.total_bytes -= meta["size"]
+        try:
+            os.remove(self._blob_path(key))
+        except OSError:
+            pass
+
 # ---------- Backend API (socket FTP-like) ----------
+CHUNK_SIZE = 64 * 1024
+SMALL_FILE_SIZE = 256 * 1024  # files up to this size are batched into GETMANY requests
+PREFETCH_BYTES = 4 * 1024 * 1024  # most one folder's prefetch may pull into the cache
+GETMANY_BATCH = 500  # paths per GETMANY (the server allows up to 1000)
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _synchronized(method, idempotent=True):
+    """Serialize a backend call so two threads never interleave on the socket.
+
+    If the connection turns out to be dead, reconnect (resuming the session)
+    and run the call once more. Calls that change server state (idempotent=False)
+    are only repeated if the dead connection never carried their command, since
+    it may already have run; otherwise the ConnectionError reaches the caller.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            if not idempotent:
+                self._ensure_alive()
+            lines_before = self.lines_sent
+            try:
+                return method(self, *args, **kwargs)
+            except ConnectionError:
+                sent = self.lines_sent != lines_before
+                self.reconnect()
+                if sent and not idempotent:
+                    raise
+                return method(self, *args, **kwargs)
+    return wrapper
+
+def _synchronized_once(method):
+    """_synchronized for commands that must not run twice, e.g. MKDIR or MOVE."""
+    return _synchronized(method, idempotent=False)
+
 class SocketBackend:
-    def __init__(self, host: str = "127.0.0.1", port: int = 2122, debug: bool = False):
+    def __init__(self, host: str = "127.0.0.1", port: int = 2122, debug: bool = False,
+                 cache: Optional[ClientCache] = None):
         self.host = host
         self.port = port
         self.password: str = ""
         self.name: str = ""
+        self.token: Optional[str] = None  # session token from LOGIN, used to RESUME
         self.sock: Optional[socket.socket] = None
+        self.lines_sent = 0  # command lines written, so a retry can tell whether one went out
         self.debug = debug
+        self.cache = cache if cache is not None else ClientCache()
+        self.lock = threading.RLock()
         self.connect()
 
     def debug_print(self, message):
@@ -46,8 +237,61 @@ class SocketBackend:
             banner = self.sock.recv(1024).decode(errors="ignore")
             self.debug_print(f"Received: {banner.strip()}")
         except Exception:
-            pass
+            return
+        if banner.startswith(("503", "429")):
+            # Turned away (server saturated or rate limit hit); the server closes the socket
+            raise ConnectionRefusedError(banner.strip())
+
+    def reconnect(self):
+        """Open a fresh connection and resume the session on it."""
+        with self.lock:
+            self.connect()
+            self._authenticate()
+
+    def _ensure_alive(self):
+        """Reconnect now if the server already closed this connection (e.g. after
+        IDLE_TIMEOUT), so a command that can't be retried isn't sent into it."""
+        try:
+            if select.select([self.sock], [], [], 0)[0] and not self.sock.recv(1, socket.MSG_PEEK):
+                self.reconnect()
+        except OSError:
+            self.reconnect()
+
+    def _authenticate(self) -> bool:
+        """Attach this connection to the session: RESUME with the token if we have
+        one (no password check on the server), else LOGIN with the stored hash."""
+        if self.token:
+            self._send(f"RESUME {self.token}")
+            reply = self._read_line()
+            if reply.startswith("200 RESUME SUCCESS"):
+                self.token = reply.split(" ")[3]
+                return True
+            self.token = None
+        if self.name and self.password:
+            self._send(f"LOGIN {self.name}_{self.password}")
+            reply = self._read_line()
+            if reply.startswith("200 LOGIN SUCCESS"):
+                self.token = self._parse_token(reply)
+                return True
+        return False
 
+    @staticmethod
+    def _parse_token(reply: str) -> Optional[str]:
+        parts = reply.split(" ")
+        return parts[3] if len(parts) > 3 else None
+
+    def clone(self) -> "SocketBackend":
+        """Open another session logged in as the same user, sharing this backend's cache."""
+        other = SocketBackend(self.host, self.port, self.debug, cache=self.cache)
+        other.name = self.name
+        other.password = self.password
+        other.token = self.token
+        if not other._authenticate():
+            other.quit()
+            raise ConnectionError("Could not open an extra session")
+        return other
+
+    @_synchronized
     def login(self, username: str, password: str) -> bool:
         """Login with username and password. Returns True if successful."""
         password = hashlib.sha256(f'{password}'.encode()).hexdigest()
@@ -56,10 +300,12 @@ class SocketBackend:
         if "200 LOGIN SUCCESS" in response:
             self.name = username
             self.password = password
+            self.token = self._parse_token(response)
             return True
         else:
             return False
 
+    @_synchronized_once
     def register(self, username: str, password: str) -> bool:
         """Register with username and password. Returns True if successful."""
         password = hashlib.sha256(f'{password}'.encode()).hexdigest()
@@ -76,6 +322,7 @@ class SocketBackend:
         """Logout and clear credentials."""
         self.name = None
         self.password = None
+        self.token = None
 
     def is_logged_in(self) -> bool:
         """Check if user is logged in."""
@@ -84,17 +331,22 @@ class SocketBackend:
     def _send(self, text: str):
         assert self.sock, "Not connected"
         self.debug_print(f"Sent: {text}")
+        self.lines_sent += 1
         self.sock.sendall(text.encode() + b"\n")
 
-    def _recv_all(self, timeout: float = 0.01) -> str:
-        self.sock.settimeout(timeout)
+    def _recv_all(self, timeout: float = 0.01, first_timeout: float = 5.0) -> str:
+        # Wait for the reply to start, then drain until the server goes quiet
+        self.sock.settimeout(first_timeout)
         data = b""
         try:
             while True:
                 chunk = self.sock.recv(4096)
                 if not chunk:
+                    if not data:
+                        raise ConnectionError("Connection closed by server")
                     break
                 data += chunk
+                self.sock.settimeout(timeout)
         except socket.timeout:
             pass
         finally:
@@ -103,8 +355,8 @@ class SocketBackend:
         self.debug_print(f"Received: {decoded_data}")
         return decoded_data
 
-    def _recv_all_bytes(self, timeout: float = 0.01) -> bytes:
-        self.sock.settimeout(timeout)
+    def _recv_all_bytes(self, timeout: float = 0.01, first_timeout: float = 5.0) -> bytes:
+        self.sock.settimeout(first_timeout)
         data = b""
         try:
             while True:
@@ -112,6 +364,7 @@ class SocketBackend:
                 if not chunk:
                     break
                 data += chunk
+                self.sock.settimeout(timeout)
         except socket.timeout:
             pass
         finally:
@@ -119,27 +372,134 @@ class SocketBackend:
         self.debug_print(f"Received {len(data)} bytes")
         return data
 
-    # --- high-level API for your UI ---
-    def list_repos(self) -> List[str]:
-        """First-level dirs inside ftp_root are 'repos'."""
-        self._send("LIST ")
-        raw = self._recv_all()
-        if raw.startswith("200 OK"):
-            return [line for line in raw.split("\n")[1:] if line]
-        return []
+    def _read_line(self) -> str:
+        """Read a single newline-terminated header line."""
+        line = b""
+        while not line.endswith(b"\n"):
+            chunk = self.sock.recv(1)
+            if not chunk:
+                if not line:
+                    raise ConnectionError("Connection closed by server")
+                break
+            line += chunk
+        decoded_line = line.decode(errors="ignore").strip()
+        self.debug_print(f"Received: {decoded_line}")
+        return decoded_line
+
+    def _recv_exact(self, size: int, progress: t.Optional[t.Callable[[int, int], None]] = None) -> bytes:
+        """Read exactly size bytes (fewer only if the connection closes)."""
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(min(CHUNK_SIZE, size - len(data)))
+            if not chunk:
+                break
+            data += chunk
+            self._report(progress, len(data), size)
+        self.debug_print(f"Received {len(data)} bytes")
+        return bytes(data)
 
-    def list_owned_repos(self) -> List[str]:
-        """Get repositories owned by the user."""
-        self._send("GETREPOS")
-        raw = self._recv_all()
-        if raw.startswith("200 OK"):
-            if len(raw.split("\n")) > 1:
-                return raw.split("\n")[1].split(",")
-        return []
+    def _report(self, progress: t.Optional[t.Callable[[int, int], None]], done: int, total: int):
+        """Call a progress hook. If it aborts the transfer, the stream is out of sync,
+        so reconnect before letting the exception through."""
+        if progress is None:
+            return
+        try:
+            progress(done, total)
+        except Exception:
+            self.reconnect()
+            raise
+
+    # --- cache helpers ---
+    def _cache_key(self, kind: str, path: str = "") -> str:
+        return f"{self.host}:{self.port}/{self.name}/{kind}/{path}"
+
+    def _cached_listing(self, key: str, fetch: t.Callable[[], Optional[list]],
+                        max_age: Optional[float]) -> list:
+        """Serve a listing from cache while it is younger than max_age, else fetch it.
+
+        If the server can't be reached the last known listing is returned instead.
+        """
+        cached = self.cache.get(key, max_age=max_age)
+        if cached is not None:
+            return json.loads(cached)
+        try:
+            result = fetch()
+        except OSError:
+            cached = self.cache.get(key)
+            return json.loads(cached) if cached is not None else []
+        if result is None:
+            return []
+        self.cache.put(key, json.dumps(result).encode())
+        return result
+
+    @_synchronized
+    def stat(self, full_path: str) -> Optional[tuple]:
+        """Return (kind, size, mtime_ns) for a server path, or None if unavailable."""
+        self._send(f"STAT {full_path}")
+        if not self._read_line().startswith("200 OK"):
+            return None
+        try:
+            kind, size, mtime_ns = self._read_line().split(" ")
+            return kind, int(size), int(mtime_ns)
+        except (IndexError, ValueError):
+            return None
+
+    def invalidate(self, repo: str, path: str = ""):
+        """Drop cached data for a path and the listing of its parent folder."""
+        full_path = os.path.join(repo, path).replace("\\", "/").strip("/")
+        self.cache.invalidate(self._cache_key("file", full_path))
+        self.cache.invalidate(self._cache_key("list", full_path))
+        self.cache.invalidate(self._cache_key("list", os.path.dirname(full_path)))
 
-    def list_files(self, repo: str, path: str = "") -> List[dict]:
-        """List inside given repo/path."""
+    # --- high-level API for your UI ---
+    @_synchronized
+    def list_repos(self, max_age: Optional[float] = LISTING_TTL) -> List[str]:
+        """First-level dirs inside ftp_root are 'repos'. Pass max_age=None for the last known list."""
+        def fetch():
+            self._send("LIST ")
+            raw = self._recv_all()
+            if raw.startswith("200 OK"):
+                return [line for line in raw.split("\n")[1:] if line]
+            return None
+        return self._cached_listing(self._cache_key("repos"), fetch, max_age)
+
+    def cached_repos(self) -> List[str]:
+        """The last known repo list, straight from the cache; never touches the network."""
+        cached = self.cache.get(self._cache_key("repos"))
+        return json.loads(cached) if cached is not None else []
+
+    @_synchronized
+    def list_owned_repos(self, max_age: Optional[float] = LISTING_TTL) -> List[str]:
+        """Get repositories owned by the user."""
+        def fetch():
+            self._send("GETREPOS")
+            raw = self._recv_all()
+            if raw.startswith("200 OK"):
+                if len(raw.split("\n")) > 1:
+                    return raw.split("\n")[1].split(",")
+                return []
+            return None
+        return self._cached_listing(self._cache_key("owned"), fetch, max_age)
+
+    @_synchronized
+    def list_files(self, repo: str, path: str = "", max_age: Optional[float] = LISTING_TTL) -> List[dict]:
+        """List inside given repo/path, revalidating a cached listing against the folder's mtime."""
         full_path = os.path.join(repo, path).replace("\\", "/").strip("/")
+        key = self._cache_key("list", full_path)
+        cached = self.cache.get(key, max_age=max_age)
+        if cached is not None:
+            return json.loads(cached)
+        meta = self.cache.meta(key)
+        try:
+            validator = self.stat(full_path)
+        except OSError:
+            cached = self.cache.get(key)
+            return json.loads(cached) if cached is not None else []
+        if validator is not None and meta is not None and meta["validator"] == list(validator):
+            self.cache.touch(key)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
         self._send(f"LIST {full_path}")
         raw = self._recv_all()
         if raw.startswith("200 OK"):
@@ -155,52 +515,256 @@ class SocketBackend:
                     "is_dir": not has_extension
                 })
             items.sort(key=lambda x: (not x["is_dir"], x["name"].lower()))
+            self.cache.put(key, json.dumps(items).encode(), validator)
             return items
         return []
 
-    def get_file(self, repo: str, path: str) -> str:
-        full_path = os.path.join(repo, path).replace("\\", "/")
-        self._send(f"GET {full_path}")
-        data = self._recv_all()
-        if data.startswith("200 OK"):
-            return data.split("\n", 1)[1]
-        return ""
+    @_synchronized
+    def get_file(self, repo: str, path: str, progress: t.Optional[t.Callable[[int, int], None]] = None) -> str:
+        data = self.get_file_bytes(repo, path, progress)
+        if data is None:
+            return ""
+        return data.decode(errors="ignore")
 
+    @_synchronized
     def save_file(self, repo: str, path: str, content: str) -> bool:
         full_path = os.path.join(repo, path).replace("\\", "/")
-        self._send(f"PUT {full_path}")
-        response = self._recv_all()
-        if response.startswith("200 OK"):
-            self.sock.sendall(content.encode() + b"<EOF>")
-            response = self._recv_all()
-            return response.startswith("200")
+        data = content.encode()
+        self.invalidate(repo, path)
+        self._send(f"UPLOAD {len(data)} {full_path}")
+        if self._read_line().startswith("200 OK"):
+            self.sock.sendall(data)
+            return self._read_line().startswith("200")
         return False
 
-    def get_file_bytes(self, repo: str, path: str) -> t.Optional[bytes]:
+    @_synchronized
+    def read_range(self, repo: str, path: str, offset: int, length: int) -> Optional[tuple]:
+        """Read up to length bytes at offset. Returns (file size, data) or None."""
+        full_path = os.path.join(repo, path).replace("\\", "/")
+        self._send(f"READ {offset} {length} {full_path}")
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return None
+        _, _, total, size = status.split(" ")
+        return int(total), self._recv_exact(int(size))
+
+    @_synchronized
+    def put_file(self, repo: str, path: str, local_path: str,
+                 progress: t.Optional[t.Callable[[int, int], None]] = None) -> bool:
+        """Upload a local file, streaming it from disk in chunks."""
         full_path = os.path.join(repo, path).replace("\\", "/")
+        total = os.path.getsize(local_path)
+        self.invalidate(repo, path)
+        self._send(f"UPLOAD {total} {full_path}")
+        if not self._read_line().startswith("200 OK"):
+            return False
+        sent = 0
+        with open(local_path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.sock.sendall(chunk)
+                sent += len(chunk)
+                self._report(progress, sent, total)
+        return self._read_line().startswith("200")
+
+    @_synchronized
+    def checksum(self, full_path: str) -> Optional[tuple]:
+        """Return (size, sha256 hex) of a server file, or None if unavailable."""
+        self._send(f"CHECKSUM {full_path}")
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return None
+        _, _, size, digest = status.split(" ")
+        return int(size), digest
+
+    @_synchronized
+    def tree(self, remote_path: str) -> List[tuple]:
+        """Every file under a server directory as (path, size), paths relative to ftp_root."""
+        remote_path = remote_path.replace("\\", "/").strip("/")
+        self._send(f"TREE {remote_path}")
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return []
+        body = self._recv_exact(int(status.split(" ")[2])).decode(errors="ignore")
+        entries = []
+        for line in body.split("\n"):
+            if line:
+                size, rel_path = line.split(" ", 1)
+                entries.append((rel_path, int(size)))
+        return entries
+
+    @_synchronized
+    def manifest(self, remote_path: str) -> t.Optional[dict]:
+        """{path: (size, mtime_ns, sha256)} for every file under a server directory,
+        or None if the server refused (which is not the same as an empty folder)."""
+        remote_path = remote_path.replace("\\", "/").strip("/")
+        self._send(f"MANIFEST {remote_path}")
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return None
+        body = self._recv_exact(int(status.split(" ")[2])).decode(errors="ignore")
+        entries = {}
+        for line in body.split("\n"):
+            if line:
+                digest, size, mtime_ns, rel_path = line.split(" ", 3)
+                entries[rel_path] = (int(size), int(mtime_ns), digest)
+        return entries
+
+    def _recv_to_file(self, local_path: str, size: int, on_chunk: t.Callable[[int], None]):
+        """Receive size bytes of file body into local_path, chunk by chunk.
+
+        Data goes to local_path + ".part" first, so a failed or cancelled
+        download never leaves a truncated file under the real name.
+        """
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        tmp_path = local_path + ".part"
+        received = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while received < size:
+                    chunk = self.sock.recv(min(CHUNK_SIZE, size - received))
+                    if not chunk:
+                        raise ConnectionError("Connection closed mid-transfer")
+                    f.write(chunk)
+                    received += len(chunk)
+                    on_chunk(len(chunk))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, local_path)
+
+    def _get_to_file(self, full_path: str, local_path: str,
+                     progress: t.Optional[t.Callable[[int, int], None]] = None) -> bool:
+        """GET a server file straight into local_path. False if the server refused it."""
         self._send(f"GET {full_path}")
-        data = self._recv_all_bytes()
-        if data.startswith(b"200 OK"):
-            return data.split(b"\n", 1)[1]
-        return None
-
-    def search(self, name: str) -> str:
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return False
+        size = int(status.split(" ")[2])
+        received = [0]
+
+        def on_chunk(n):
+            received[0] += n
+            self._report(progress, received[0], size)
+        self._recv_to_file(local_path, size, on_chunk)
+        return True
+
+    @_synchronized
+    def get_to_file(self, full_path: str, local_path: str,
+                    progress: t.Optional[t.Callable[[int, int], None]] = None) -> bool:
+        """Stream the server file at full_path (relative to ftp_root) to local_path."""
+        return self._get_to_file(full_path.replace("\\", "/").strip("/"), local_path, progress)
+
+    @_synchronized
+    def download_file(self, repo: str, path: str, local_path: str,
+                      progress: t.Optional[t.Callable[[int, int], None]] = None) -> bool:
+        """Stream a server file to local_path without holding it in memory."""
+        return self._get_to_file(os.path.join(repo, path).replace("\\", "/"), local_path, progress)
+
+    @_synchronized
+    def get_file_bytes(self, repo: str, path: str,
+                       progress: t.Optional[t.Callable[[int, int], None]] = None) -> t.Optional[bytes]:
+        """Download a file, reusing the cached copy when its size and mtime are unchanged."""
+        full_path = os.path.join(repo, path).replace("\\", "/")
+        key = self._cache_key("file", full_path.strip("/"))
+        validator = self.stat(full_path)
+        if validator is not None:
+            cached = self.cache.get(key, validator=validator)
+            if cached is not None:
+                return cached
+        self._send(f"GET {full_path}")
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return None
+        size = int(status.split(" ")[2])
+        content = self._recv_exact(size, progress)
+        if len(content) < size:
+            return None
+        if validator is not None:
+            self.cache.put(key, content, validator)
+        return content
+
+    @_synchronized
+    def get_many(self, full_paths: List[str], max_size: Optional[int] = None,
+                 max_total: Optional[int] = None) -> t.Dict[str, t.Optional[bytes]]:
+        """Fetch many files in one round trip with GETMANY, caching what arrives.
+
+        Returns {path: bytes}; paths that are missing, denied, bigger than
+        max_size or past the max_total byte budget map to None.
+        """
+        body = "\n".join(path.replace("\\", "/").strip("/") for path in full_paths).encode()
+        options = [len(body)]
+        if max_size is not None or max_total is not None:
+            options.append(max_size if max_size is not None else max_total)
+        if max_total is not None:
+            options.append(max_total)
+        self._send("GETMANY " + " ".join(map(str, options)))
+        if not self._read_line().startswith("200 OK"):
+            return {}
+        self.sock.sendall(body)
+        if not self._read_line().startswith("200 OK"):
+            return {}
+        results = {}
+        try:
+            while True:
+                header = self._read_line()
+                if not header.startswith("ITEM "):
+                    break  # DONE
+                _, status, size, mtime_ns, path = header.split(" ", 4)
+                if status != "200":
+                    results[path] = None
+                    continue
+                data = self._recv_exact(int(size))
+                if len(data) < int(size):
+                    raise ConnectionError("Connection closed mid-transfer")
+                results[path] = data
+                self.cache.put(self._cache_key("file", path), data, ("FILE", int(size), int(mtime_ns)),
+                               save_index=False)
+        finally:
+            self.cache.flush()
+        return results
+
+    def prefetch(self, repo: str, path: str, entries: List[dict], max_size: int = SMALL_FILE_SIZE) -> int:
+        """Warm the cache with a folder's small files in one GETMANY. Entries that
+        are already cached are left to be revalidated when opened. The batch is
+        capped at PREFETCH_BYTES (and an eighth of the cache), so it never evicts
+        what it just fetched. Returns how many files arrived."""
+        full_paths = [os.path.join(repo, e["path"]).replace("\\", "/")
+                      for e in entries if e.get("path") and not e.get("is_dir")]
+        full_paths = [p for p in full_paths if self.cache.meta(self._cache_key("file", p)) is None]
+        if not full_paths:
+            return 0
+        budget = min(PREFETCH_BYTES, self.cache.max_bytes // 8)
+        results = self.get_many(full_paths[:GETMANY_BATCH], min(max_size, budget), budget)
+        return sum(data is not None for data in results.values())
+
+    @_synchronized
+    def search(self, name: str) -> t.Tuple[List[str], bool]:
+        """Return (matching paths, truncated); truncated means the server capped the results."""
         self._send(f"SEARCH {name}")
-        data = self._recv_all()
-        if data.startswith("200 OK"):
-            return data.split("\n")[1:]
-        return ""
-
+        status = self._read_line()
+        if not status.startswith("200 OK"):
+            return [], False
+        parts = status.split(" ")
+        body = self._recv_exact(int(parts[2])).decode(errors="ignore")
+        return [line for line in body.split("\n") if line], "TRUNCATED" in parts
+
+    @_synchronized_once
     def mkdir(self, path: str) -> bool:
         full_path = path.replace("\\", "/")
+        self.invalidate(full_path)
         self._send(f"MKDIR {full_path}")
         response = self._recv_all()
         return response.startswith("201")
 
+    @_synchronized
     def get_dir(self,  path: str):
         full_path = path.replace("\\", "/")
         self._send(f"GETDIR {full_path}")
-        response = self._recv_all()
+        response = self._read_line()
         if not response.startswith("200 OK"):
             return
 
@@ -231,44 +795,38 @@ class SocketBackend:
             with open(rel_path, "wb") as f:
                 f.write(data)
 
-    def get_dir_to(self, remote_path: str, dest_root: str):
+    @_synchronized
+    def get_dir_to(self, remote_path: str, dest_root: str,
+                   progress: t.Optional[t.Callable[[int, int], None]] = None):
+        """Download a directory with one GETDIR stream. Each file goes through a
+        .part file, and a stream cut short raises ConnectionError."""
         remote_path = remote_path.replace("\\", "/").strip("/")
+        total = sum(size for _, size in self.tree(remote_path))
         self._send(f"GETDIR {remote_path}")
-        response = self._recv_all()
+        response = self._read_line()
         if not response.startswith("200 OK"):
             return
+        received = [0]
+
+        def on_chunk(n):
+            received[0] += n
+            self._report(progress, received[0], max(total, received[0]))
 
         while True:
-            header = b""
-            while not header.endswith(b"\n"):
-                chunk = self.sock.recv(1)
-                if not chunk:
-                    return
-                header += chunk
-            header_s = header.decode().strip()
+            header_s = self._read_line()
             if header_s == "DONE":
                 break
-            if header_s.startswith("404"):
-                print(header_s)
-                break
-            _, rel_path, size_str = header_s.split(" ", 2)
-            size = int(size_str)
+            if not header_s.startswith("FILE "):
+                raise ConnectionError(f"Unexpected GETDIR reply: {header_s}")
+            rel_path, size_str = header_s[len("FILE "):].rsplit(" ", 1)
             rel_path = rel_path.replace("\\", "/")
             try:
                 rel_to = os.path.relpath(rel_path, remote_path).replace("\\", "/")
             except ValueError:
                 rel_to = os.path.basename(rel_path)
-            local_path = os.path.join(dest_root, rel_to)
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            remaining = size
-            with open(local_path, "wb") as f:
-                while remaining > 0:
-                    chunk = self.sock.recv(min(4096, remaining))
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    remaining -= len(chunk)
+            self._recv_to_file(os.path.join(dest_root, rel_to), int(size_str), on_chunk)
 
+    @_synchronized
     def quit(self):
         if not self.sock:
             return
@@ -281,17 +839,744 @@ class SocketBackend:
                 pass
             self.sock = None
 
+    def _forget(self, full_path: str):
+        """Drop cached data for a server path; a repository's also drops the repo lists."""
+        repo, _, path = full_path.replace("\\", "/").strip("/").partition("/")
+        self.invalidate(repo, path)
+        if not path:
+            self.cache.invalidate(self._cache_key("repos"))
+            self.cache.invalidate(self._cache_key("owned"))
+
+    # These forget the cached paths even when the reply is lost, since the command may have run
+
+    @_synchronized_once
+    def copy(self, src: str, dst: str) -> bool:
+        """Copy a file or folder on the server; no data passes through the client."""
+        self._send(f"COPY {src}|{dst}")
+        try:
+            return self._read_line().startswith("201")
+        finally:
+            self._forget(dst)
+
+    @_synchronized_once
+    def move(self, src: str, dst: str) -> bool:
+        """Move a file or folder on the server (across repositories too)."""
+        self._send(f"MOVE {src}|{dst}")
+        try:
+            return self._read_line().startswith("200")
+        finally:
+            self._forget(src)
+            self._forget(dst)
+
+    @_synchronized_once
+    def rename(self, full_path: str, new_name: str) -> bool:
+        """Rename a file, folder or owned repository in place."""
+        self._send(f"RENAME {full_path}|{new_name}")
+        try:
+            return self._read_line().startswith("200")
+        finally:
+            self._forget(full_path)
+            self._forget("/".join(full_path.strip("/").split("/")[:-1] + [new_name]))
+
+    @_synchronized_once
+    def delete(self, full_path: str) -> bool:
+        """Delete a file, folder or owned repository on the server."""
+        self._send(f"DELETE {full_path}")
+        try:
+            return self._read_line().startswith("200")
+        finally:
+            self._forget(full_path)
+
+    @_synchronized_once
     def add_user_to_repo(self, repo_name: str, username: str) -> bool:
         """Adds a user to a repository."""
         self._send(f"ADDUSER {repo_name}_{username}")
         response = self._recv_all()
         return response.startswith("200")
 
+# ---------- Connection Pool ----------
+POOL_SIZE = 4
+SPLIT_THRESHOLD = 8 * 1024 * 1024  # GETDIR jobs bigger than this are split across connections
+SYNC_STATE_FILE = ".filenet-sync.json"  # per-folder record of the last sync, kept by sync_dir
+
+class ConnectionPool:
+    """Extra authenticated sessions for bulk transfers.
+
+    The primary backend is left for interactive commands (listing, search,
+    editing); bulk jobs borrow a pooled session, so a large download never
+    queues behind or in front of them. Sessions are opened lazily.
+    """
+    def __init__(self, primary: SocketBackend, size: int = POOL_SIZE):
+        self.primary = primary
+        self.size = size
+        self.idle: list[SocketBackend] = []
+        self.opened = 0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> SocketBackend:
+        with self.cond:
+            while not self.idle and self.opened >= self.size:
+                self.cond.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.opened += 1
+        try:
+            return self.primary.clone()
+        except Exception:
+            with self.cond:
+                self.opened -= 1
+                self.cond.notify()
+            raise
+
+    def release(self, conn: SocketBackend, broken: bool = False):
+        with self.cond:
+            if broken or conn.name != self.primary.name:
+                self.opened -= 1
+                conn.quit()
+            else:
+                self.idle.append(conn)
+            self.cond.notify()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except OSError:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def reset(self):
+        """Close idle sessions, e.g. after the user logs in as someone else."""
+        with self.cond:
+            idle, self.idle = self.idle, []
+            self.opened -= len(idle)
+        for conn in idle:
+            conn.quit()
+
+    def _borrowed(name):
+        def call(self, *args, **kwargs):
+            with self.connection() as conn:
+                return getattr(conn, name)(*args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = f"SocketBackend.{name} on a pooled connection."
+        return call
+
+    get_file_bytes = _borrowed("get_file_bytes")
+    download_file = _borrowed("download_file")
+    put_file = _borrowed("put_file")
+    get_dir = _borrowed("get_dir")
+    get_many = _borrowed("get_many")
+    prefetch = _borrowed("prefetch")
+    del _borrowed
+
+    @staticmethod
+    def _save(local_path: str, data: bytes):
+        """Write a fetched file via a .part file, like _get_to_file."""
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        with open(local_path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(local_path + ".part", local_path)
+
+    def _get_small_to(self, conn: SocketBackend, full_paths: List[str],
+                      local_path_for: t.Callable[[str], str], count: t.Callable[[int], None]) -> List[str]:
+        """Download small files with GETMANY, GETMANY_BATCH at a time. Returns
+        the paths that did not arrive."""
+        missing = []
+        for start in range(0, len(full_paths), GETMANY_BATCH):
+            batch = full_paths[start:start + GETMANY_BATCH]
+            results = conn.get_many(batch)
+            for full_path in batch:
+                data = results.get(full_path)
+                if data is None:
+                    missing.append(full_path)
+                    continue
+                self._save(local_path_for(full_path), data)
+                count(len(data))
+        return missing
+
+    def get_dir_to(self, remote_path: str, dest_root: str,
+                   progress: t.Optional[t.Callable[[int, int], None]] = None):
+        """Download a directory, splitting big ones across several pooled connections."""
+        remote_path = remote_path.replace("\\", "/").strip("/")
+        with self.connection() as conn:
+            entries = conn.tree(remote_path)
+        total = sum(size for _, size in entries)
+
+        lock = threading.Lock()
+        received = [0]
+
+        def count(n):
+            with lock:
+                received[0] += n
+                done = received[0]
+            if progress is not None:
+                progress(done, total)
+
+        def local_path_for(rel_path):
+            try:
+                rel_to = os.path.relpath(rel_path, remote_path).replace("\\", "/")
+            except ValueError:
+                rel_to = os.path.basename(rel_path)
+            return os.path.join(dest_root, rel_to)
+
+        def fetch(bucket):
+            with self.connection() as conn:
+                # Small files in as few round trips as possible, then the big ones one by one
+                small = [rel_path for rel_path, size in bucket if size <= SMALL_FILE_SIZE]
+                self._get_small_to(conn, small, local_path_for, count)
+                for rel_path, size in bucket:
+                    if size > SMALL_FILE_SIZE:
+                        conn.get_to_file(rel_path, local_path_for(rel_path), self._stepper(count))
+
+        if total < SPLIT_THRESHOLD or len(entries) < 2 or self.size < 2:
+            fetch(entries)
+            return
+
+        # Largest files first, each onto the currently lightest bucket
+        buckets = [[] for _ in range(min(self.size, len(entries)))]
+        loads = [0] * len(buckets)
+        for rel_path, size in sorted(entries, key=lambda e: e[1], reverse=True):
+            i = loads.index(min(loads))
+            buckets[i].append((rel_path, size))
+            loads[i] += size
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+            for future in [executor.submit(fetch, bucket) for bucket in buckets]:
+                future.result()
+
+    def _run_parallel(self, jobs: list, run: t.Callable, total: int,
+                      progress: t.Optional[t.Callable[[int, int], None]] = None):
+        """Drain jobs across every pooled connection, largest first.
+
+        run(conn, job, count) does one job; count(n) adds n bytes to the shared
+        progress total. Each worker keeps its connection for the whole queue.
+        """
+        todo: "queue.Queue" = queue.Queue()
+        for job in sorted(jobs, key=lambda j: j[-1], reverse=True):
+            todo.put(job)
+        lock = threading.Lock()
+        done = [0]
+
+        def count(n):
+            with lock:
+                done[0] += n
+                current = done[0]
+            if progress is not None:
+                progress(current, total)
+
+        def drain():
+            with self.connection() as conn:
+                while True:
+                    try:
+                        job = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    run(conn, job, count)
+
+        workers = max(1, min(self.size, len(jobs)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(drain) for _ in range(workers)]:
+                future.result()
+
+    @staticmethod
+    def _stepper(count: t.Callable[[int], None]) -> t.Callable[[int, int], None]:
+        """Turn a (done, total) progress callback into byte deltas for count()."""
+        seen = [0]
+
+        def step(now, _total):
+            count(now - seen[0])
+            seen[0] = now
+        return step
+
+    def put_dir(self, local_dir: str, remote_path: str,
+                progress: t.Optional[t.Callable[[int, int], None]] = None) -> dict:
+        """Upload a local folder under remote_path using every pooled connection.
+
+        Files the server already has with the same size and SHA-256 (per its
+        MANIFEST) are skipped; local files are only hashed when the size matches.
+        Returns counts of uploaded and skipped files plus the paths that failed.
+        """
+        remote_path = remote_path.replace("\\", "/").strip("/")
+        jobs = []
+        for root, dirs, files in os.walk(local_dir):
+            for file in files:
+                local_path = os.path.join(root, file)
+                rel_path = os.path.relpath(local_path, local_dir).replace("\\", "/")
+                jobs.append((local_path, f"{remote_path}/{rel_path}", os.path.getsize(local_path)))
+        with self.connection() as conn:
+            remote = conn.manifest(remote_path) or {}  # without one, every file is uploaded
+
+        lock = threading.Lock()
+        result = {"uploaded": 0, "skipped": 0, "failed": []}
+
+        def upload(conn, job, count):
+            local_path, full_path, size = job
+            known = remote.get(full_path)
+            if known and known[0] == size and known[2] == sha256_file(local_path):
+                count(size)
+                with lock:
+                    result["skipped"] += 1
+                return
+            repo, _, path = full_path.partition("/")
+            ok = conn.put_file(repo, path, local_path, self._stepper(count))
+            with lock:
+                if ok:
+                    result["uploaded"] += 1
+                else:
+                    result["failed"].append(full_path)
+
+        self._run_parallel(jobs, upload, sum(job[2] for job in jobs), progress)
+        return result
+
+    def sync_dir(self, local_dir: str, remote_path: str,
+                 progress: t.Optional[t.Callable[[int, int], None]] = None) -> dict:
+        """Two-way sync of local_dir with the server directory remote_path.
+
+        The server side comes from one MANIFEST call. The local side is a stat
+        walk: SYNC_STATE_FILE remembers each file's size, mtime and hash as of
+        the last sync, so only files whose size or mtime moved are re-hashed.
+        Comparing both sides against that state tells which side changed:
+        a one-sided change is copied across; when both changed, the newer
+        mtime wins and the path is reported under "conflicts". Deletions are
+        not propagated - a file missing on one side is copied back from the
+        other. Transfers run in parallel over the pool.
+        """
+        remote_path = remote_path.replace("\\", "/").strip("/")
+        prefix = remote_path + "/"
+        state_path = os.path.join(local_dir, SYNC_STATE_FILE)
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        with self.connection() as conn:
+            manifest = conn.manifest(remote_path)
+        if manifest is None:
+            # Treating a refusal as an empty folder would re-upload the whole tree
+            raise ConnectionError(f"MANIFEST {remote_path} refused")
+        remote = {p[len(prefix):]: entry for p, entry in manifest.items() if p.startswith(prefix)}
+
+        local = {}
+        for root, dirs, files in os.walk(local_dir):
+            for file in files:
+                if file == SYNC_STATE_FILE or file.endswith(".part"):
+                    continue
+                local_path = os.path.join(root, file)
+                rel_path = os.path.relpath(local_path, local_dir).replace("\\", "/")
+                st = os.stat(local_path)
+                known = state.get(rel_path)
+                if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                    digest = known["sha256"]
+                else:
+                    digest = sha256_file(local_path)
+                local[rel_path] = (st.st_size, st.st_mtime_ns, digest)
+
+        new_state = {}
+        jobs = []
+        conflicts = []
+        for rel_path in sorted(set(local) | set(remote)):
+            mine, theirs = local.get(rel_path), remote.get(rel_path)
+            base = state.get(rel_path, {}).get("sha256")
+            if mine and theirs and mine[2] == theirs[2]:
+                new_state[rel_path] = {"size": mine[0], "mtime_ns": mine[1], "sha256": mine[2]}
+                continue
+            if not theirs:
+                direction = "up"
+            elif not mine:
+                direction = "down"
+            elif mine[2] == base:
+                direction = "down"
+            elif theirs[2] == base:
+                direction = "up"
+            else:
+                conflicts.append(rel_path)
+                direction = "up" if mine[1] >= theirs[1] else "down"
+            size = (mine if direction == "up" else theirs)[0]
+            jobs.append((direction, rel_path, size))
+        # Small downloads travel together over GETMANY instead of one GET each
+        small = [job for job in jobs if job[0] == "down" and job[2] <= SMALL_FILE_SIZE]
+        jobs = [job for job in jobs if job[0] != "down" or job[2] > SMALL_FILE_SIZE]
+        for start in range(0, len(small), GETMANY_BATCH):
+            batch = small[start:start + GETMANY_BATCH]
+            jobs.append(("down-many", [job[1] for job in batch], sum(job[2] for job in batch)))
+
+        lock = threading.Lock()
+        result = {"uploaded": 0, "downloaded": 0, "unchanged": len(new_state),
+                  "conflicts": conflicts, "failed": []}
+
+        def local_path_for(full_path):
+            return os.path.join(local_dir, *full_path[len(prefix):].split("/"))
+
+        def record(rel_path, ok, direction, digest):
+            if not ok:
+                result["failed"].append(rel_path)
+                if rel_path in state:
+                    new_state[rel_path] = state[rel_path]
+                return
+            result["uploaded" if direction == "up" else "downloaded"] += 1
+            st = os.stat(os.path.join(local_dir, *rel_path.split("/")))
+            new_state[rel_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+        def transfer(conn, job, count):
+            direction, rel_path, size = job
+            if direction == "down-many":
+                missing = set(self._get_small_to(conn, [prefix + p for p in rel_path], local_path_for, count))
+                with lock:
+                    for p in rel_path:
+                        record(p, prefix + p not in missing, "down", remote[p][2])
+                return
+            local_path = os.path.join(local_dir, *rel_path.split("/"))
+            repo, _, path = f"{remote_path}/{rel_path}".partition("/")
+            if direction == "up":
+                ok = conn.put_file(repo, path, local_path, self._stepper(count))
+                digest = local[rel_path][2]
+            else:
+                ok = conn.download_file(repo, path, local_path, self._stepper(count))
+                digest = remote[rel_path][2]
+            with lock:
+                record(rel_path, ok, direction, digest)
+
+        try:
+            self._run_parallel(jobs, transfer, sum(job[2] for job in jobs), progress)
+        finally:
+            tmp_path = state_path + ".part"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(new_state, f)
+            os.replace(tmp_path, state_path)
+        return result
+
+    def close(self):
+        self.reset()
+
+# ---------- Search ----------
+class IncrementalSearch:
+    """Type-ahead search over SocketBackend.search.
+
+    When a query extends the previous one and the previous results were not
+    capped by the server, the new results are narrowed locally instead of
+    sending another SEARCH. reset() drops them; the change feed calls it
+    whenever files are created, removed or renamed.
+    """
+    def __init__(self, backend: SocketBackend):
+        self.backend = backend
+        self.query: t.Optional[str] = None
+        self.results: List[str] = []
+        self.complete = False
+        self.generation = 0  # bumped by reset(), so a SEARCH that raced it isn't kept
+        self.lock = threading.Lock()
+
+    def run(self, query: str) -> t.Tuple[List[str], bool]:
+        with self.lock:
+            if self.complete and self.query is not None and self.query in query:
+                self.results = [r for r in self.results if query in r.rsplit("/", 1)[-1]]
+                self.query = query
+                return self.results, False
+            generation = self.generation
+        results, truncated = self.backend.search(query)
+        with self.lock:
+            if generation == self.generation:
+                self.query, self.results, self.complete = query, results, not truncated
+        return results, truncated
+
+    def reset(self):
+        with self.lock:
+            self.query, self.results, self.complete = None, [], False
+            self.generation += 1
+
+# ---------- Background I/O ----------
+class TaskCancelled(Exception):
+    """Raised from a task's progress hook once the task has been cancelled."""
+
+class Task:
+    """A backend call queued on an IOWorker."""
+    PROGRESS_INTERVAL = 0.1  # seconds between progress updates sent to the UI
+
+    def __init__(self, worker, fn, args, kwargs, on_done, on_error, on_progress):
+        self.worker = worker
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self._last_report = 0.0
+
+    def cancel(self):
+        """Cancel the task. A queued task never runs; a running transfer stops at its next chunk."""
+        self.cancelled = True
+
+    def report(self, done: int, total: int):
+        """Progress hook handed to backend transfers."""
+        if self.cancelled:
+            raise TaskCancelled()
+        now = time.monotonic()
+        if now - self._last_report >= self.PROGRESS_INTERVAL or done == total:
+            self._last_report = now
+            self.worker._post(self, self.on_progress, done, total)
+
+class IOWorker:
+    """Runs backend calls off the Tk thread.
+
+    Interactive calls run one at a time on their own thread; bulk transfers run
+    on a separate set of threads (meant for ConnectionPool calls) so they never
+    hold up interactive ones. Results, errors and progress are queued and
+    delivered from the Tk event loop (polled with `after`), so callbacks may
+    touch widgets.
+    """
+    POLL_MS = 30
+
+    def __init__(self, root, bulk_workers: int = 2):
+        self.root = root
+        self.tasks: "queue.Queue[Task]" = queue.Queue()
+        self.bulk_tasks: "queue.Queue[Task]" = queue.Queue()
+        self.results: "queue.Queue[tuple]" = queue.Queue()
+        self.pending: list[Task] = []
+        self.threads = [threading.Thread(target=self._run, args=(self.tasks,), daemon=True)]
+        for _ in range(bulk_workers):
+            self.threads.append(threading.Thread(target=self._run, args=(self.bulk_tasks,), daemon=True))
+        for thread in self.threads:
+            thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def submit(self, fn: t.Callable, *args, on_done: t.Callable = None, on_error: t.Callable = None,
+               on_progress: t.Callable[[int, int], None] = None, bulk: bool = False, **kwargs) -> Task:
+        """Queue fn(*args, **kwargs). With on_progress set, fn also gets a progress= hook."""
+        task = Task(self, fn, args, kwargs, on_done, on_error, on_progress)
+        if on_progress is not None:
+            task.kwargs["progress"] = task.report
+        self.pending.append(task)
+        (self.bulk_tasks if bulk else self.tasks).put(task)
+        return task
+
+    def cancel_all(self):
+        for task in self.pending:
+            task.cancel()
+
+    def _post(self, task: Task, callback: t.Optional[t.Callable], *args):
+        if callback is not None:
+            self.results.put((task, callback, args))
+
+    def post(self, callback: t.Callable, *args):
+        """Run callback(*args) on the Tk thread; safe to call from any thread."""
+        self.results.put((None, callback, args))
+
+    def _run(self, tasks: "queue.Queue[Task]"):
+        while True:
+            task = tasks.get()
+            if not task.cancelled:
+                try:
+                    result = task.fn(*task.args, **task.kwargs)
+                    self._post(task, task.on_done, result)
+                except TaskCancelled:
+                    pass
+                except Exception as e:
+                    self._post(task, task.on_error, e)
+            self.results.put((task, None, ()))
+
+    def _poll(self):
+        try:
+            while True:
+                task, callback, args = self.results.get_nowait()
+                if callback is None:
+                    if task in self.pending:
+                        self.pending.remove(task)
+                elif task is None or not task.cancelled:
+                    try:
+                        callback(*args)
+                    except Exception as e:
+                        print(f"Callback error: {e}")
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._poll)
+
+# ---------- Change Feed ----------
+class ChangeFeed:
+    """Keeps a SUBSCRIBE session open and turns server change events into callbacks.
+
+    Runs on its own thread and connection (a clone of the backend), so it never
+    competes with interactive calls. Cached data for a changed path is dropped
+    as soon as the event arrives; on_event(kind, user, path) is then delivered
+    on the Tk thread through the worker. A dropped connection is retried with
+    backoff and followed by a RESYNC event, since changes may have been missed.
+    """
+    RETRY_SECONDS = (1, 2, 5, 10, 30)
+
+    def __init__(self, backend: SocketBackend, worker: IOWorker, on_event: t.Callable[[str, str, str], None]):
+        self.backend = backend
+        self.worker = worker
+        self.on_event = on_event
+        self.session: Optional[SocketBackend] = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        failures = 0
+        while not self.stopped.is_set():
+            try:
+                self.session = self.backend.clone()
+                self.session._send("SUBSCRIBE")
+                if not self.session._read_line().startswith("200 OK"):
+                    raise ConnectionError("SUBSCRIBE refused")
+                if failures:
+                    self._deliver("RESYNC", "-", "-")
+                failures = 0
+                while not self.stopped.is_set():
+                    line = self.session._read_line()
+                    if not line:
+                        raise ConnectionError("Change feed closed")
+                    parts = line.split(" ", 3)
+                    if len(parts) == 4 and parts[0] == "EVENT" and parts[1] != "PING":
+                        self._deliver(*parts[1:])
+            except (OSError, ConnectionError):
+                if self.stopped.is_set():
+                    break
+                failures += 1
+                self.stopped.wait(self.RETRY_SECONDS[min(failures, len(self.RETRY_SECONDS)) - 1])
+            finally:
+                self._drop_session()
+
+    def _deliver(self, kind: str, user: str, path: str):
+        if kind == "ADDUSER":
+            self.backend.cache.invalidate(self.backend._cache_key("repos"))
+            self.backend.cache.invalidate(self.backend._cache_key("owned"))
+        elif kind in ("PUT", "MKDIR", "COPY", "MOVE", "DELETE", "REPO"):
+            self.backend._forget(path)
+        self.worker.post(self.on_event, kind, user, path)
+
+    def _drop_session(self):
+        session, self.session = self.session, None
+        if session is not None and session.sock is not None:
+            try:
+                session.sock.close()
+            except OSError:
+                pass
+
+    def close(self):
+        self.stopped.set()
+        session = self.session
+        if session is not None and session.sock is not None:
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
 # ---------- Utility ----------
 class Divider(ctk.CTkFrame):
     def __init__(self, master, height=1, fg=G_BORDER, **kw):
         super().__init__(master, fg_color=fg, height=height, **kw)
 
+class VirtualList(ctk.CTkFrame):
+    """Scrollable list that only creates widgets for the rows in view.
+
+    make_row(parent) builds an empty row widget; bind_row(row, item) fills it in.
+    Scrolling rebinds the same row widgets to other items, and set_items only
+    rebinds rows whose item actually changed, so the cost depends on the
+    viewport height rather than on the number of items.
+    """
+    def __init__(self, master, make_row: t.Callable[[t.Any], t.Any], bind_row: t.Callable[[t.Any, t.Any], None],
+                 row_height: int = 32, **kw):
+        super().__init__(master, **kw)
+        self.make_row = make_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.items: list = []
+        self.top = 0
+        self.rows: list = []
+        self.bound: list = []
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.body.bind("<Configure>", lambda e: self._render())
+        self._bind_wheel(self.body)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1) or "break")
+        widget.bind("<Button-4>", lambda e: self.scroll(-1) or "break")
+        widget.bind("<Button-5>", lambda e: self.scroll(1) or "break")
+
+    def _visible_count(self) -> int:
+        return max(1, self.body.winfo_height() // self.row_height + 1)
+
+    def set_items(self, items: list, keep_position: bool = False):
+        self.items = list(items)
+        if not keep_position:
+            self.top = 0
+        self._render()
+
+    def scroll(self, rows: int):
+        self.top += rows
+        self._render()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.top = int(float(value) * len(self.items))
+        elif action == "scroll":
+            self.scroll(int(value) * (self._visible_count() if unit == "pages" else 1))
+            return
+        self._render()
+
+    def _render(self):
+        visible = self._visible_count()
+        self.top = max(0, min(self.top, len(self.items) - visible + 1))
+        while len(self.rows) < visible:
+            row = self.make_row(self.body)
+            self._bind_wheel(row)
+            for child in row.winfo_children():
+                self._bind_wheel(child)
+            self.rows.append(row)
+            self.bound.append(None)
+        for i, row in enumerate(self.rows):
+            index = self.top + i
+            if i < visible and index < len(self.items):
+                item = self.items[index]
+                if self.bound[i] is None or self.bound[i] != item:
+                    self.bind_row(row, item)
+                    self.bound[i] = item
+                row.place(x=0, y=i * self.row_height, relwidth=1.0, height=self.row_height)
+            else:
+                row.place_forget()
+        if self.items:
+            self.scrollbar.set(self.top / len(self.items), min(1.0, (self.top + visible) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+def human_size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def hex_preview(data: bytes) -> str:
+    lines = []
+    for offset in range(0, len(data), 16):
+        row = data[offset:offset + 16]
+        ascii_part = "".join(chr(b) if 32 <= b < 127 else "." for b in row)
+        lines.append(f"{offset:08x}  {row.hex(' '):<47}  {ascii_part}")
+    return "\n".join(lines)
+
+def format_progress(done: int, total: int) -> str:
+    if total > 0:
+        return f"{human_size(done)} / {human_size(total)} ({done * 100 // total}%)"
+    return human_size(done)
+
+class TransferMeter:
+    """Formats progress plus average throughput since the transfer started."""
+    def __init__(self):
+        self.started = time.monotonic()
+
+    def __call__(self, done: int, total: int) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return f"{format_progress(done, total)} – {human_size(done / elapsed)}/s"
+
 # ---------- Login Dialog ----------
 class LoginDialog(ctk.CTkToplevel):
     def __init__(self, parent, on_login: t.Callable[[str, str], bool], on_register: t.Callable[[str, str], bool]):
@@ -427,6 +1712,8 @@ class LoginDialog(ctk.CTkToplevel):
         return self.result
 
 # ---------- Top Bar ----------
+SEARCH_DEBOUNCE_MS = 250
+
 class TopBar(ctk.CTkFrame):
     def __init__(self, master, on_search: t.Callable[[str], None], on_login: t.Callable[[], None]):
         super().__init__(master, fg_color=G_PANEL)
@@ -452,7 +1739,7 @@ class TopBar(ctk.CTkFrame):
     def _on_search_delayed(self, on_search):
         if self.search_timer:
             self.master.after_cancel(self.search_timer)
-        self.search_timer = self.master.after(1, lambda: on_search(self.search.get()))
+        self.search_timer = self.master.after(SEARCH_DEBOUNCE_MS, lambda: on_search(self.search.get()))
 
     def update_avatar(self, username: str = None):
         """Update avatar text with user initials or default 'RO'"""
@@ -517,26 +1804,33 @@ class RepoCard(ctk.CTkFrame):
 
 # ---------- Explorer (File Tree) ----------
 class Explorer(ctk.CTkFrame):
-    def __init__(self, master, backend, on_open_file: t.Callable[[str], None]):
+    HINT = "Right-click items marked with ❓ to try opening as file"
+
+    def __init__(self, master, backend, worker: IOWorker, pool: ConnectionPool,
+                 on_open_file: t.Callable[[str], None]):
         super().__init__(master, fg_color=G_BG)
         self.backend = backend
+        self.worker = worker
+        self.pool = pool
         self.repo: str = None
         self.path = ""
         self.on_open_file = on_open_file
+        self.pending: t.Optional[Task] = None
 
         # Breadcrumbs
         self.breadcrumb = ctk.CTkLabel(self, text="", text_color=G_SUBTLE)
         self.breadcrumb.pack(anchor="w", padx=8, pady=(8, 4))
         
         # Status bar
-        self.status = ctk.CTkLabel(self, text="Right-click items marked with ❓ to try opening as file",
-                                    text_color=G_SUBTLE, font=("Inter", 10))
+        self.status = ctk.CTkLabel(self, text=self.HINT, text_color=G_SUBTLE, font=("Inter", 10))
         self.status.pack(anchor="w", padx=8, pady=(0, 4))
 
-        # File list
-        self.list = ctk.CTkScrollableFrame(self, fg_color=G_PANEL, border_color=G_BORDER, border_width=1,
-                                           corner_radius=12)
+        # File list: only the rows in view exist as widgets
+        self.list = VirtualList(self, self._make_row, self._bind_row, row_height=36, fg_color=G_PANEL,
+                                border_color=G_BORDER, border_width=1, corner_radius=12)
         self.list.pack(fill="both", expand=True, padx=8, pady=8)
+        self.placeholder = ctk.CTkLabel(self.list.body, text="", text_color=G_SUBTLE)
+        self.listed: t.Optional[tuple] = None  # (repo, path) currently on screen
         self._render_empty()
 
 
@@ -545,116 +1839,199 @@ class Explorer(ctk.CTkFrame):
         self.path = path
         self.refresh()
 
-    def _container(self):
-        # use inner content frame if it exists, else the frame itself
-        return getattr(self.list, "scrollable_frame", self.list)
+    def _show_placeholder(self, text: str, y: int = 20):
+        if text:
+            self.placeholder.configure(text=text)
+            self.placeholder.place(relx=0.5, y=y, anchor="n")
+        else:
+            self.placeholder.place_forget()
 
     def _render_empty(self):
-        container = self._container()
-        for w in container.winfo_children():
-            w.destroy()
-        ctk.CTkLabel(container, text="Select a repository from the left.", text_color=G_SUBTLE).pack(pady=20)
+        self.listed = None
+        self.list.set_items([])
+        self._show_placeholder("Select a repository from the left.")
 
-    def refresh(self):
-        max_length: int = 17
+    def refresh(self, force: bool = False, prefetch: bool = True):
+        """Re-list the open folder; prefetch=False skips warming the cache (feed-driven refreshes)."""
         if not self.repo:
             self._render_empty()
             return
-
+        if self.pending:
+            self.pending.cancel()
+        repo, path = self.repo, self.path
+        self.status.configure(text="Loading…")
         # FIX: include repo
-        entries = self.backend.list_files(self.repo, self.path)
-        container = self._container()
-        for w in container.winfo_children():
-            w.destroy()
-
-        if self.path:
-            ctk.CTkButton(container, text="..", fg_color="transparent", hover_color="#0f172a",
-                          anchor="w", command=self._go_up).pack(fill="x", padx=6, pady=(6, 0))
+        self.pending = self.worker.submit(
+            self.backend.list_files, repo, path, max_age=0 if force else LISTING_TTL,
+            on_done=lambda entries: self._render(repo, path, entries, prefetch),
+            on_error=lambda e: self.status.configure(text=f"Failed to list {repo}/{path}: {e}"))
+
+    def _render(self, repo: str, path: str, entries: List[dict], prefetch: bool = True):
+        if (repo, path) != (self.repo, self.path):
+            return  # the user navigated away while the listing was loading
+        self.pending = None
+        self.status.configure(text=self.HINT)
+        items = ([{"name": "..", "path": None, "is_dir": True}] if path else []) + entries
+        # Re-listing the same folder keeps the scroll position and only rebinds changed rows
+        same_folder = self.listed == (repo, path)
+        self.listed = (repo, path)
+        self.list.set_items(items, keep_position=same_folder)
+        self._show_placeholder("" if entries else "(Empty)", y=len(items) * self.list.row_height + 10)
 
-        if not entries:
-            ctk.CTkLabel(container, text="(Empty)", text_color=G_SUBTLE).pack(pady=10)
+        crumb = self.repo + (f" / {self.path}" if self.path else "")
+        self.breadcrumb.configure(text=crumb)
+        if entries and prefetch:
+            # Warm the cache with the folder's small files in one round trip, off the interactive session
+            self.worker.submit(self.pool.prefetch, repo, path, entries, bulk=True)
+        #print("DEBUG LIST:", self.repo, self.path, entries)
 
-        for e in entries:
-            name = e["name"]
-            text, ext = os.path.splitext(name)
-            if len(name) >= max_length:
-                allowed_name_length = max_length - len(ext)
+    def _make_row(self, parent):
+        row = ctk.CTkFrame(parent, fg_color="transparent")
+        row.item = None
+        row.file_btn = ctk.CTkButton(row, text="", fg_color="transparent", hover_color="#0f172a",
+                                     anchor="w", command=lambda: self._open_item(row.item))
+        row.file_btn.pack(side="left", fill="x", expand=True, padx=(6, 0))
+        # Right-click: rename/copy/move/delete on the server, or open a ❓ directory as a file
+        row.file_btn.bind("<Button-3>", lambda event: self._show_menu(row.item, event))
+        row.download_btn = ctk.CTkButton(row, text="Download", width=100, fg_color=G_ACCENT,
+                                         hover_color="#1f6feb", command=lambda: self._download_item(row.item))
+        row.download_btn.pack(side="right", padx=6)
+        return row
+
+    def _bind_row(self, row, e: dict):
+        row.item = e
+        if e["path"] is None:
+            row.file_btn.configure(text="..")
+            row.download_btn.pack_forget()
+            return
+        row.file_btn.configure(text=self._label(e))
+        row.download_btn.pack(side="right", padx=6)
 
-                # If extension itself is too long, just truncate everything
-                if allowed_name_length <= 0:
-                    name = name[:max_length]
+    @staticmethod
+    def _display_name(e: dict) -> str:
+        max_length: int = 17
+        name = e["name"]
+        text, ext = os.path.splitext(name)
+        if len(name) >= max_length:
+            allowed_name_length = max_length - len(ext)
+
+            # If extension itself is too long, just truncate everything
+            if allowed_name_length <= 0:
+                name = name[:max_length]
+
+            name = text[:allowed_name_length] + ext
+        return name
+
+    def _label(self, e: dict) -> str:
+        name = self._display_name(e)
+        if e["is_dir"]:
+            # Check if it might be a file (no obvious directory indicators)
+            if "." not in name and len(name) < 20:  # Short name without dots might be a file
+                return "📁❓ " + name  # Question mark indicates uncertainty
+            return "📁 " + name
+        return "📄 " + name
+
+    def _open_item(self, e: t.Optional[dict]):
+        if e is None:
+            return
+        if e["path"] is None:
+            self._go_up()
+        elif e["is_dir"]:
+            self._open_dir(e["path"])
+        else:
+            self.on_open_file(e["path"])
 
-                name = text[:allowed_name_length] + ext
-            rel_path = e["path"]
-            is_dir = bool(e["is_dir"])
+    def _try_as_file(self, e: t.Optional[dict]):
+        if e is None or e["path"] is None or not e["is_dir"]:
+            return
+        p = e["path"]
+        try:
+            # Try to open as file first
+            self.on_open_file(p)
+        except Exception as ex:
+            # If that fails, open as directory
+            print(f"Failed to open {p} as file, trying as directory: {ex}")
+            self._open_dir(p)
+
+    def _show_menu(self, e: t.Optional[dict], event):
+        if e is None or e["path"] is None:
+            return
+        menu = Menu(self, tearoff=0)
+        if e["is_dir"]:
+            menu.add_command(label="Open as file", command=lambda: self._try_as_file(e))
+        menu.add_command(label="Rename…", command=lambda: self._rename_item(e))
+        menu.add_command(label="Copy to…", command=lambda: self._transfer_item(e, copy=True))
+        menu.add_command(label="Move to…", command=lambda: self._transfer_item(e, copy=False))
+        menu.add_separator()
+        menu.add_command(label="Delete", command=lambda: self._delete_item(e))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def _run_server_op(self, verb: str, fn: t.Callable[..., bool], *args):
+        """Run a server-side file operation, then re-list the folder."""
+        self.status.configure(text=f"{verb}…")
+
+        def done(ok):
+            self.status.configure(text=f"{verb} done" if ok else self.HINT)
+            if not ok:
+                messagebox.showwarning(verb, "The server refused the operation")
+            self.refresh(force=True)
+
+        def failed(ex):
+            self.status.configure(text=self.HINT)
+            if isinstance(ex, ConnectionError):
+                ex = "The connection dropped before the server answered; check the folder to see whether it went through."
+            messagebox.showerror(verb, str(ex))
+            self.refresh(force=True)
+        self.worker.submit(fn, *args, on_done=done, on_error=failed)
+
+    def _rename_item(self, e: dict):
+        name = ctk.CTkInputDialog(text=f"New name for {e['name']}:", title="Rename").get_input()
+        if name:
+            self._run_server_op("Rename", self.backend.rename, f"{self.repo}/{e['path']}", name.strip())
+
+    def _transfer_item(self, e: dict, copy: bool):
+        verb = "Copy" if copy else "Move"
+        dst = ctk.CTkInputDialog(text=f"{verb} {e['name']} to (repo/folder/name):", title=verb).get_input()
+        if dst:
+            self._run_server_op(verb, self.backend.copy if copy else self.backend.move,
+                                f"{self.repo}/{e['path']}", dst.replace("\\", "/").strip().strip("/"))
+
+    def _delete_item(self, e: dict):
+        extra = " and everything in it" if e["is_dir"] else ""
+        if messagebox.askyesno("Delete", f"Delete {e['path']}{extra}? This cannot be undone."):
+            self._run_server_op("Delete", self.backend.delete, f"{self.repo}/{e['path']}")
+
+    def _download_item(self, e: t.Optional[dict]):
+        if e is None or e["path"] is None:
+            return
+        p, fname, isdir = e["path"], self._display_name(e), bool(e["is_dir"])
+        meter = TransferMeter()
+        if isdir:
+            dest_dir = filedialog.askdirectory(title=f"Choose folder to save '{fname}'")
+            if not dest_dir:
+                return
+            self.worker.submit(
+                self.pool.get_dir_to, f"{self.repo}/{p}".strip("/"), dest_dir, bulk=True,
+                on_progress=lambda done, total: self.status.configure(text=f"Downloading {p}… {meter(done, total)}"),
+                on_done=lambda _: self.status.configure(text=f"Downloaded {p}"),
+                on_error=lambda ex: messagebox.showerror("Download", f"Cannot download {p}: {ex}"))
+        else:
+            # Ask first, then stream straight to disk so memory stays flat
+            dst = filedialog.asksaveasfilename(initialfile=e["name"])
+            if not dst:
+                return
 
-            # Add a context menu or double-click to try opening as file if it's marked as directory
-            if is_dir:
-                # Check if it might be a file (no obvious directory indicators)
-                if "." not in name and len(name) < 20:  # Short name without dots might be a file
-                    label = "📁❓ " + name  # Question mark indicates uncertainty
-                else:
-                    label = "📁 " + name
-            else:
-                label = "📄 " + name
-            
-            def create_open_cmd(p=rel_path, isdir=is_dir):
-                if isdir:
-                    return lambda: self._open_dir(p)
+            def done(ok):
+                if ok:
+                    self.status.configure(text=f"Downloaded {p} to {dst}")
                 else:
-                    return lambda: self.on_open_file(p)
-            
-            open_cmd = create_open_cmd()
-
-            row = ctk.CTkFrame(container, fg_color="transparent")
-            row.pack(fill="x", padx=6, pady=2)
-
-            file_btn = ctk.CTkButton(
-                row, text=label, fg_color="transparent", hover_color="#0f172a",
-                anchor="w", command=open_cmd
-            )
-            file_btn.pack(side="left", fill="x", expand=True)
-            
-            # Add right-click context menu for items marked as directories
-            if is_dir:
-                def try_as_file(p=rel_path):
-                    try:
-                        # Try to open as file first
-                        self.on_open_file(p)
-                    except Exception as e:
-                        # If that fails, open as directory
-                        print(f"Failed to open {p} as file, trying as directory: {e}")
-                        self._open_dir(p)
-                
-                # Bind right-click to try opening as file
-                file_btn.bind("<Button-3>", lambda e, p=rel_path: try_as_file(p))
-
-            def do_download(p=rel_path, fname=name, isdir=is_dir):
-                if isdir:
-                    dest_dir = filedialog.askdirectory(title=f"Choose folder to save '{name}'")
-                    if not dest_dir:
-                        return
-                    self.backend.get_dir_to(f"{self.repo}/{p}".strip("/"), dest_dir)
-                else:
-                    data = self.backend.get_file_bytes(self.repo, p)
-                    if data is None:
-                        messagebox.showwarning("Download", f"Cannot download: {p}")
-                        return
-                    dst = filedialog.asksaveasfilename(initialfile=fname)
-                    if not dst:
-                        return
-                    with open(dst, "wb") as f:
-                        f.write(data)
-
-            ctk.CTkButton(
-                row, text="Download", width=100,
-                fg_color=G_ACCENT, hover_color="#1f6feb",
-                command=do_download
-            ).pack(side="right", padx=(6, 0))
-
-        crumb = self.repo + (f" / {self.path}" if self.path else "")
-        self.breadcrumb.configure(text=crumb)
-        #print("DEBUG LIST:", self.repo, self.path, entries)
+                    self.status.configure(text=self.HINT)
+                    messagebox.showwarning("Download", f"Cannot download: {p}")
+            self.worker.submit(
+                self.pool.download_file, self.repo, p, dst, bulk=True,
+                on_progress=lambda done, total: self.status.configure(text=f"Downloading {p}… {meter(done, total)}"),
+                on_done=done,
+                on_error=lambda ex: messagebox.showerror("Download", f"Cannot download {p}: {ex}"))
 
     def _go_up(self):
         if not self.path:
@@ -668,13 +2045,49 @@ class Explorer(ctk.CTkFrame):
         self.refresh()
 
 # ---------- Editor (Tabs + Text) ----------
+EDITOR_PAGE_SIZE = 256 * 1024             # bytes fetched per page of a large file
+EDITOR_FULL_LOAD_LIMIT = 1024 * 1024      # files up to this size are loaded in one go
+BINARY_PREVIEW_BYTES = 4096
+
+class Document:
+    """An open file: how much of it is loaded, and whether it was edited."""
+    def __init__(self, path: str, size: int, first_chunk: bytes, complete: bool):
+        self.path = path
+        self.size = size
+        self.loaded = len(first_chunk)
+        self.complete = complete
+        self.binary = b"\0" in first_chunk[:8192]
+        self.loading = False
+        self.dirty = False
+        self.lossy = False  # not valid UTF-8; saving the shown text would corrupt it
+        # Pages can split a multi-byte character, so decode incrementally
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    @property
+    def read_only(self) -> bool:
+        return self.binary or not self.complete or self.lossy
+
+    def decode(self, data: bytes) -> str:
+        state = self._decoder.getstate()
+        try:
+            return self._decoder.decode(data, final=self.complete)
+        except UnicodeDecodeError:
+            # Show the rest with replacement characters, but never write it back
+            self.lossy = True
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            self._decoder.setstate(state)
+            return self._decoder.decode(data, final=self.complete)
+
 class Editor(ctk.CTkFrame):
-    def __init__(self, master, backend, repo_getter: t.Callable[[], str]):
+    def __init__(self, master, backend, worker: IOWorker, repo_getter: t.Callable[[], str]):
         super().__init__(master, fg_color=G_BG)
         self.backend = backend
+        self.worker = worker
         self.repo_getter = repo_getter
         self.tabs: dict[str, ctk.CTkButton] = {}
+        self.docs: dict[str, Document] = {}
         self.active_path: str = None
+        self.pending: t.Optional[Task] = None
 
         # Tabs bar
         self.tab_bar = ctk.CTkScrollableFrame(self, fg_color=G_PANEL, height=40, corner_radius=15, border_color=G_BORDER, border_width=1, orientation="horizontal")
@@ -689,69 +2102,177 @@ class Editor(ctk.CTkFrame):
         self.status = ctk.CTkLabel(self, text="Ready", text_color=G_SUBTLE)
         self.status.pack(anchor="w", padx=10, pady=6)
 
-        # Bindings
-        self.text.bind("<KeyRelease>", self._on_changed)
+        # Bindings: <<Modified>> also catches mouse pastes, menu cuts and undo
+        self.text.bind("<<Modified>>", self._on_changed)
 
     def open_file(self, path: str):
         repo = self.repo_getter()
         if not repo:
             messagebox.showwarning("Open", "No repository selected")
             return
+        if self.pending:
+            self.pending.cancel()
+        self.status.configure(text=f"Opening {path}…")
+        self.pending = self.worker.submit(
+            self._fetch_document, repo, path,
+            on_progress=lambda done, total: self.status.configure(
+                text=f"Opening {path}… {format_progress(done, total)}"),
+            on_done=lambda result: self._show_document(path, result),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to open {path}: {str(e)}"))
+
+    def _fetch_document(self, repo: str, path: str, progress=None) -> t.Optional[tuple]:
+        """Runs on the I/O worker: small files are fetched whole, large ones only their first page."""
+        info = self.backend.stat(os.path.join(repo, path).replace("\\", "/"))
+        if info is None or info[0] != "FILE":
+            return None
+        if info[1] <= EDITOR_FULL_LOAD_LIMIT:
+            data = self.backend.get_file_bytes(repo, path, progress)
+            if data is None:
+                return None
+            return Document(path, len(data), data, complete=True), data
+        page = self.backend.read_range(repo, path, 0, EDITOR_PAGE_SIZE)
+        if page is None:
+            return None
+        size, data = page
+        return Document(path, size, data, complete=len(data) >= size), data
+
+    def _show_document(self, path: str, result: t.Optional[tuple]):
+        self.pending = None
         try:
-            content = self.backend.get_file(repo, path)
-            if content == "":
+            if result is None:
                 messagebox.showwarning("Open", f"Cannot open: {path}")
                 return
+            doc, data = result
             # Create tab if needed
             if path not in self.tabs:
                 btn = ctk.CTkButton(self.tab_bar, text=path, fg_color=G_BG, hover_color="#0f172a",
                                      corner_radius=6, command=lambda p=path: self.open_file(p))
                 btn.pack(side="left", padx=4, pady=6)
                 self.tabs[path] = btn
+            self.docs[path] = doc
             self._activate(path)
-            self.text.delete("0.0", "end" )
-            self.text.insert("0.0", content)
-            self.status.configure(text=f"Opened {path}")
+            if doc.binary:
+                preview = hex_preview(data[:BINARY_PREVIEW_BYTES])
+                self._set_text(f"Binary file, {human_size(doc.size)} – preview of the first "
+                               f"{min(doc.size, BINARY_PREVIEW_BYTES)} bytes\n\n{preview}", doc)
+            else:
+                self._set_text(doc.decode(data), doc)
+                if not doc.complete:
+                    self.after(200, lambda: self._watch_scroll(doc))
+            self._update_status(doc)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open {path}: {str(e)}")
 
+    def _set_text(self, content: str, doc: Document):
+        self.text.configure(state="normal")
+        self.text.delete("0.0", "end" )
+        self.text.insert("0.0", content)
+        self.text.edit_modified(False)
+        self.text.configure(state="disabled" if doc.read_only else "normal")
+
+    def _watch_scroll(self, doc: Document):
+        """Fetch the next page of a large file once the view nears the end of what is loaded."""
+        if self.docs.get(self.active_path) is not doc or doc.complete:
+            return
+        repo = self.repo_getter()
+        if not doc.loading and repo and self.text.yview()[1] > 0.9:
+            doc.loading = True
+            self.worker.submit(self.backend.read_range, repo, doc.path, doc.loaded, EDITOR_PAGE_SIZE,
+                               on_done=lambda page: self._append_page(doc, page),
+                               on_error=lambda e: self.status.configure(text=f"Failed to load {doc.path}: {e}"))
+        self.after(200, lambda: self._watch_scroll(doc))
+
+    def _append_page(self, doc: Document, page: t.Optional[tuple]):
+        doc.loading = False
+        if self.docs.get(self.active_path) is not doc or page is None:
+            return
+        size, data = page
+        doc.size = size
+        doc.loaded += len(data)
+        doc.complete = doc.loaded >= size or not data
+        self.text.configure(state="normal")
+        self.text.insert("end", doc.decode(data))
+        self.text.edit_modified(False)
+        self.text.configure(state="disabled" if doc.read_only else "normal")
+        self._update_status(doc)
+
+    def _update_status(self, doc: Document):
+        if doc.binary:
+            self.status.configure(text=f"{doc.path} – binary, read-only preview")
+        elif doc.lossy:
+            self.status.configure(text=f"{doc.path} – not valid UTF-8, read-only")
+        elif not doc.complete:
+            self.status.configure(text=f"{doc.path} – loaded {format_progress(doc.loaded, doc.size)}, "
+                                       f"read-only until fully loaded (scroll to load more)")
+        elif doc.dirty:
+            self.status.configure(text=f"Editing {doc.path} – unsaved changes")
+        else:
+            self.status.configure(text=f"Opened {doc.path}")
+
     def _activate(self, path: str):
         self.active_path = path
         for p, b in self.tabs.items():
             b.configure(fg_color=(G_ACCENT if p == path else G_BG))
 
     def _on_changed(self, _event=None):
-        if self.active_path:
-            self.status.configure(text=f"Editing {self.active_path} – Unsaved changes…")
+        doc = self.docs.get(self.active_path)
+        if doc is None or doc.read_only or doc.dirty or not self.text.edit_modified():
+            return
+        doc.dirty = True
+        self._update_status(doc)
 
     def save_active(self):
         repo = self.repo_getter()
         if not (repo and self.active_path):
             return
+        path = self.active_path
+        doc = self.docs.get(path)
+        if doc is not None and doc.read_only:
+            self.status.configure(text=f"{path} is read-only")
+            return
+        if doc is not None and not doc.dirty and not self.text.edit_modified():
+            self.status.configure(text=f"No changes to save in {path}")
+            return
         content = self.text.get("1.0", "end-1c")
-        ok = self.backend.save_file(repo, self.active_path, content)
-        if ok:
-            self.status.configure(text=f"Saved {self.active_path} ✓")
-        else:
-            self.status.configure(text=f"Failed to save {self.active_path}")
+        self.status.configure(text=f"Saving {path}…")
+
+        def done(ok):
+            if ok:
+                # Edits typed while the save was in flight keep the document dirty
+                if doc is not None and self.docs.get(self.active_path) is doc \
+                        and self.text.get("1.0", "end-1c") == content:
+                    doc.dirty = False
+                    self.text.edit_modified(False)
+                self.status.configure(text=f"Saved {path} ✓")
+            else:
+                self.status.configure(text=f"Failed to save {path}")
+        self.worker.submit(self.backend.save_file, repo, path, content, on_done=done,
+                           on_error=lambda e: self.status.configure(text=f"Failed to save {path}: {e}"))
 
 # ---------- Main Views ----------
 class HomeView(ctk.CTkScrollableFrame):
     def __init__(self, master, backend: SocketBackend, on_open_repo: t.Callable[[str], None]):
         super().__init__(master, fg_color=G_BG)
+        self.on_open_repo = on_open_repo
         ctk.CTkLabel(self, text="Overview", font=("Inter", 18, "bold")).pack(anchor="w", padx=8, pady=(8, 4))
-        grid = ctk.CTkFrame(self, fg_color=G_BG)
-        grid.pack(fill="both", expand=False, padx=6, pady=4)
-        grid.grid_columnconfigure((0,1), weight=1)
-        repos = backend.list_repos()
+        self.cards = ctk.CTkFrame(self, fg_color=G_BG)
+        self.cards.pack(fill="both", expand=False, padx=6, pady=4)
+        self.cards.grid_columnconfigure((0,1), weight=1)
+        self.populate(backend.cached_repos())  # last known list, refreshed with the sidebar's
+
+    def populate(self, repos: List[str]):
+        for w in self.cards.winfo_children():
+            w.destroy()
         for i, r in enumerate(repos):
-            card = RepoCard(grid, r, "Remote server", on_open=lambda name=r: on_open_repo(name))
+            card = RepoCard(self.cards, r, "Remote server", on_open=lambda name=r: self.on_open_repo(name))
             card.grid(row=i//2, column=i%2, sticky="ew", padx=6, pady=6)
-    
+
 class ExplorerView(ctk.CTkFrame):
-    def __init__(self, master, backend: SocketBackend):
+    def __init__(self, master, backend: SocketBackend, worker: IOWorker, pool: ConnectionPool):
         super().__init__(master, fg_color=G_BG)
         self.backend = backend
+        self.worker = worker
+        self.pool = pool
 
         # Toolbar
         bar = ctk.CTkFrame(self, fg_color=G_PANEL)
@@ -764,15 +2285,15 @@ class ExplorerView(ctk.CTkFrame):
         split.grid_columnconfigure(1, weight=2, uniform="x")
 
         # Create children inside split
-        self.explorer = Explorer(split, backend, on_open_file=self._open_in_editor)
-        self.editor   = Editor(split, backend, repo_getter=lambda: self.explorer.repo)
+        self.explorer = Explorer(split, backend, worker, pool, on_open_file=self._open_in_editor)
+        self.editor   = Editor(split, backend, worker, repo_getter=lambda: self.explorer.repo)
 
         self.explorer.grid(row=0, column=0, sticky="nsew", padx=(8, 4), pady=8)
         self.editor.grid(row=0, column=1, sticky="nsew", padx=(4, 8), pady=8)
 
         # Toolbar buttons (now bound to self.explorer/self.editor)
         btn_refresh = ctk.CTkButton(bar, text="Refresh", fg_color=G_BG, hover_color="#0f172a",
-                                    command=self.explorer.refresh)
+                                    command=lambda: self.explorer.refresh(force=True))
         btn_refresh.pack(side="left", padx=6, pady=6)
 
         def do_mkdir():
@@ -783,38 +2304,81 @@ class ExplorerView(ctk.CTkFrame):
             if not name:
                 return
             rel = "/".join([p for p in [self.explorer.path, name] if p])
-            backend.mkdir("/".join([self.explorer.repo, rel]).strip("/"))
-            self.explorer.refresh()
+            worker.submit(backend.mkdir, "/".join([self.explorer.repo, rel]).strip("/"),
+                          on_done=lambda _: self.explorer.refresh(),
+                          on_error=lambda e: messagebox.showerror("New folder", str(e)))
 
         def do_put():
             filepath = filedialog.askopenfilename()
             if not filepath:
                 return
+            if not self.explorer.repo:
+                return
             remote_path = "/".join([p for p in [self.explorer.path, os.path.basename(filepath)] if p])
-            full_remote = "/".join([self.explorer.repo, remote_path]).strip("/")
-            try:
-                with open(filepath, "rb") as f:
-                    data = f.read()
-                backend._send(f"PUT {full_remote}")
-                try:
-                    _ = backend.sock.recv(1024)
-                except Exception:
-                    pass
-                backend.sock.sendall(data + b"<EOF>")
-                try:
-                    _ = backend.sock.recv(1024)
-                except Exception:
-                    pass
-            except Exception as e:
-                messagebox.showerror("Upload failed", str(e))
-            self.explorer.refresh()
+            status = self.explorer.status
+
+            def done(ok):
+                if not ok:
+                    messagebox.showerror("Upload failed", f"Server rejected {remote_path}")
+                status.configure(text=f"Uploaded {remote_path}" if ok else Explorer.HINT)
+                self.explorer.refresh()
+            worker.submit(pool.put_file, self.explorer.repo, remote_path, filepath, bulk=True,
+                          on_progress=lambda sent, total: status.configure(
+                              text=f"Uploading {remote_path}… {format_progress(sent, total)}"),
+                          on_done=done,
+                          on_error=lambda e: messagebox.showerror("Upload failed", str(e)))
+
+        def do_put_dir():
+            local_dir = filedialog.askdirectory(title="Choose folder to upload")
+            if not (local_dir and self.explorer.repo):
+                return
+            name = os.path.basename(os.path.normpath(local_dir))
+            remote = "/".join([p for p in [self.explorer.repo, self.explorer.path, name] if p])
+            status = self.explorer.status
+
+            def done(result):
+                text = f"Uploaded {result['uploaded']} files, {result['skipped']} already up to date"
+                if result["failed"]:
+                    text += f", {len(result['failed'])} failed"
+                status.configure(text=text)
+                self.explorer.refresh(force=True)
+            worker.submit(pool.put_dir, local_dir, remote, bulk=True,
+                          on_progress=lambda sent, total: status.configure(
+                              text=f"Uploading {name}… {format_progress(sent, total)}"),
+                          on_done=done,
+                          on_error=lambda e: messagebox.showerror("Upload failed", str(e)))
+
+        def do_sync():
+            local_dir = filedialog.askdirectory(title="Choose folder to sync with this directory")
+            if not (local_dir and self.explorer.repo):
+                return
+            remote = "/".join([p for p in [self.explorer.repo, self.explorer.path] if p])
+            status = self.explorer.status
+
+            def done(result):
+                text = (f"Synced: {result['uploaded']} up, {result['downloaded']} down, "
+                        f"{result['unchanged']} unchanged")
+                if result["conflicts"]:
+                    text += f", {len(result['conflicts'])} conflicts (newer kept)"
+                if result["failed"]:
+                    text += f", {len(result['failed'])} failed"
+                status.configure(text=text)
+                self.explorer.refresh(force=True)
+            worker.submit(pool.sync_dir, local_dir, remote, bulk=True,
+                          on_progress=lambda sent, total: status.configure(
+                              text=f"Syncing {remote}… {format_progress(sent, total)}"),
+                          on_done=done,
+                          on_error=lambda e: messagebox.showerror("Sync failed", str(e)))
 
         def do_getdir():
-            backend.get_dir(self.explorer.path)
+            worker.submit(pool.get_dir, self.explorer.path, bulk=True,
+                          on_error=lambda e: messagebox.showerror("Download Dir", str(e)))
 
         ctk.CTkButton(bar, text="New Folder", fg_color=G_BG, hover_color="#0f172a", command=do_mkdir)	.pack(side="left", padx=6, pady=6)
         ctk.CTkButton(bar, text="Upload File", fg_color=G_BG, hover_color="#0f172a", command=do_put)	.pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(bar, text="Upload Folder", fg_color=G_BG, hover_color="#0f172a", command=do_put_dir)	.pack(side="left", padx=6, pady=6)
         ctk.CTkButton(bar, text="Download Dir", fg_color=G_BG, hover_color="#0f172a", command=do_getdir)	.pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(bar, text="Sync Folder", fg_color=G_BG, hover_color="#0f172a", command=do_sync)	.pack(side="left", padx=6, pady=6)
         ctk.CTkButton(bar, text="Save (Ctrl+S)", fg_color=G_ACCENT, hover_color="#1f6feb",
                       command=self.editor.save_active).pack(side="right", padx=6, pady=6)
 
@@ -824,9 +2388,10 @@ class ExplorerView(ctk.CTkFrame):
         self.editor.open_file(path)
 
 class AccountView(ctk.CTkFrame):
-    def __init__(self, master, backend: SocketBackend):
+    def __init__(self, master, backend: SocketBackend, worker: IOWorker):
         super().__init__(master, fg_color=G_BG)
         self.backend = backend
+        self.worker = worker
         self.selected_repo = None
 
         # Configure grid layout: 3 columns
@@ -886,13 +2451,15 @@ class AccountView(ctk.CTkFrame):
 
 
     def refresh(self):
+        # Get repositories from the server
+        self.worker.submit(self.backend.list_owned_repos, on_done=self._populate,
+                           on_error=lambda e: messagebox.showerror("Account", f"Failed to load repositories: {e}"))
+
+    def _populate(self, repos: List[str]):
         # Clear existing repos
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
 
-        # Get repositories from the server
-        repos = self.backend.list_owned_repos()
-
         for repo in repos:
             repo_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
             repo_frame.pack(pady=5, padx=5, fill="x")
@@ -900,6 +2467,10 @@ class AccountView(ctk.CTkFrame):
             repo_label.pack(side="left", padx=5)
             select_button = ctk.CTkButton(repo_frame, text="Select", command=lambda r=repo: self.select_repo(r))
             select_button.pack(side="right", padx=5)
+            ctk.CTkButton(repo_frame, text="Delete", width=60, fg_color="transparent", text_color="#f85149",
+                          command=lambda r=repo: self.delete_repo(r)).pack(side="right", padx=2)
+            ctk.CTkButton(repo_frame, text="Rename", width=60,
+                          command=lambda r=repo: self.rename_repo(r)).pack(side="right", padx=2)
         
         # Hide the add user frame on refresh
         self.add_user_frame.grid_remove()
@@ -910,17 +2481,45 @@ class AccountView(ctk.CTkFrame):
 
     def add_user(self):
         user_to_add = self.user_to_add_entry.get()
-        if user_to_add and self.selected_repo:
-            if self.backend.add_user_to_repo(self.selected_repo, user_to_add):
-                messagebox.showinfo("Success", f"User {user_to_add} added to {self.selected_repo}")
-            else:
-                messagebox.showerror("Error", f"Failed to add user {user_to_add} to {self.selected_repo}")
+        repo = self.selected_repo
+        if user_to_add and repo:
+            def done(ok):
+                if ok:
+                    messagebox.showinfo("Success", f"User {user_to_add} added to {repo}")
+                else:
+                    messagebox.showerror("Error", f"Failed to add user {user_to_add} to {repo}")
+            self.worker.submit(self.backend.add_user_to_repo, repo, user_to_add, on_done=done,
+                               on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    def rename_repo(self, repo_name):
+        new_name = ctk.CTkInputDialog(text=f"New name for {repo_name}:", title="Rename Repository").get_input()
+        if new_name and new_name.strip():
+            def done(ok):
+                if not ok:
+                    messagebox.showerror("Error", f"Failed to rename {repo_name}")
+                self.refresh()
+            self.worker.submit(self.backend.rename, repo_name, new_name.strip(), on_done=done,
+                               on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    def delete_repo(self, repo_name):
+        if not messagebox.askyesno("Delete Repository", f"Delete {repo_name} and all of its files? This cannot be undone."):
+            return
+        def done(ok):
+            if not ok:
+                messagebox.showerror("Error", f"Failed to delete {repo_name}")
+            self.refresh()
+        self.worker.submit(self.backend.delete, repo_name, on_done=done,
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
 
 # ---------- App ----------
 class App(ctk.CTk):
     def __init__(self, backend: SocketBackend = None):
         super().__init__()
         self.backend = backend or SocketBackend()
+        self.worker = IOWorker(self)
+        self.pool = ConnectionPool(self.backend)
+        self.searcher = IncrementalSearch(self.backend)
+        self.search_task: t.Optional[Task] = None
         self.title("FileNest")
         self.geometry("1100x700")
         self.minsize(900, 560)
@@ -929,7 +2528,6 @@ class App(ctk.CTk):
         dialog = LoginDialog(self, self._on_login, self._on_register)
         dialog.wait_window()
         self.searchFrame = None
-        self.file_buttons = []
         # Layout grid
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(2, weight=1)
@@ -945,7 +2543,9 @@ class App(ctk.CTk):
         self.sidebar.grid(row=2, column=0, sticky="nsw")
         self.sidebar.configure(width=250)
         self.sidebar.grid_propagate(False)
-        self.sidebar.populate_repos(self.backend.list_repos(), self._open_repo_from_sidebar)
+        # Start from the last known repo list and revalidate once the window is up
+        self.sidebar.populate_repos(self.backend.cached_repos(), self._open_repo_from_sidebar)
+        self.after(100, self._refresh_repo_list)
 
         # Main area (stacked views)
         self.stack = ctk.CTkFrame(self, fg_color=G_BG)
@@ -955,8 +2555,8 @@ class App(ctk.CTk):
 
         # Views
         self.view_home = HomeView(self.stack, self.backend, on_open_repo=self._open_repo)
-        self.view_explorer = ExplorerView(self.stack, self.backend)
-        self.view_account = AccountView(self.stack, self.backend)
+        self.view_explorer = ExplorerView(self.stack, self.backend, self.worker, self.pool)
+        self.view_account = AccountView(self.stack, self.backend, self.worker)
 
         # Use explorer/editor created inside ExplorerView
         self.explorer = self.view_explorer.explorer
@@ -968,6 +2568,9 @@ class App(ctk.CTk):
         # Shortcuts
         self.bind_all("<Control-s>", lambda e: self.editor.save_active())
 
+        # Server push instead of polling: listings refresh when something changes
+        self.feed = ChangeFeed(self.backend, self.worker, self._on_change)
+
     # ----- Navigation & helpers -----
     def _show(self, widget: ctk.CTkBaseClass):
         for w in self.stack.winfo_children():
@@ -984,37 +2587,52 @@ class App(ctk.CTk):
             self._show(self.view_account)
 
     def _on_search(self, query: str):
-        if query=="":
-            self.file_buttons.clear()
-            for w in self.searchFrame.winfo_children():
-                w.destroy()
-        if self.searchFrame is None:
-            self.searchFrame = ctk.CTkFrame(self, fg_color="transparent", border_color=G_BORDER,width=1, height=1, border_width=2)
-            self.searchFrame.place(x=5, y=10)
-            self.searchFrame.lift()
+        if self.search_task:
+            self.search_task.cancel()  # a newer query supersedes the one in flight
+            self.search_task = None
+        if query == "":
+            self.searcher.reset()
+            self._hide_search()
+            return
+        self.search_task = self.worker.submit(self.searcher.run, query,
+                                              on_done=lambda result: self._show_search_results(*result))
 
-        for w in self.searchFrame.winfo_children():
-            w.destroy()
-        self.file_buttons.clear()
+    def _make_search_row(self, parent):
+        return ctk.CTkButton(parent, text="", fg_color="transparent", hover_color="#0f172a", corner_radius=0,
+                             anchor="w")
 
+    def _bind_search_row(self, row, path: str):
         max_length = 200
-        filepath = self.backend.search(query)
-
-        if filepath and filepath != "No files found.":
-            for e in filepath:
-                name = e[:max_length]
-
-                row = ctk.CTkFrame(self.searchFrame, fg_color="transparent", corner_radius=0)
-                row.pack(fill="x", padx=6, pady=2)
-
-                file_btn = ctk.CTkButton(
-                    row, text=name, fg_color="transparent", hover_color="#0f172a", corner_radius=0,
-                    anchor="w", command=lambda e=e: self._search_open(e)
-                )
-                file_btn.pack(side="left", fill="x", expand=True)
-                self.file_buttons.append(file_btn)
-    
+        row.configure(text=path[:max_length], command=lambda: self._search_open(path))
+
+    def _show_search_results(self, filepath: List[str], truncated: bool):
+        self.search_task = None
+        if self.searchFrame is None:
+            self.searchFrame = ctk.CTkFrame(self, fg_color=G_PANEL, border_color=G_BORDER, border_width=2)
+            self.search_summary = ctk.CTkLabel(self.searchFrame, text="", text_color=G_SUBTLE, anchor="w")
+            self.search_summary.pack(fill="x", padx=8, pady=(4, 0))
+            self.search_list = VirtualList(self.searchFrame, self._make_search_row, self._bind_search_row,
+                                           row_height=30, fg_color="transparent")
+            self.search_list.pack(fill="both", expand=True, padx=4, pady=4)
+
+        if not filepath:
+            self.search_summary.configure(text="No files found.")
+        elif truncated:
+            self.search_summary.configure(text=f"First {len(filepath)} matches – keep typing to narrow")
+        else:
+            self.search_summary.configure(text=f"{len(filepath)} matches")
+        self.search_list.set_items(filepath)
+        height = 48 + min(len(filepath), 12) * self.search_list.row_height
+        self.searchFrame.place(x=self.top.search.winfo_x(), y=self.top.winfo_height(),
+                               width=max(self.top.search.winfo_width(), 400), height=height)
+        self.searchFrame.lift()
+
+    def _hide_search(self):
+        if self.searchFrame is not None:
+            self.searchFrame.place_forget()
+
     def _search_open(self,file: str):
+        self._hide_search()
         file=file.split("/", 1)
         repo_name = file[0]
         path_in_repo = file[1] if len(file) > 1 else ""
@@ -1041,17 +2659,42 @@ class App(ctk.CTk):
         dialog = LoginDialog(self, self._on_login, self._on_register)
         dialog.wait_window()  # Wait for dialog to close
         if dialog.get_result():
+            self.pool.reset()
+            self.feed.close()
+            self.feed = ChangeFeed(self.backend, self.worker, self._on_change)
             # Update avatar with logged-in user's initials
             if self.backend.name:
                 self.top.update_avatar(self.backend.name)
-            self.sidebar.populate_repos(self.backend.list_repos(), self._open_repo_from_sidebar)
+            self._refresh_repo_list()
+
+    def _on_change(self, kind: str, user: str, path: str):
+        """React to a change event from the server (already removed from the cache)."""
+        repo, _, rel_path = path.partition("/")
+        self.searcher.reset()  # narrowed results may miss new files or list removed ones
+        if kind in ("ADDUSER", "RESYNC", "REPO"):
+            self._refresh_repo_list()
+            if self.view_account.winfo_ismapped():
+                self.view_account.refresh()
+        if kind == "REPO" and repo == self.explorer.repo:
+            self.explorer.repo = None  # renamed or deleted under us
+            self.explorer.refresh(prefetch=False)
+            return
+        if kind == "DELETE" and repo == self.explorer.repo and rel_path \
+                and (self.explorer.path + "/").startswith(rel_path + "/"):
+            self.explorer.open_repo(repo, os.path.dirname(rel_path))  # the open folder went away
+            return
+        if kind == "RESYNC" or (repo == self.explorer.repo and os.path.dirname(rel_path) == self.explorer.path):
+            self.explorer.refresh(force=kind == "RESYNC", prefetch=False)
 
     def _refresh_repo_list(self):
-        try:
-            repos = self.backend.list_repos()
-            self.sidebar.populate_repos(repos, self._open_repo_from_sidebar)
-        except Exception as e:
-            messagebox.showerror("Refresh Error", f"Failed to refresh repositories: {str(e)}")
+        self.worker.submit(
+            self.backend.list_repos, max_age=0,
+            on_done=self._show_repo_list,
+            on_error=lambda e: messagebox.showerror("Refresh Error", f"Failed to refresh repositories: {str(e)}"))
+
+    def _show_repo_list(self, repos: List[str]):
+        self.sidebar.populate_repos(repos, self._open_repo_from_sidebar)
+        self.view_home.populate(repos)
 
     def _on_login(self, username: str, password: str) -> bool:
         return self.backend.login(username, password)
@@ -1068,7 +2711,10 @@ class App(ctk.CTk):
         self._open_repo(name)
 
     def on_closing(self):
+        self.worker.cancel_all()
         try:
+            self.feed.close()
+            self.pool.close()
             self.backend.quit()
         finally:
             self.destroy()
@@ -67,6 +67,21 @@ class DBHandler(BaseDBHandler):
         WHERE (f.ownerHash = ? OR a.accessUser = ?) AND f.fileName = ?
         """, (username, username, file_name)).fetchone() is not None
 
+    def is_owner(self, username, file_name):
+        """Checks if a user owns a file."""
+        return self._execute("SELECT id FROM files WHERE ownerHash = ? AND fileName = ?",
+                             (username, file_name)).fetchone() is not None
+
+    def rename_file(self, file_name, new_name):
+        """Renames a file, keeping its owner and access list."""
+        self._execute("UPDATE files SET fileName = ? WHERE fileName = ?", (new_name, file_name))
+
+    def delete_file(self, file_name):
+        """Deletes a file and its access list."""
+        self._execute("DELETE FROM file_access WHERE fileId IN (SELECT id FROM files WHERE fileName = ?)",
+                      (file_name,))
+        self._execute("DELETE FROM files WHERE fileName = ?", (file_name,))
+
 if __name__ == '__main__':
     db_handler = DBHandler()
     
@@ -0,0 +1,420 @@
+"""Load generator for the FileNet server.
+
+Drives a running server with many concurrent simulated clients over a weighted
+mix of commands and reports per-command latency percentiles, throughput and
+(optionally) server RSS. Results can be saved as a baseline and later runs
+compared against it:
+
+    python LoadTest.py --user Admin --password 1 --repo hi --clients 8 --duration 30 \\
+        --mix LIST=4,SEARCH=2,GET=3,PUT=1,GETDIR=0.2,LOGIN=0.5 --save-baseline base.json
+    python LoadTest.py ... --baseline base.json
+
+The server only accepts MAX_REQUESTS_PER_MINUTE new connections per IP, so
+raise that limit before running with more clients than it allows.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import select
+import socket
+import sys
+import threading
+import time
+
+DEFAULT_MIX = "LIST=4,SEARCH=2,GET=3,PUT=1,GETDIR=0.2,LOGIN=0.5"
+RECV_SIZE = 64 * 1024
+DRAIN_SECONDS = 0.01  # unframed replies (LIST, GETREPOS) end when the server goes quiet this long
+SIZED_COMMANDS = {"GET", "SEARCH", "TREE", "MANIFEST", "METRICS"}
+GETMANY_FILES = 20  # paths per GETMANY in the mix
+
+
+class LeanClient:
+    """Minimal FileNet protocol client with no GUI dependencies.
+
+    request() sends one command line and reads exactly its reply, using the
+    framing of each command, and returns (status, bytes_received). For
+    replies without a size header, received_at records when the last byte
+    arrived, so the idle wait at the end is not counted as latency.
+    """
+    def __init__(self, host="127.0.0.1", port=2122, timeout=30.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buf = bytearray()
+        self.received_at = 0.0
+        self.banner = self.read_line()
+        if self.banner.startswith(("503", "429")):
+            self.sock.close()
+            raise ConnectionRefusedError(self.banner)
+
+    def _fill(self):
+        chunk = self.sock.recv(RECV_SIZE)
+        if not chunk:
+            raise ConnectionError("Server closed the connection")
+        self.buf += chunk
+        self.received_at = time.perf_counter()
+
+    def read_line(self):
+        while b"\n" not in self.buf:
+            self._fill()
+        line, _, rest = bytes(self.buf).partition(b"\n")
+        self.buf = bytearray(rest)
+        return line.decode(errors="ignore").strip()
+
+    def read_exact(self, size):
+        """Read and discard size bytes; returns how many were read."""
+        remaining = size
+        while remaining > 0:
+            if not self.buf:
+                self._fill()
+            taken = min(remaining, len(self.buf))
+            del self.buf[:taken]
+            remaining -= taken
+        return size
+
+    def read_bytes(self, size):
+        data = bytearray()
+        while len(data) < size:
+            if not self.buf:
+                self._fill()
+            taken = bytes(self.buf[:size - len(data)])
+            del self.buf[:len(taken)]
+            data += taken
+        return bytes(data)
+
+    def fetch(self, line):
+        """Send a command with a sized reply and return (status_line, body)."""
+        self.send_line(line)
+        status = self.read_line()
+        parts = status.split(" ")
+        if status.startswith("200") and len(parts) > 2 and parts[2].isdigit():
+            return status, self.read_bytes(int(parts[2]))
+        return status, b""
+
+    def drain(self):
+        """Read until the server goes quiet; returns how many bytes arrived."""
+        if not self.buf:
+            self._fill()
+        total = len(self.buf)
+        self.buf.clear()
+        while select.select([self.sock], [], [], DRAIN_SECONDS)[0]:
+            before = len(self.buf)
+            self._fill()
+            total += len(self.buf) - before
+            self.buf.clear()
+        return total
+
+    def send_line(self, line):
+        self.sock.sendall(line.encode() + b"\n")
+
+    def request(self, line, body=None):
+        """Send one command and consume its whole reply. body is the UPLOAD payload
+        or the GETMANY path list."""
+        cmd = line.split(" ", 1)[0].upper()
+        self.send_line(line)
+        status = self.read_line()
+        if cmd in ("LIST", "GETREPOS"):
+            # Unsized replies: the status line, then whatever else arrives before the server goes quiet
+            received = len(status) + 1 + (self.drain() if status.startswith("200") else 0)
+            return status[:3], received
+        received = len(status) + 1
+        parts = status.split(" ")
+        if not status.startswith("200"):
+            return status[:3], received
+        if cmd in SIZED_COMMANDS and len(parts) > 2 and parts[2].isdigit():
+            received += self.read_exact(int(parts[2]))
+        elif cmd == "READ" and len(parts) > 3 and parts[3].isdigit():
+            received += self.read_exact(int(parts[3]))
+        elif cmd == "STAT":
+            received += len(self.read_line()) + 1
+        elif cmd == "GETDIR":
+            while True:
+                header = self.read_line()
+                received += len(header) + 1
+                if header == "DONE" or not header.startswith("FILE "):
+                    break
+                received += self.read_exact(int(header.rsplit(" ", 1)[1]))
+        elif cmd == "UPLOAD":
+            self.sock.sendall(body or b"")
+            status = self.read_line()
+            received += len(status) + 1
+        elif cmd == "GETMANY":
+            self.sock.sendall(body or b"")
+            status = self.read_line()
+            received += len(status) + 1
+            while status.startswith("200"):
+                header = self.read_line()
+                received += len(header) + 1
+                if header == "DONE" or not header.startswith("ITEM "):
+                    break
+                _, item_status, size, _ = header.split(" ", 3)
+                if item_status == "200":
+                    received += self.read_exact(int(size))
+        return status[:3], received
+
+    def login(self, username, password):
+        digest = hashlib.sha256(password.encode()).hexdigest()
+        return self.request(f"LOGIN {username}_{digest}")[0] == "200"
+
+    def close(self):
+        try:
+            self.send_line("QUIT")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip().upper()
+        if name not in ("LOGIN", "LIST", "SEARCH", "GET", "GETMANY", "PUT", "GETDIR"):
+            raise ValueError(f"Unknown command in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def read_rss(pid):
+    """Resident set size of a process in bytes, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class Workload:
+    """Turns a mix into concrete command lines against one repository."""
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.names = list(self.mix)
+        self.weights = [self.mix[name] for name in self.names]
+        self.payload = os.urandom(args.file_size)
+        self.files = []
+        self.getdir_path = args.getdir_path or f"{args.repo}/loadtest"
+
+    def prepare(self, client):
+        """Seed files if needed and learn what exists under the repo."""
+        for i in range(self.args.seed):
+            client.request(f"UPLOAD {len(self.payload)} {self.args.repo}/loadtest/seed-{i}.bin", self.payload)
+        status, body = client.fetch(f"TREE {self.args.repo}")
+        for line in body.decode(errors="ignore").split("\n"):
+            if line:
+                self.files.append(line.split(" ", 1)[1])
+
+    def next(self, rng, client_id, counter):
+        """Return (op, line, body) for the next request."""
+        op = rng.choices(self.names, self.weights)[0]
+        repo = self.args.repo
+        if op == "LOGIN":
+            digest = hashlib.sha256(self.args.password.encode()).hexdigest()
+            return op, f"LOGIN {self.args.user}_{digest}", None
+        if op == "LIST":
+            return op, f"LIST {repo}", None
+        if op == "SEARCH":
+            if self.files:
+                name = os.path.basename(rng.choice(self.files))
+                term = name[:max(1, len(name) // 2)]
+            else:
+                term = "a"
+            return op, f"SEARCH {term}", None
+        if op == "GET" and self.files:
+            return op, f"GET {rng.choice(self.files)}", None
+        if op == "GETMANY" and self.files:
+            paths = "\n".join(rng.sample(self.files, min(GETMANY_FILES, len(self.files)))).encode()
+            return op, f"GETMANY {len(paths)}", paths
+        if op == "GETDIR":
+            return op, f"GETDIR {self.getdir_path}", None
+        # PUT, or GET before any file exists to read
+        path = f"{repo}/loadtest/client{client_id}-{counter % 16}.bin"
+        return "PUT", f"UPLOAD {len(self.payload)} {path}", self.payload
+
+
+def run_client(client_id, args, workload, deadline, samples, errors, lock):
+    rng = random.Random(args.random_seed + client_id)
+    try:
+        client = LeanClient(args.host, args.port)
+        if not client.login(args.user, args.password):
+            with lock:
+                errors["LOGIN"] = errors.get("LOGIN", 0) + 1
+            return
+    except OSError:
+        with lock:
+            errors["CONNECT"] = errors.get("CONNECT", 0) + 1
+        return
+    counter = 0
+    try:
+        while time.perf_counter() < deadline:
+            op, line, body = workload.next(rng, client_id, counter)
+            counter += 1
+            start = time.perf_counter()
+            try:
+                status, received = client.request(line, body)
+            except OSError:
+                with lock:
+                    errors[op] = errors.get(op, 0) + 1
+                return
+            latency = client.received_at - start
+            sent = len(line) + 1 + (len(body) if body else 0)
+            with lock:
+                samples.append((op, latency, sent + received))
+                if status not in ("200", "201"):
+                    errors[op] = errors.get(op, 0) + 1
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000.0)
+    finally:
+        client.close()
+
+
+def summarize(samples, errors, elapsed):
+    by_op = {}
+    for op, latency, nbytes in samples:
+        entry = by_op.setdefault(op, {"latencies": [], "bytes": 0})
+        entry["latencies"].append(latency)
+        entry["bytes"] += nbytes
+    result = {"elapsed": elapsed, "requests": len(samples),
+              "throughput": len(samples) / elapsed if elapsed else 0.0,
+              "errors": dict(errors), "commands": {}}
+    for op, entry in sorted(by_op.items()):
+        latencies = sorted(entry["latencies"])
+        result["commands"][op] = {
+            "count": len(latencies),
+            "errors": errors.get(op, 0),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "mb_per_second": entry["bytes"] / elapsed / 1e6 if elapsed else 0.0,
+        }
+    return result
+
+
+def print_report(result):
+    print(f"{'command':<8} {'count':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'req/s':>9} {'MB/s':>8}")
+    for op, stats in result["commands"].items():
+        print(f"{op:<8} {stats['count']:>8} {stats['errors']:>7} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+              f"{stats['max_ms']:>9.2f} {stats['per_second']:>9.1f} {stats['mb_per_second']:>8.2f}")
+    print(f"total: {result['requests']} requests in {result['elapsed']:.1f}s = {result['throughput']:.1f} req/s")
+    if result["errors"]:
+        print(f"errors: {result['errors']}")
+    if result.get("rss"):
+        rss = result["rss"]
+        print(f"server RSS: start {rss['start'] / 1e6:.1f} MB, peak {rss['peak'] / 1e6:.1f} MB, "
+              f"end {rss['end'] / 1e6:.1f} MB")
+
+
+def compare(result, baseline, tolerance):
+    """Print per-command changes against a baseline; returns the regressions found."""
+    regressions = []
+    print(f"\nvs baseline (tolerance {tolerance:.0%}):")
+    for op, stats in result["commands"].items():
+        old = baseline.get("commands", {}).get(op)
+        if not old:
+            print(f"{op:<8} new")
+            continue
+        changes = []
+        for key, higher_is_worse in (("p50_ms", True), ("p99_ms", True), ("per_second", False)):
+            if not old[key]:
+                continue
+            delta = stats[key] / old[key] - 1
+            worse = delta > tolerance if higher_is_worse else delta < -tolerance
+            changes.append(f"{key} {old[key]:.2f} -> {stats[key]:.2f} ({delta:+.0%}){' REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{op} {key}")
+        print(f"{op:<8} " + ", ".join(changes))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a FileNet server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2122)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--repo", required=True, help="repository the user can access")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted commands, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="bytes per PUT")
+    parser.add_argument("--seed", type=int, default=0, help="files to upload before the run")
+    parser.add_argument("--getdir-path", default=None, help="directory for GETDIR (default <repo>/loadtest)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between requests per client")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, default=None, help="sample this process's RSS")
+    parser.add_argument("--json", default=None, help="write the results here")
+    parser.add_argument("--save-baseline", default=None, help="write the results as a baseline")
+    parser.add_argument("--baseline", default=None, help="compare against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    workload = Workload(args)
+    setup = LeanClient(args.host, args.port)
+    if not setup.login(args.user, args.password):
+        print("Login failed", file=sys.stderr)
+        return 2
+    workload.prepare(setup)
+    setup.close()
+
+    samples, errors, lock = [], {}, threading.Lock()
+    rss = {"start": None, "peak": 0, "end": None}
+    stop = threading.Event()
+
+    def sample_rss():
+        while not stop.wait(0.5):
+            value = read_rss(args.server_pid)
+            if value:
+                rss["peak"] = max(rss["peak"], value)
+
+    if args.server_pid:
+        rss["start"] = rss["peak"] = read_rss(args.server_pid) or 0
+        threading.Thread(target=sample_rss, daemon=True).start()
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=run_client, args=(i, args, workload, deadline, samples, errors, lock))
+               for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    result = summarize(samples, errors, elapsed)
+    result["config"] = {"clients": args.clients, "duration": args.duration, "mix": args.mix,
+                        "file_size": args.file_size}
+    if args.server_pid:
+        rss["end"] = read_rss(args.server_pid) or 0
+        rss["peak"] = max(rss["peak"], rss["end"])
+        result["rss"] = rss
+    print_report(result)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
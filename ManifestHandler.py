@@ -0,0 +1,63 @@
+from BaseDBHandler import BaseDBHandler
+
+class ManifestHandler(BaseDBHandler):
+    def __init__(self, db_name="ManifestDB.sqlite"):
+        super().__init__(db_name)
+        self.create_tables()
+
+    def create_tables(self):
+        self._execute("""
+        CREATE TABLE IF NOT EXISTS manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+        """)
+
+    def get_hash(self, path):
+        """Returns (size, mtime, sha256) recorded for a file, or None."""
+        return self._execute("SELECT size, mtime, sha256 FROM manifest WHERE path = ?", (path,)).fetchone()
+
+    def get_hashes(self, prefix):
+        """Returns {path: (size, mtime, sha256)} for every file under prefix."""
+        # "/" sorts right before "0", so this range is exactly prefix/... and uses the primary key
+        rows = self._execute("""
+        SELECT path, size, mtime, sha256
+        FROM manifest
+        WHERE path >= ? AND path < ?
+        """, (prefix + "/", prefix + "0")).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def set_hash(self, path, size, mtime, sha256):
+        self._execute("INSERT OR REPLACE INTO manifest (path, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                      (path, size, mtime, sha256))
+
+    def delete_hash(self, path):
+        self._execute("DELETE FROM manifest WHERE path = ?", (path,))
+
+    def move_prefix(self, old, new):
+        """Re-keys the entry for old and every entry under old/ to new."""
+        self._execute("UPDATE OR REPLACE manifest SET path = ? WHERE path = ?", (new, old))
+        self._execute("""
+        UPDATE OR REPLACE manifest SET path = ? || substr(path, ?)
+        WHERE path >= ? AND path < ?
+        """, (new, len(old) + 1, old + "/", old + "0"))
+
+    def copy_prefix(self, old, new):
+        """Copies the entry for old and every entry under old/ to new; only valid
+        when the copies keep the originals' size and mtime."""
+        self._execute("""
+        INSERT OR REPLACE INTO manifest (path, size, mtime, sha256)
+        SELECT ?, size, mtime, sha256 FROM manifest WHERE path = ?
+        """, (new, old))
+        self._execute("""
+        INSERT OR REPLACE INTO manifest (path, size, mtime, sha256)
+        SELECT ? || substr(path, ?), size, mtime, sha256 FROM manifest
+        WHERE path >= ? AND path < ?
+        """, (new, len(old) + 1, old + "/", old + "0"))
+
+    def delete_prefix(self, path):
+        """Deletes the entry for path and every entry under path/."""
+        self._execute("DELETE FROM manifest WHERE path = ?", (path,))
+        self._execute("DELETE FROM manifest WHERE path >= ? AND path < ?", (path + "/", path + "0"))
@@ -0,0 +1,169 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+
+    def cumulative(self):
+        """Returns [(bound, count)] with counts summed up to each bound."""
+        running = 0
+        result = []
+        for bound, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += n
+            result.append((bound, running))
+        return result
+
+
+class Metrics:
+    """Thread-safe in-process counters for the server.
+
+    Tracks per-command calls, errors and latency, bytes in and out, sessions
+    and DB query timings. render() produces Prometheus text, served by the
+    METRICS command and, optionally, by serve_http().
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.commands = {}  # cmd -> {"calls", "errors", "latency"}
+        self.queries = {}  # (handler, verb) -> Histogram
+        self.gauges = {}  # name -> callable returning the current value
+        self.counters = {}  # name -> running total
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.sessions_active = 0
+        self.sessions_total = 0
+
+    def observe_command(self, cmd, seconds, failed=False):
+        with self.lock:
+            stats = self.commands.get(cmd)
+            if stats is None:
+                stats = self.commands[cmd] = {"calls": 0, "errors": 0, "latency": Histogram()}
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["latency"].observe(seconds)
+
+    def observe_query(self, handler, query, seconds):
+        verb = query.lstrip().split(None, 1)[0].upper() if query.strip() else "?"
+        with self.lock:
+            histogram = self.queries.get((handler, verb))
+            if histogram is None:
+                histogram = self.queries[(handler, verb)] = Histogram()
+            histogram.observe(seconds)
+
+    def add_bytes_in(self, n):
+        with self.lock:
+            self.bytes_in += n
+
+    def add_bytes_out(self, n):
+        with self.lock:
+            self.bytes_out += n
+
+    def session_opened(self):
+        with self.lock:
+            self.sessions_active += 1
+            self.sessions_total += 1
+
+    def session_closed(self):
+        with self.lock:
+            self.sessions_active -= 1
+
+    def count(self, name, n=1):
+        """Add n to the counter exposed as filenet_<name>_total."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def register_gauge(self, name, read):
+        """Expose read() as filenet_<name> every time metrics are rendered."""
+        with self.lock:
+            self.gauges[name] = read
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            lines = [
+                "# TYPE filenet_uptime_seconds gauge",
+                f"filenet_uptime_seconds {time.time() - self.started:.3f}",
+                "# TYPE filenet_bytes_in_total counter",
+                f"filenet_bytes_in_total {self.bytes_in}",
+                "# TYPE filenet_bytes_out_total counter",
+                f"filenet_bytes_out_total {self.bytes_out}",
+                "# TYPE filenet_sessions_active gauge",
+                f"filenet_sessions_active {self.sessions_active}",
+                "# TYPE filenet_sessions_total counter",
+                f"filenet_sessions_total {self.sessions_total}",
+                "# TYPE filenet_command_calls_total counter",
+            ]
+            for cmd, stats in sorted(self.commands.items()):
+                lines.append(f'filenet_command_calls_total{{command="{cmd}"}} {stats["calls"]}')
+            lines.append("# TYPE filenet_command_errors_total counter")
+            for cmd, stats in sorted(self.commands.items()):
+                lines.append(f'filenet_command_errors_total{{command="{cmd}"}} {stats["errors"]}')
+            lines.append("# TYPE filenet_command_seconds histogram")
+            for cmd, stats in sorted(self.commands.items()):
+                lines.extend(_histogram_lines("filenet_command_seconds", f'command="{cmd}"', stats["latency"]))
+            lines.append("# TYPE filenet_db_query_seconds histogram")
+            for (handler, verb), histogram in sorted(self.queries.items()):
+                lines.extend(_histogram_lines("filenet_db_query_seconds",
+                                              f'handler="{handler}",query="{verb}"', histogram))
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE filenet_{name}_total counter")
+                lines.append(f"filenet_{name}_total {value}")
+            gauges = list(self.gauges.items())
+        for name, read in gauges:
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# TYPE filenet_{name} gauge")
+            lines.append(f"filenet_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_http(self, host, port):
+        """Serve render() at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _histogram_lines(name, labels, histogram):
+    lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
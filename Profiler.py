@@ -0,0 +1,95 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+
+class Profiler:
+    """Opt-in cProfile wrapper for command handlers, switchable at runtime.
+
+    While enabled, calls matching the chosen command and user are profiled with
+    the given probability, and their stats are merged per command until dump()
+    writes them to disk. Only one call is profiled at a time (newer Pythons
+    allow a single active profiler per interpreter); overlapping calls simply
+    run unprofiled.
+    """
+    def __init__(self, dump_dir="profiles"):
+        self.dump_dir = dump_dir
+        self.enabled = False
+        self.command = None
+        self.user = None
+        self.fraction = 1.0
+        self.lock = threading.Lock()
+        self.active = threading.Lock()
+        self.stats = {}  # cmd -> pstats.Stats
+        self.calls = {}  # cmd -> number of profiled calls
+
+    def start(self, command=None, user=None, fraction=1.0):
+        """Profile command (None for all) for user (None for all) on a fraction of calls."""
+        with self.lock:
+            self.command = command.upper() if command else None
+            self.user = user
+            self.fraction = max(0.0, min(1.0, fraction))
+            self.enabled = True
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+
+    def status(self):
+        with self.lock:
+            if not self.enabled:
+                state = "off"
+            else:
+                state = f"on command={self.command or '*'} user={self.user or '*'} fraction={self.fraction}"
+            collected = ",".join(f"{cmd}:{n}" for cmd, n in sorted(self.calls.items())) or "-"
+            return f"{state} collected={collected}"
+
+    def _wanted(self, cmd, user):
+        if self.command is not None and cmd != self.command:
+            return False
+        if self.user is not None and user != self.user:
+            return False
+        return self.fraction >= 1.0 or random.random() < self.fraction
+
+    def call(self, cmd, user, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs), profiling it if the current settings select it."""
+        if not self.enabled or not self._wanted(cmd, user) or not self.active.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            self.active.release()
+            with self.lock:
+                if cmd in self.stats:
+                    self.stats[cmd].add(profile)
+                else:
+                    self.stats[cmd] = pstats.Stats(profile)
+                self.calls[cmd] = self.calls.get(cmd, 0) + 1
+
+    def dump(self, limit=30):
+        """Write collected stats per command (.pstats plus a .txt summary) and reset them.
+
+        Returns the paths written.
+        """
+        with self.lock:
+            collected, calls = self.stats, self.calls
+            self.stats, self.calls = {}, {}
+        os.makedirs(self.dump_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        for cmd, stats in sorted(collected.items()):
+            base = os.path.join(self.dump_dir, f"{cmd}-{stamp}")
+            stats.dump_stats(base + ".pstats")
+            summary = io.StringIO()
+            stats.stream = summary
+            summary.write(f"{cmd}: {calls[cmd]} profiled calls\n")
+            stats.sort_stats("cumulative").print_stats(limit)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(summary.getvalue())
+            paths.extend([base + ".pstats", base + ".txt"])
+        return paths
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class Recorder:
+    """Appends one JSON line per executed command to a capture file.
+
+    Each record has the session id, start offset (seconds since recording
+    began), user, command, arguments (redacted for credentials), duration,
+    bytes in/out and reply status. With bodies on, each uploaded file is also
+    copied beside the capture so Replay.py can send the same payload.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.bodies_dir = None
+        self.started = 0.0
+        self.count = 0
+
+    @property
+    def enabled(self):
+        return self.file is not None
+
+    def start(self, path, bodies=False):
+        with self.lock:
+            self._close()
+            self.path = path
+            self.file = open(path, "a", encoding="utf-8")
+            self.bodies_dir = path + ".bodies" if bodies else None
+            if self.bodies_dir:
+                os.makedirs(self.bodies_dir, exist_ok=True)
+            self.started = time.monotonic()
+            self.count = 0
+
+    def stop(self):
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def status(self):
+        if not self.enabled:
+            return "off"
+        return f"on path={self.path} bodies={'yes' if self.bodies_dir else 'no'} records={self.count}"
+
+    def record(self, session, user, cmd, args, started, duration, bytes_in, bytes_out, status, body_path=None):
+        """Write one command; started is a time.monotonic() value."""
+        entry = {"session": session, "t": round(started - self.started, 6), "user": user, "cmd": cmd,
+                 "args": args, "duration": round(duration, 6), "bytes_in": bytes_in,
+                 "bytes_out": bytes_out, "status": status}
+        with self.lock:
+            if self.file is None:
+                return
+            if self.bodies_dir and body_path and os.path.isfile(body_path):
+                body_name = f"{self.count}.bin"
+                shutil.copyfile(body_path, os.path.join(self.bodies_dir, body_name))
+                entry["body"] = body_name
+            self.file.write(json.dumps(entry) + "\n")
+            self.count += 1
+            if self.count % 100 == 0:
+                self.file.flush()
@@ -0,0 +1,177 @@
+"""Replays a traffic capture (RECORD on the server) against a FileNet server.
+
+Every recorded session gets its own connection, opened at the session's first
+recorded offset; each command is sent at its recorded offset (divided by
+--speed), so concurrency and pacing match the original workload. Passwords are
+never recorded, so LOGIN uses --password for the recorded user (or --user to
+log every session in as one account); session tokens aren't either, so RESUME
+is replayed as that same LOGIN. Uploads send the captured body when the
+capture has one, otherwise random bytes of the recorded size.
+
+Recorded times are server-side handler durations, replayed ones are client
+round trips; for like-for-like numbers, RECORD on the target server during
+the replay and compare the two captures.
+
+    python Replay.py recordings/peak.jsonl --password 1 --speed 2 --json replay.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from LoadTest import LeanClient, percentile
+
+SKIPPED_COMMANDS = {"SUBSCRIBE", "QUIT", "RECORD", "PROFILE", "SESSIONS",  # streams and admin switches
+                    "GETMANY"}  # its path list isn't captured
+
+
+def load_sessions(path):
+    """Returns {session: [record, ...]} in recorded order."""
+    sessions = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                sessions.setdefault(entry["session"], []).append(entry)
+    for records in sessions.values():
+        records.sort(key=lambda entry: entry["t"])
+    return sessions
+
+
+class Replayer:
+    def __init__(self, args, sessions):
+        self.args = args
+        self.sessions = sessions
+        self.bodies_dir = args.capture + ".bodies"
+        self.lock = threading.Lock()
+        self.results = []  # (cmd, recorded seconds, replayed seconds, lag seconds, ok)
+        self.errors = 0
+
+    def _body(self, entry):
+        if "body" in entry:
+            try:
+                with open(os.path.join(self.bodies_dir, entry["body"]), "rb") as f:
+                    return f.read()
+            except OSError:
+                pass
+        size = int(entry["args"].split(" ", 1)[0]) if entry["cmd"] == "UPLOAD" else entry["bytes_in"]
+        return os.urandom(max(0, size))
+
+    def _line(self, entry):
+        """The command line to send, or None to skip the record."""
+        cmd = entry["cmd"]
+        if cmd in SKIPPED_COMMANDS:
+            return None, None
+        if cmd in ("LOGIN", "RESUME"):
+            # Tokens are redacted too, so a resumed session logs in as its recorded user
+            user = self.args.user or entry["user"]
+            if not user:
+                return None, None  # a failed login or resume; nothing to reproduce
+            return "LOGIN", user
+        if cmd == "REGISTER":
+            return None, None
+        if cmd in ("PUT", "UPLOAD"):
+            body = self._body(entry)
+            path = entry["args"] if cmd == "PUT" else entry["args"].split(" ", 1)[1]
+            return f"UPLOAD {len(body)} {path}", body
+        return f"{cmd} {entry['args']}".strip(), None
+
+    def run_session(self, records, origin):
+        speed = self.args.speed
+        client = None
+        try:
+            for entry in records:
+                line, body = self._line(entry)
+                if line is None:
+                    continue
+                due = origin + entry["t"] / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if client is None:
+                    client = LeanClient(self.args.host, self.args.port)
+                start = time.perf_counter()
+                if line == "LOGIN":
+                    ok = client.login(body, self.args.password)
+                else:
+                    status, _ = client.request(line, body)
+                    ok = status == (entry["status"] or status)
+                elapsed = client.received_at - start
+                with self.lock:
+                    self.results.append((entry["cmd"], entry["duration"], elapsed, max(0.0, start - due), ok))
+        except OSError:
+            with self.lock:
+                self.errors += 1
+        finally:
+            if client is not None:
+                client.close()
+
+    def run(self):
+        origin = time.perf_counter() + 0.1
+        threads = [threading.Thread(target=self.run_session, args=(records, origin), daemon=True)
+                   for records in self.sessions.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - origin
+
+
+def summarize(results, elapsed, errors):
+    by_cmd = {}
+    for cmd, recorded, replayed, lag, ok in results:
+        entry = by_cmd.setdefault(cmd, {"recorded": [], "replayed": [], "lag": [], "mismatches": 0})
+        entry["recorded"].append(recorded)
+        entry["replayed"].append(replayed)
+        entry["lag"].append(lag)
+        entry["mismatches"] += 0 if ok else 1
+    report = {"elapsed": elapsed, "commands": {}, "session_errors": errors}
+    for cmd, entry in sorted(by_cmd.items()):
+        recorded, replayed, lag = sorted(entry["recorded"]), sorted(entry["replayed"]), sorted(entry["lag"])
+        report["commands"][cmd] = {
+            "count": len(replayed),
+            "status_mismatches": entry["mismatches"],
+            "recorded_p50_ms": percentile(recorded, 0.5) * 1000,
+            "recorded_p99_ms": percentile(recorded, 0.99) * 1000,
+            "replayed_p50_ms": percentile(replayed, 0.5) * 1000,
+            "replayed_p99_ms": percentile(replayed, 0.99) * 1000,
+            "lag_p99_ms": percentile(lag, 0.99) * 1000,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a FileNet traffic capture.")
+    parser.add_argument("capture", help="JSON-lines file written by RECORD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2122)
+    parser.add_argument("--user", default=None, help="log every session in as this user")
+    parser.add_argument("--password", required=True, help="password for the replayed logins")
+    parser.add_argument("--speed", type=float, default=1.0, help="2 replays twice as fast")
+    parser.add_argument("--json", default=None, help="write the report here")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.capture)
+    replayer = Replayer(args, sessions)
+    elapsed = replayer.run()
+    report = summarize(replayer.results, elapsed, replayer.errors)
+
+    print(f"{len(sessions)} sessions, {len(replayer.results)} commands in {elapsed:.1f}s")
+    print(f"{'command':<10} {'count':>7} {'rec p50':>9} {'rep p50':>9} {'rec p99':>9} {'rep p99':>9} "
+          f"{'lag p99':>9} {'status!=':>9}")
+    for cmd, stats in report["commands"].items():
+        print(f"{cmd:<10} {stats['count']:>7} {stats['recorded_p50_ms']:>9.2f} {stats['replayed_p50_ms']:>9.2f} "
+              f"{stats['recorded_p99_ms']:>9.2f} {stats['replayed_p99_ms']:>9.2f} {stats['lag_p99_ms']:>9.2f} "
+              f"{stats['status_mismatches']:>9}")
+    if replayer.errors:
+        print(f"{replayer.errors} sessions ended with a connection error")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
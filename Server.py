@@ -1,61 +1,433 @@
 import socket
 import os
+import hashlib
+import hmac
+import contextlib
 import threading
 import time
 import re
+import random
+import logging
+import logging.handlers
+import queue
+import select
+import selectors
+import shutil
+import itertools
+import signal
+import subprocess
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from DBHandler import DBHandler
 from UserHandler import UserHandler
+from ManifestHandler import ManifestHandler
+from BaseDBHandler import BaseDBHandler
+from Metrics import Metrics
+from Profiler import Profiler
+from Recorder import Recorder
+from SessionSocket import SessionSocket
+from TransferScheduler import TransferScheduler
 
 HOST = '127.0.0.1'
 PORT = 2122
 BASE_DIR = "ftp_root"
 DEBUG = True
-MAX_REQUESTS_PER_MINUTE = 15
+MAX_REQUESTS_PER_MINUTE = 15  # new connections per IP per minute; a successful RESUME hands its one back
+# Sessions only hold a worker while they are running commands: one that stays quiet
+# for PARK_AFTER seconds is parked on a selector thread until its next command, and
+# SUBSCRIBE feeds run on threads of their own. So MAX_SESSIONS bounds concurrent
+# commands, not connections; a GUI client keeps 2 + POOL_SIZE connections open but
+# uses at most 1 + POOL_SIZE workers, and only while those run commands.
+MAX_SESSIONS = 64  # session worker threads, i.e. commands running at once
+PARK_AFTER = 0.01  # seconds a worker waits for a session's next command before parking it
+MAX_FEEDS = 1024  # SUBSCRIBE change feeds open at once; more get 503
+ACCEPT_QUEUE_SIZE = 128  # new connections waiting for a free worker; beyond this they get 503
+ACCEPT_QUEUE_TIMEOUT = 10.0  # seconds a connection may wait for a worker before it gets 503
+IDLE_TIMEOUT = 300  # seconds a session may sit between commands before it is closed
+READ_TIMEOUT = 30  # seconds a single recv may stall while a command is running (e.g. an upload body)
+WRITE_TIMEOUT = 60  # seconds a single send may stall on a client that isn't reading
+MIN_UPLOAD_RATE = 16 * 1024  # bytes/second an upload must average, so a trickle can't hold a worker
+KEEPALIVE_IDLE = 60  # TCP keepalive: probe after this many idle seconds,
+KEEPALIVE_INTERVAL = 15  # every this many seconds,
+KEEPALIVE_COUNT = 4  # and drop the peer after this many unanswered probes
+REAPER_INTERVAL = 30  # seconds between sweeps for sessions that outlived every deadline
+DRAIN_TIMEOUT = 60  # on SIGTERM/SIGHUP, seconds running commands get to finish before sessions are cut
+HANDOFF_TIMEOUT = 30  # seconds the SIGHUP successor gets to start serving before the handoff is abandoned
+ACCEPT_POLL_SECONDS = 0.5  # how often the accept loop checks for a shutdown request
+CHUNK_SIZE = 64 * 1024
+MAX_SEARCH_RESULTS = 1000
+MAX_READ_LENGTH = 4 * 1024 * 1024
+MAX_GETMANY_ITEMS = 1000  # paths per GETMANY
+MAX_GETMANY_LIST = 256 * 1024  # bytes of newline-separated paths per GETMANY
+HASH_WORKERS = 4
+EVENT_QUEUE_SIZE = 1000
+SUBSCRIBE_PING_SECONDS = 15
+ADMIN_USERS = {"Admin"}
+LOG_LEVEL = logging.DEBUG if DEBUG else logging.INFO
+LOG_PAYLOAD_BYTES = 200  # longest payload excerpt written to the log
+LOG_SAMPLE_RATE = 1.0  # fraction of DEBUG records kept; lower it when DEBUG is on under load
+PROFILE_DIR = "profiles"
+SESSION_TTL = 12 * 3600  # seconds a session token stays valid after LOGIN or RESUME
+# Tokens are signed with this key; set FILENET_SESSION_SECRET to keep them valid across restarts
+# (a SIGHUP handoff passes it on to the new process automatically)
+SESSION_SECRET = (os.environ.get("FILENET_SESSION_SECRET") or os.urandom(32).hex()).encode()
+LOGIN_WORKERS = 2  # threads running the password KDF (hashlib.scrypt releases the GIL)
+MAX_PENDING_LOGINS = 8  # logins/registrations hashing or queued at once; more get 503
+VERIFIED_LOGIN_CACHE = 10000  # users whose last good credential is remembered for SESSION_TTL
+RECORD_DIR = "recordings"
+RECORD_AT_START = None  # capture name to start recording traffic as soon as the server starts
+METRICS_HTTP_PORT = None  # e.g. 9122 to serve Prometheus text at http://HOST:port/metrics
+# Bulk file data (GET/GETDIR/READ bodies over INTERACTIVE_LIMIT) is paced to these
+# bytes/second; None is unlimited. Keep GLOBAL_BANDWIDTH a little under the uplink
+# so interactive replies, which are never paced, always find headroom.
+GLOBAL_BANDWIDTH = None
+USER_BANDWIDTH = None  # cap per user across all their sessions; users also get a fair share of the global rate
+INTERACTIVE_LIMIT = 64 * 1024  # file bodies up to this size are sent without pacing
 request_counts = {}
 last_request_times = {}
 
+hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+hash_jobs = {}
+hash_jobs_lock = threading.Lock()
+hash_local = threading.local()
+
+metrics = Metrics()
+BaseDBHandler.query_observer = metrics.observe_query
+metrics.register_gauge("hash_jobs_pending", lambda: len(hash_jobs))
+metrics.register_gauge("accept_queue_depth", lambda: accept_queue.qsize())
+scheduler = TransferScheduler(GLOBAL_BANDWIDTH, USER_BANDWIDTH, CHUNK_SIZE, INTERACTIVE_LIMIT)
+metrics.register_gauge("bulk_transfers_active", scheduler.active_transfers)
+metrics.register_gauge("bulk_throttled_seconds", lambda: round(scheduler.throttled_seconds, 3))
+login_executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+login_slots = threading.BoundedSemaphore(MAX_PENDING_LOGINS)
+verified_logins = OrderedDict()  # username -> (credential mac, stored hash, expiry)
+verified_logins_lock = threading.Lock()
+profiler = Profiler(PROFILE_DIR)
+accept_queue = queue.Queue()  # new connections and woken sessions; admit() bounds the new ones
+feed_slots = threading.BoundedSemaphore(MAX_FEEDS)
+recorder = Recorder()
+session_ids = itertools.count(1)
+sessions = {}  # session id -> (SessionSocket, client state, started)
+sessions_lock = threading.Lock()
+draining = threading.Event()  # set once the server stops accepting and is closing sessions
+shutdown_requested = threading.Event()
+restart_requested = threading.Event()
+
 os.makedirs(BASE_DIR, exist_ok=True)
 
-def debug_print(message):
-    if DEBUG:
-        print(f"[DEBUG] {message}")
+logger = logging.getLogger("filenet.server")
+
+class Payload:
+    """Truncated view of a message, only rendered if the record is written."""
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        if len(self.data) > LOG_PAYLOAD_BYTES:
+            return f"{self.data[:LOG_PAYLOAD_BYTES]!r}... ({len(self.data)} bytes)"
+        return repr(self.data)
+
+class SamplingFilter(logging.Filter):
+    """Keeps every INFO+ record but only a fraction of DEBUG ones."""
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
 
-def send_response(conn, message):
-    debug_print(f"Sent: {message.strip()}")
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, so message formatting happens on the writer thread."""
+    def prepare(self, record):
+        return record
+
+def setup_logging(level=LOG_LEVEL, sample_rate=LOG_SAMPLE_RATE, stream=None):
+    """Route server logs through a queue to a background writer; returns the listener."""
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, writer)
+    logger.handlers[:] = [queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+def send_response(conn, message, secret=False):
+    """Sends a reply; secret keeps its contents (e.g. a session token) out of the log."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("sent bytes=%d payload=%s", len(message), "<redacted>" if secret else Payload(message))
     conn.sendall(message)
+    metrics.add_bytes_out(len(message))
 
-def have_access(username, path, file_db):
-    if not os.path.exists(path):
-        return False
-    path = path.replace(os.sep, "/").split("/")
-    files = fileDB.get_user_files(username)
-    for names in files:
-        if names[1] == path[1]:
-            return True
-    return False
+def send_file(conn, f, size, username):
+    """Sends size bytes of the open file f through the transfer scheduler."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("sent file bytes=%d user=%s", size, username)
+    sent = scheduler.send_file(conn, f, size, username)
+    metrics.add_bytes_out(sent)
+    return sent
+
+def resolve_path(path, repos):
+    """Normalizes a client path against ftp_root. Returns (rel_path, full_path), or
+    None if it escapes ftp_root or isn't inside one of repos."""
+    parts = [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+    if not parts or ".." in parts or parts[0] not in repos:
+        return None
+    if any(os.path.splitdrive(part)[0] for part in parts):  # "C:x" would re-root the join on Windows
+        return None
+    return "/".join(parts), os.path.join(BASE_DIR, *parts)
+
+def access_path(username, path, file_db, must_exist=True):
+    """Resolves a client path for username. Returns (rel_path, full_path), or None if
+    it escapes ftp_root, is outside the user's repositories or, with must_exist,
+    doesn't exist. Handlers must do their I/O on the returned full_path."""
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    resolved = resolve_path(path or "", repos)
+    if resolved is None or (must_exist and not os.path.exists(resolved[1])):
+        return None
+    return resolved
+
+def have_access(username, path, file_db, must_exist=True):
+    return access_path(username, os.path.relpath(path, BASE_DIR), file_db, must_exist) is not None
+
+UPLOAD_TEMP_PATTERN = re.compile(r"\.upload-\d+$")
+
+def is_upload_temp(filename):
+    """True for the temp files UPLOAD writes before swapping them into place."""
+    return UPLOAD_TEMP_PATTERN.search(filename) is not None
 
 def list_files(path):
     if not os.path.exists(path):
         return "Directory not found."
     if not os.path.isdir(path):
         return "Not a directory."
-    files = os.listdir(path)
+    files = [name for name in os.listdir(path) if not is_upload_temp(name)]
     return "\n".join(files) if files else "404 No files found."
 
-def search_by_name(target_file_name):
+def search_by_name(target_file_name, repos=None, limit=None):
+    """Finds files whose name contains target_file_name.
+
+    repos restricts the walk to those top-level folders; limit stops it early.
+    """
     found_files = []
     abs_ftp_root = os.path.abspath(BASE_DIR)
-    for dirpath, dirnames, filenames in os.walk(BASE_DIR):
-        for filename in filenames:
-            if target_file_name in filename:
-                full_path = os.path.join(dirpath, filename)
-                relative_path = os.path.relpath(full_path, abs_ftp_root)
-                found_files.append(relative_path.replace(os.sep, "/"))
+    roots = [BASE_DIR] if repos is None else [os.path.join(BASE_DIR, repo) for repo in repos]
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                if target_file_name in filename and not is_upload_temp(filename):
+                    full_path = os.path.join(dirpath, filename)
+                    relative_path = os.path.relpath(full_path, abs_ftp_root)
+                    found_files.append(relative_path.replace(os.sep, "/"))
+                    if limit is not None and len(found_files) >= limit:
+                        return found_files
     return found_files
 
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _hash_and_store(rel_path):
+    """Hashes a file on a pool thread and records it in the manifest."""
+    full_path = os.path.join(BASE_DIR, rel_path)
+    before = os.stat(full_path)
+    digest = hash_file(full_path)
+    after = os.stat(full_path)
+    if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+        return _hash_and_store(rel_path)  # changed while we were reading it
+    if not hasattr(hash_local, "manifest_db"):
+        hash_local.manifest_db = ManifestHandler()
+    hash_local.manifest_db.set_hash(rel_path, after.st_size, after.st_mtime_ns, digest)
+    return digest
+
+def schedule_hash(rel_path):
+    """Queues a file for hashing, reusing a job that is already in flight for it."""
+    with hash_jobs_lock:
+        future = hash_jobs.get(rel_path)
+        if future is None:
+            future = hash_executor.submit(_hash_and_store, rel_path)
+            hash_jobs[rel_path] = future
+            future.add_done_callback(lambda f: _forget_hash_job(rel_path, f))
+    return future
+
+def _forget_hash_job(rel_path, future):
+    with hash_jobs_lock:
+        if hash_jobs.get(rel_path) is future:
+            del hash_jobs[rel_path]
+
+def build_manifest(manifest_db, target_dir):
+    """Returns [(rel_path, size, mtime_ns, sha256)] for every file under target_dir.
+
+    Hashes whose size and mtime still match are reused; the rest are computed
+    in parallel on the hashing pool.
+    """
+    prefix = os.path.relpath(target_dir, BASE_DIR).replace(os.sep, "/")
+    known = manifest_db.get_hashes(prefix)
+    entries = []
+    for root, dirs, files in os.walk(target_dir):
+        for file in files:
+            if is_upload_temp(file):
+                continue
+            full_path = os.path.join(root, file)
+            rel_path = os.path.relpath(full_path, BASE_DIR).replace(os.sep, "/")
+            try:
+                st = os.stat(full_path)
+            except FileNotFoundError:
+                continue  # removed or replaced while we were walking
+            cached = known.get(rel_path)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                entries.append((rel_path, st.st_size, st.st_mtime_ns, cached[2]))
+            else:
+                entries.append((rel_path, st.st_size, st.st_mtime_ns, schedule_hash(rel_path)))
+    manifest = []
+    for rel_path, size, mtime, digest in entries:
+        if not isinstance(digest, str):
+            try:
+                digest = digest.result()
+            except FileNotFoundError:
+                continue
+        manifest.append((rel_path, size, mtime, digest))
+    return manifest
+
+def file_digest(manifest_db, rel_path):
+    """Returns a file's SHA-256, from the manifest when size and mtime still match."""
+    st = os.stat(os.path.join(BASE_DIR, rel_path))
+    cached = manifest_db.get_hash(rel_path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    return schedule_hash(rel_path).result()
+
+class EventBus:
+    """In-process fan-out of change events to SUBSCRIBE sessions.
+
+    Each subscriber gets its own bounded queue. A subscriber that falls too far
+    behind is marked stale instead of blocking publishers; it is then told to
+    RESYNC and the backlog is dropped.
+    """
+    def __init__(self, max_queue=EVENT_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.subscribers = {}  # queue -> stale flag
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.subscribers[q] = False
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.pop(q, None)
+
+    def publish(self, kind, user, path):
+        event = (kind, user, path.replace(os.sep, "/"))
+        with self.lock:
+            for q, stale in self.subscribers.items():
+                if stale:
+                    continue
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    self.subscribers[q] = True
+
+    def take_stale(self, q):
+        """Return True (and clear the flag and backlog) if q overflowed."""
+        with self.lock:
+            if not self.subscribers.get(q):
+                return False
+            self.subscribers[q] = False
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return True
+
+event_bus = EventBus()
+
 def is_valid_username(username):
     return re.match("^[a-zA-Z0-9_]{3,20}$", username)
 
+def make_session_token(username):
+    """Signed "<user>.<expiry>.<mac>" token that RESUME accepts until it expires."""
+    payload = f"{username}.{int(time.time()) + SESSION_TTL}"
+    mac = hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{payload}.{mac}"
+
+def check_session_token(token):
+    """Returns the username a token was issued to, or None if it is forged or expired.
+
+    Needs no DB access: the signature proves the server issued it.
+    """
+    try:
+        username, expiry, mac = token.split(".")
+        expired = int(expiry) < time.time()
+    except ValueError:
+        return None
+    expected = hmac.new(SESSION_SECRET, f"{username}.{expiry}".encode(), hashlib.sha256).hexdigest()[:32]
+    if expired or not hmac.compare_digest(mac, expected):
+        return None
+    return username
+
+class LoginBusy(Exception):
+    pass
+
+def run_kdf(fn, *args):
+    """Runs a password hash or check on the login pool and waits for it.
+
+    Raises LoginBusy instead of queueing when MAX_PENDING_LOGINS are already
+    in flight, so a login storm can't pile up behind file transfers.
+    """
+    if not login_slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        return login_executor.submit(fn, *args).result()
+    finally:
+        login_slots.release()
+
+def _credential_mac(username, password):
+    return hmac.new(SESSION_SECRET, f"{username}:{password}".encode(), hashlib.sha256).digest()
+
+def recently_verified(username, password, stored):
+    """True if this exact credential passed the KDF for this stored hash within SESSION_TTL."""
+    with verified_logins_lock:
+        entry = verified_logins.get(username)
+    if entry is None:
+        return False
+    mac, verified_hash, expiry = entry
+    return verified_hash == stored and expiry > time.time() and \
+        hmac.compare_digest(mac, _credential_mac(username, password))
+
+def remember_verified(username, password, stored):
+    with verified_logins_lock:
+        verified_logins[username] = (_credential_mac(username, password), stored, time.time() + SESSION_TTL)
+        verified_logins.move_to_end(username)
+        while len(verified_logins) > VERIFIED_LOGIN_CACHE:
+            verified_logins.popitem(last=False)
+
+class SessionContext(dict):
+    """Per-session DB handlers, opened on first use and closed with the session."""
+    factories = {"fileDB": DBHandler, "userDB": UserHandler, "manifestDB": ManifestHandler}
+
+    def __missing__(self, key):
+        handler = self[key] = self.factories[key]()
+        return handler
+
+    def close(self):
+        for handler in self.values():
+            handler.close()
+
 def handle_login(conn, state, context, **kwargs):
     """Handles user login."""
     username = kwargs.get('username')
@@ -66,12 +438,40 @@ def handle_login(conn, state, context, **kwargs):
     userDB = context['userDB']
     user_data = userDB.get_user(username)
 
-    if user_data and password == user_data[1]:
-        send_response(conn, b"200 LOGIN SUCCESS\n")
+    ok = False
+    if user_data:
+        stored = user_data[1]
+        ok = recently_verified(username, password, stored)
+        if not ok:
+            try:
+                ok, new_hash = run_kdf(userDB.verify_password, password, stored)
+            except LoginBusy:
+                send_response(conn, b"503 LOGIN BUSY: Too many logins in progress, try again.\n")
+                return
+            if new_hash:
+                userDB.set_password_hash(username, new_hash)
+                stored = new_hash
+            if ok:
+                remember_verified(username, password, stored)
+
+    if ok:
+        send_response(conn, f"200 LOGIN SUCCESS {make_session_token(username)}\n".encode(), secret=True)
         state['name'] = username
     else:
         send_response(conn, b"401 LOGIN FAILED: Invalid username or password.\n")
 
+def handle_resume(conn, state, context, **kwargs):
+    """Handles re-attaching a connection to a session with a token from LOGIN."""
+    username = check_session_token(kwargs.get('token') or "")
+    if username is None:
+        send_response(conn, b"401 RESUME FAILED: Invalid or expired token.\n")
+        return
+    state['name'] = username
+    if state.get('addr') and not state.get('forgiven'):  # once per connection, or RESUME would reset the count
+        state['forgiven'] = True
+        forgive_connection(state['addr'][0])
+    send_response(conn, f"200 RESUME SUCCESS {make_session_token(username)}\n".encode(), secret=True)
+
 def handle_register(conn, state, context, **kwargs):
     """Handles user registration."""
     username = kwargs.get('username')
@@ -82,10 +482,14 @@ def handle_register(conn, state, context, **kwargs):
 
     userDB = context['userDB']
 
-    if user_db.get_user(username) is not None:
+    if userDB.get_user(username) is not None:
         send_response(conn, b"402 REGISTER FAILED: User already exists.\n")
     else:
-        user_db.new_user(username, password)
+        try:
+            run_kdf(userDB.new_user, username, password)
+        except LoginBusy:
+            send_response(conn, b"503 REGISTER BUSY: Too many logins in progress, try again.\n")
+            return
         send_response(conn, b"201 REGISTER SUCCESS\n")
 
 def handle_list(conn, state, context, **kwargs):
@@ -106,11 +510,11 @@ def handle_list(conn, state, context, **kwargs):
         except:
             send_response(conn, b"404 No files found.\n")
     else:
-        target_dir = os.path.join(BASE_DIR, arg)
-        if not have_access(username, target_dir, file_db):
+        resolved = access_path(username, arg, file_db)
+        if resolved is None:
             send_response(conn, b"403 Access denied.\n")
         else:
-            send_response(conn, b"200 OK\n" + list_files(target_dir).encode() + b"\n")
+            send_response(conn, b"200 OK\n" + list_files(resolved[1]).encode() + b"\n")
 
 def handle_search(conn, state, context, **kwargs):
     """Handles searching for a file."""
@@ -123,13 +527,17 @@ def handle_search(conn, state, context, **kwargs):
         return
 
     if target_file_name:
-        found_files = search_by_name(target_file_name)
-        filtered_files = [file for file in found_files if have_access(username, "ftp_root/" + file.split('/')[0], fileDB)]
-        if filtered_files:
-            response = "200 OK\n" + "\n".join(filtered_files)
+        # Walk only the repos this user can see, one DB query instead of one per hit
+        repos = sorted({file[1] for file in file_db.get_user_files(username)})
+        found_files = search_by_name(target_file_name, repos, limit=MAX_SEARCH_RESULTS + 1)
+        truncated = len(found_files) > MAX_SEARCH_RESULTS
+        found_files = found_files[:MAX_SEARCH_RESULTS]
+        if found_files:
+            body = "\n".join(found_files).encode()
+            status = f"200 OK {len(body)}" + (" TRUNCATED" if truncated else "")
+            send_response(conn, status.encode() + b"\n" + body)
         else:
-            response = "404 No files found."
-        send_response(conn, response.encode())
+            send_response(conn, b"404 No files found.\n")
     else:
         send_response(conn, b"400 Bad Request: Missing filename. Usage: SEARCH <filename>\n")
 
@@ -138,101 +546,368 @@ def handle_get(conn, state, context, **kwargs):
     file_db = context['fileDB']
     username = state.get('name')
     arg = kwargs.get('arg')
-    target_dir = os.path.join(BASE_DIR, arg)
 
     if not username:
         send_response(conn, b"403 You must be logged in to perform this action.\n")
         return
 
-    if not have_access(username, target_dir, file_db):
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
         send_response(conn, b"403 Access denied.\n")
     else:
-        path = os.path.join(BASE_DIR, arg)
-        if os.path.exists(path) and os.path.isfile(path):
-            send_response(conn, b"200 OK\n")
-            with open(path, "rb") as f:
-                send_response(conn, f.read())
-        else:
+        path = resolved[1]
+        try:
+            f = open(path, "rb") if os.path.isfile(path) else None
+        except FileNotFoundError:
+            f = None
+        if f is None:
             send_response(conn, b"404 File not found.\n")
+            return
+        with f:
+            # Size the reply from the open file; uploads replace files rather than rewrite them
+            size = os.fstat(f.fileno()).st_size
+            send_response(conn, f"200 OK {size}\n".encode())
+            send_file(conn, f, size, username)
+
+def handle_read(conn, state, context, **kwargs):
+    """Handles reading part of a file."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    try:
+        offset, length = int(kwargs.get('offset')), int(kwargs.get('length'))
+    except ValueError:
+        offset = length = -1
+    if offset < 0 or length < 0:
+        send_response(conn, b"400 Bad Request: Usage: READ <offset> <length> <file_path>\n")
+        return
+
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    elif not os.path.isfile(resolved[1]):
+        send_response(conn, b"404 File not found.\n")
+    else:
+        with open(resolved[1], "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            count = max(0, min(length, MAX_READ_LENGTH, total - offset))
+            if count:
+                f.seek(offset)  # only offsets inside the file, so a huge one can't overflow seek()
+            send_response(conn, f"200 OK {total} {count}\n".encode())
+            send_file(conn, f, count, username)
 
 def handle_getdir(conn, state, context, **kwargs):
     """Handles retrieving a directory."""
     file_db = context['fileDB']
     username = state.get('name')
     arg = kwargs.get('arg')
-    target_dir = os.path.join(BASE_DIR, arg)
 
     if not username:
         send_response(conn, b"403 You must be logged in to perform this action.\n")
         return
 
-    if not have_access(username, target_dir, file_db):
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
         send_response(conn, b"403 Access denied.\n")
     else:
-        if not os.path.exists(target_dir) or not os.path.isdir(target_dir):
+        target_dir = resolved[1]
+        if not os.path.isdir(target_dir):
             send_response(conn, b"404 Directory not found.\n")
             return
 
         send_response(conn, b"200 OK\n")
         for root, dirs, files in os.walk(target_dir):
             for file in files:
+                if is_upload_temp(file):
+                    continue
                 full_path = os.path.join(root, file)
                 rel_path = os.path.relpath(full_path, BASE_DIR).replace(os.sep, "/")
-                size = os.path.getsize(full_path)
-                send_response(conn, f"FILE {rel_path} {size}\n".encode())
-                with open(full_path, "rb") as f:
-                    send_response(conn, f.read())
+                try:
+                    f = open(full_path, "rb")
+                except FileNotFoundError:
+                    continue  # removed while we were walking
+                with f:
+                    size = os.fstat(f.fileno()).st_size
+                    send_response(conn, f"FILE {rel_path} {size}\n".encode())
+                    send_file(conn, f, size, username)
         send_response(conn, b"DONE\n")
 
+def handle_getmany(conn, state, context, **kwargs):
+    """Handles fetching many files in one reply.
+
+    GETMANY <list size> [max item size [max total size]], then <list size> bytes of
+    newline-separated paths. The reply is "200 OK <count>", one "ITEM <status> <size>
+    <mtime_ns> <path>" per path followed by <size> bytes when status is 200, then
+    "DONE". Denied, missing and oversized paths get 403, 404 and 413 items; with a
+    max total size, files that would take the reply past it get 413 too.
+    """
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg') or ""
+    options = arg.split()
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if not options or len(options) > 3 or not all(option.isdigit() for option in options):
+        send_response(conn, b"400 Bad Request: Usage: GETMANY <list size> [max item size [max total size]]\n")
+        return
+    list_size = int(options[0])
+    max_size = int(options[1]) if len(options) > 1 else None
+    budget = int(options[2]) if len(options) > 2 else None
+    if list_size > MAX_GETMANY_LIST:
+        send_response(conn, f"400 Bad Request: Path list over {MAX_GETMANY_LIST} bytes.\n".encode())
+        return
+
+    send_response(conn, f"200 OK: Send {list_size} bytes\n".encode())
+    body = b""
+    while len(body) < list_size:
+        chunk = conn.recv(min(CHUNK_SIZE, list_size - len(body)))
+        if not chunk:
+            return
+        metrics.add_bytes_in(len(chunk))
+        body += chunk
+    paths = [line.strip().replace("\\", "/").strip("/") for line in body.decode(errors="ignore").split("\n")]
+    paths = [path for path in paths if path]
+    if len(paths) > MAX_GETMANY_ITEMS:
+        send_response(conn, f"400 Bad Request: More than {MAX_GETMANY_ITEMS} paths.\n".encode())
+        return
+
+    # One access lookup for the whole batch instead of one per file
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    send_response(conn, f"200 OK {len(paths)}\n".encode())
+    for rel_path in paths:
+        resolved = resolve_path(rel_path, repos)
+        if resolved is None:
+            send_response(conn, f"ITEM 403 0 0 {rel_path}\n".encode())
+            continue
+        full_path = resolved[1]
+        try:
+            f = open(full_path, "rb") if os.path.isfile(full_path) and not is_upload_temp(full_path) else None
+        except FileNotFoundError:
+            f = None
+        if f is None:
+            send_response(conn, f"ITEM 404 0 0 {rel_path}\n".encode())
+            continue
+        with f:
+            st = os.fstat(f.fileno())
+            if (max_size is not None and st.st_size > max_size) or (budget is not None and st.st_size > budget):
+                send_response(conn, f"ITEM 413 {st.st_size} {st.st_mtime_ns} {rel_path}\n".encode())
+                continue
+            if budget is not None:
+                budget -= st.st_size
+            send_response(conn, f"ITEM 200 {st.st_size} {st.st_mtime_ns} {rel_path}\n".encode())
+            send_file(conn, f, st.st_size, username)
+    send_response(conn, b"DONE\n")
+
+def handle_tree(conn, state, context, **kwargs):
+    """Handles listing every file under a directory with its size."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    else:
+        target_dir = resolved[1]
+        if not os.path.isdir(target_dir):
+            send_response(conn, b"404 Directory not found.\n")
+            return
+
+        lines = []
+        for root, dirs, files in os.walk(target_dir):
+            for file in files:
+                if is_upload_temp(file):
+                    continue
+                full_path = os.path.join(root, file)
+                rel_path = os.path.relpath(full_path, BASE_DIR).replace(os.sep, "/")
+                try:
+                    lines.append(f"{os.path.getsize(full_path)} {rel_path}\n")
+                except FileNotFoundError:
+                    continue
+        body = "".join(lines).encode()
+        send_response(conn, f"200 OK {len(body)}\n".encode() + body)
+
 def handle_put(conn, state, context, **kwargs):
     """Handles uploading a file."""
     file_db = context['fileDB']
     username = state.get('name')
     arg = kwargs.get('arg')
-    target_dir = os.path.dirname(os.path.join(BASE_DIR, arg))
 
     if not username:
         send_response(conn, b"403 You must be logged in to perform this action.\n")
         return
 
-    if not have_access(username, target_dir, file_db):
+    resolved = access_path(username, arg, file_db, must_exist=False)
+    if resolved is None or "/" not in resolved[0] or not os.path.isdir(os.path.dirname(resolved[1])):
         send_response(conn, b"403 Access denied.\n")
+    elif os.path.isdir(resolved[1]):
+        send_response(conn, b"409 A directory exists at that path.\n")
     else:
-        path = os.path.join(BASE_DIR, arg)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rel_path, path = resolved
         send_response(conn, b"200 OK: Send file data, end with EOF marker '<EOF>'\n")
         file_data = b""
         while True:
             chunk = conn.recv(1024)
+            if not chunk:
+                return  # client went away mid-upload; keep the old file
+            metrics.add_bytes_in(len(chunk))
             if b"<EOF>" in chunk:
                 file_data += chunk.replace(b"<EOF>", b"")
                 break
             file_data += chunk
-        with open(path, "wb") as f:
+        # Swap the new contents in, so a GET streaming the old file keeps a stable size
+        tmp_path = f"{path}.upload-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
             f.write(file_data)
+        os.replace(tmp_path, path)
+        schedule_hash(rel_path)
+        event_bus.publish("PUT", username, rel_path)
         send_response(conn, b"200 File uploaded successfully.\n")
 
+def handle_upload(conn, state, context, **kwargs):
+    """Handles uploading a file of known size, streaming it to disk."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+    size = kwargs.get('size')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if not size.isdigit():
+        send_response(conn, b"400 Bad Request: Usage: UPLOAD <size> <file_path>\n")
+        return
+
+    resolved = access_path(username, arg, file_db, must_exist=False)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    elif os.path.isdir(resolved[1]):
+        send_response(conn, b"409 A directory exists at that path.\n")
+    else:
+        rel_path, path = resolved
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        send_response(conn, f"200 OK: Send {size} bytes\n".encode())
+        # Write beside the target and swap it in, so readers never see a partial file
+        tmp_path = f"{path}.upload-{threading.get_ident()}"
+        remaining = int(size)
+        deadline = time.monotonic() + READ_TIMEOUT + remaining / MIN_UPLOAD_RATE
+        try:
+            with open(tmp_path, "wb") as f:
+                while remaining > 0:
+                    if time.monotonic() > deadline:
+                        raise socket.timeout("upload below MIN_UPLOAD_RATE")
+                    chunk = conn.recv(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    metrics.add_bytes_in(len(chunk))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        finally:
+            if remaining > 0:
+                # Client went away or stalled mid-upload (or open failed); keep the old file
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(tmp_path)
+        if remaining > 0:
+            return
+        os.replace(tmp_path, path)
+        schedule_hash(rel_path)
+        event_bus.publish("PUT", username, rel_path)
+        send_response(conn, b"200 File uploaded successfully.\n")
+
+def handle_checksum(conn, state, context, **kwargs):
+    """Handles reporting a file's size and SHA-256."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    elif not os.path.isfile(resolved[1]):
+        send_response(conn, b"404 File not found.\n")
+    else:
+        rel_path, path = resolved
+        digest = file_digest(context['manifestDB'], rel_path)
+        send_response(conn, f"200 OK {os.path.getsize(path)} {digest}\n".encode())
+
+def handle_manifest(conn, state, context, **kwargs):
+    """Handles listing every file under a directory with size, mtime and SHA-256."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    elif not os.path.isdir(resolved[1]):
+        send_response(conn, b"404 Directory not found.\n")
+    else:
+        entries = build_manifest(context['manifestDB'], resolved[1])
+        body = "".join(f"{digest} {size} {mtime} {rel_path}\n" for rel_path, size, mtime, digest in entries).encode()
+        send_response(conn, f"200 OK {len(body)}\n".encode() + body)
+
 def handle_mkdir(conn, state, context, **kwargs):
     """Handles creating a directory."""
     file_db = context['fileDB']
     username = state.get('name')
     arg = kwargs.get('arg')
-    target_dir = os.path.join(BASE_DIR, arg)
 
     if not username:
         send_response(conn, b"403 You must be logged in to perform this action.\n")
         return
 
-    if not have_access(username, target_dir, file_db):
+    resolved = access_path(username, arg, file_db, must_exist=False)
+    if resolved is None:
         send_response(conn, b"403 Access denied.\n")
     else:
-        new_dir = os.path.join(BASE_DIR, arg)
+        rel_path, new_dir = resolved
         try:
             os.makedirs(new_dir, exist_ok=False)
+            event_bus.publish("MKDIR", username, rel_path)
             send_response(conn, b"201 Directory created successfully.\n")
         except FileExistsError:
             send_response(conn, b"409 Directory already exists.\n")
 
+def handle_stat(conn, state, context, **kwargs):
+    """Handles reporting the size and modification time of a file or directory."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = access_path(username, arg, file_db)
+    if resolved is None:
+        send_response(conn, b"403 Access denied.\n")
+    else:
+        target = resolved[1]
+        st = os.stat(target)
+        kind = "DIR" if os.path.isdir(target) else "FILE"
+        send_response(conn, f"200 OK\n{kind} {st.st_size} {st.st_mtime_ns}\n".encode())
+
 def handle_getrepos(conn, state, context, **kwargs):
     """Handles getting user's repositories."""
     file_db = context['fileDB']
@@ -265,10 +940,386 @@ def handle_adduser(conn, state, context, **kwargs):
             break
     if file_id != -1:
         file_db.share_file_with_user(file_id, user_to_add)
+        event_bus.publish("ADDUSER", user_to_add, repo_name)
         send_response(conn, b"200 User added successfully.\n")
     else:
         send_response(conn, b"404 Repository not found.\n")
 
+def link_or_copy(src, dst):
+    """Copies a file as a hardlink where possible. Uploads replace files instead
+    of writing into them, so linked names never see each other's changes."""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        shutil.copy2(src, dst)  # other filesystem, or no hardlinks; copy2 keeps the mtime
+        return False
+
+def copy_tree(src, dst):
+    """Copies a file or directory with link_or_copy. Returns (files, linked)."""
+    if not os.path.isdir(src):
+        return 1, int(link_or_copy(src, dst))
+    files = linked = 0
+    for root, dirs, names in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target, exist_ok=True)
+        for name in names:
+            if is_upload_temp(name):
+                continue
+            try:
+                linked += link_or_copy(os.path.join(root, name), os.path.join(target, name))
+            except FileNotFoundError:
+                continue  # removed while we were walking
+            files += 1
+    return files, linked
+
+def _prepare_transfer(conn, username, file_db, src, dst, move=False):
+    """Shared checks for COPY and MOVE. Returns (src, dst) resolved, or None after
+    sending the error reply. Nothing is created until every check has passed."""
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    source, target = resolve_path(src, repos), resolve_path(dst, repos)
+    if source is None or target is None:
+        send_response(conn, b"403 Access denied.\n")
+    elif not os.path.exists(source[1]):
+        send_response(conn, b"404 Source not found.\n")
+    elif os.path.exists(target[1]):
+        send_response(conn, b"409 Destination already exists.\n")
+    elif (target[0] + "/").startswith(source[0] + "/"):
+        send_response(conn, b"400 Bad Request: Destination is inside the source.\n")
+    elif "/" not in target[0]:
+        send_response(conn, b"400 Bad Request: Destination must be inside a repository.\n")
+    elif move and "/" not in source[0]:
+        send_response(conn, b"400 Bad Request: Use RENAME for a repository.\n")
+    else:
+        os.makedirs(os.path.dirname(target[1]), exist_ok=True)
+        return source, target
+    return None
+
+def handle_copy(conn, state, context, **kwargs):
+    """Handles copying a file or directory on the server (hardlinks where possible)."""
+    file_db = context['fileDB']
+    username = state.get('name')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = _prepare_transfer(conn, username, file_db, kwargs.get('src'), kwargs.get('dst'))
+    if resolved is None:
+        return
+    (src, src_path), (dst, dst_path) = resolved
+    files, linked = copy_tree(src_path, dst_path)
+    context['manifestDB'].copy_prefix(src, dst)  # links and copy2 keep size and mtime
+    event_bus.publish("COPY", username, dst)
+    send_response(conn, f"201 Copied {files} files ({linked} linked).\n".encode())
+
+def move_path(manifest_db, username, src, dst):
+    """Renames src to dst (paths relative to ftp_root), re-keys their manifest
+    entries and tells subscribers."""
+    os.rename(os.path.join(BASE_DIR, src), os.path.join(BASE_DIR, dst))
+    manifest_db.move_prefix(src, dst)
+    event_bus.publish("DELETE", username, src)
+    event_bus.publish("MOVE", username, dst)
+
+def handle_move(conn, state, context, **kwargs):
+    """Handles moving a file or directory on the server."""
+    file_db = context['fileDB']
+    username = state.get('name')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    resolved = _prepare_transfer(conn, username, file_db, kwargs.get('src'), kwargs.get('dst'), move=True)
+    if resolved is None:
+        return
+    (src, src_path), (dst, dst_path) = resolved
+    move_path(context['manifestDB'], username, src, dst)
+    send_response(conn, b"200 Moved.\n")
+
+def handle_rename(conn, state, context, **kwargs):
+    """Handles renaming a file, directory or (for its owner) a repository in place."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    new_name = kwargs.get('new_name').strip()
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if not new_name or new_name in (".", "..") or "/" in new_name or "\\" in new_name:
+        send_response(conn, b"400 Bad Request: The new name must be a single path component.\n")
+        return
+
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    source = resolve_path(kwargs.get('path'), repos)
+    if source is None:
+        send_response(conn, b"403 Access denied.\n")
+        return
+    src, src_path = source
+    dst = "/".join(src.split("/")[:-1] + [new_name])
+    if not os.path.exists(src_path):
+        send_response(conn, b"404 Not found.\n")
+    elif os.path.exists(os.path.join(BASE_DIR, dst)):
+        send_response(conn, b"409 Destination already exists.\n")
+    elif "/" not in src:
+        if not file_db.is_owner(username, src):
+            send_response(conn, b"403 Only the owner can rename a repository.\n")
+            return
+        if any(file[1] == dst for file in file_db.get_all_files()):
+            send_response(conn, b"409 Destination already exists.\n")
+            return
+        os.rename(src_path, os.path.join(BASE_DIR, dst))
+        file_db.rename_file(src, dst)
+        context['manifestDB'].move_prefix(src, dst)
+        event_bus.publish("REPO", username, src)
+        event_bus.publish("REPO", username, dst)
+        send_response(conn, b"200 Renamed.\n")
+    else:
+        move_path(context['manifestDB'], username, src, dst)
+        send_response(conn, b"200 Renamed.\n")
+
+def handle_delete(conn, state, context, **kwargs):
+    """Handles deleting a file, directory or (for its owner) a whole repository."""
+    file_db = context['fileDB']
+    username = state.get('name')
+    arg = kwargs.get('arg') or ""
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    target = resolve_path(arg, repos)
+    if target is None:
+        send_response(conn, b"403 Access denied.\n")
+        return
+    rel_path, full_path = target
+    is_repo = "/" not in rel_path
+    if is_repo and not file_db.is_owner(username, rel_path):
+        send_response(conn, b"403 Only the owner can delete a repository.\n")
+        return
+    if not os.path.exists(full_path) and not is_repo:
+        send_response(conn, b"404 Not found.\n")
+        return
+    try:
+        if os.path.isdir(full_path):
+            shutil.rmtree(full_path)
+        elif os.path.exists(full_path):
+            os.remove(full_path)
+    except OSError as e:
+        logger.warning("delete failed path=%s error=%s", rel_path, e)
+        send_response(conn, b"500 Could not delete everything; try again.\n")
+        return
+    context['manifestDB'].delete_prefix(rel_path)
+    if is_repo:
+        file_db.delete_file(rel_path)
+        event_bus.publish("REPO", username, rel_path)
+    else:
+        event_bus.publish("DELETE", username, rel_path)
+    send_response(conn, b"200 Deleted.\n")
+
+def handle_subscribe(conn, state, context, **kwargs):
+    """Handles streaming change events for the user's repositories.
+
+    The session stays in this mode until the client disconnects or sends QUIT;
+    events are written as "EVENT <kind> <user> <path>" lines.
+    """
+    file_db = context['fileDB']
+    username = state.get('name')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if not feed_slots.acquire(blocking=False):
+        send_response(conn, b"503 Too many change feeds, try again later.\n")
+        return
+    repos = {repo[1] for repo in file_db.get_user_files(username)}
+    events = event_bus.subscribe()
+    try:
+        send_response(conn, b"200 OK Subscribed\n")
+    except BaseException:
+        event_bus.unsubscribe(events)
+        feed_slots.release()
+        raise
+    # The feed mostly waits, so it gets its own thread instead of holding a session worker
+    threading.Thread(target=run_feed, args=((conn, state, context), events, repos),
+                     name=f"feed-{state.get('session')}", daemon=True).start()
+    return "DETACH"
+
+def run_feed(session, events, repos):
+    """Streams events to a subscribed session until it disconnects, sends QUIT or
+    the server drains, then ends the session."""
+    conn, state, context = session
+    file_db = context['fileDB']
+    username = state.get('name')
+    last_sent = time.time()
+    try:
+        while not draining.is_set():  # the client's feed reconnects to the next server
+            if wait_readable(conn, 0):
+                data = conn.recv(1024)
+                if not data or data.strip().upper() == b"QUIT":
+                    break
+            if event_bus.take_stale(events):
+                repos = {repo[1] for repo in file_db.get_user_files(username)}
+                send_response(conn, b"EVENT RESYNC - -\n")
+                last_sent = time.time()
+                continue
+            try:
+                kind, user, path = events.get(timeout=1.0)
+            except queue.Empty:
+                if time.time() - last_sent >= SUBSCRIBE_PING_SECONDS:
+                    send_response(conn, b"EVENT PING - -\n")
+                    last_sent = time.time()
+                continue
+            visible = path.split("/", 1)[0] in repos  # before a REPO event changes the set
+            if (kind == "ADDUSER" and user == username) or kind == "REPO":
+                repos = {repo[1] for repo in file_db.get_user_files(username)}
+            if visible or path.split("/", 1)[0] in repos:
+                send_response(conn, f"EVENT {kind} {user} {path}\n".encode())
+                last_sent = time.time()
+    except OSError:
+        pass
+    finally:
+        event_bus.unsubscribe(events)
+        feed_slots.release()
+        end_session(session)
+
+def handle_metrics(conn, state, context, **kwargs):
+    """Handles reporting server metrics (admins only)."""
+    username = state.get('name')
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if username not in ADMIN_USERS:
+        send_response(conn, b"403 Access denied.\n")
+        return
+
+    body = metrics.render().encode()
+    send_response(conn, f"200 OK {len(body)}\n".encode() + body)
+
+def handle_profile(conn, state, context, **kwargs):
+    """Handles switching handler profiling on and off (admins only).
+
+    PROFILE ON [command|*] [user|*] [fraction], PROFILE OFF, PROFILE DUMP, PROFILE STATUS
+    """
+    username = state.get('name')
+    arg = kwargs.get('arg') or "STATUS"
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if username not in ADMIN_USERS:
+        send_response(conn, b"403 Access denied.\n")
+        return
+
+    action, *options = arg.split()
+    action = action.upper()
+    if action == "ON":
+        options += ["*"] * (2 - min(len(options), 2))
+        try:
+            fraction = float(options[2]) if len(options) > 2 else 1.0
+        except ValueError:
+            send_response(conn, b"400 Bad Request: Usage: PROFILE ON [command|*] [user|*] [fraction]\n")
+            return
+        profiler.start(None if options[0] == "*" else options[0],
+                       None if options[1] == "*" else options[1], fraction)
+        logger.info("profiling %s", profiler.status())
+        send_response(conn, f"200 Profiling {profiler.status()}\n".encode())
+    elif action == "OFF":
+        profiler.stop()
+        send_response(conn, f"200 Profiling {profiler.status()}\n".encode())
+    elif action == "DUMP":
+        paths = profiler.dump()
+        logger.info("profile dump files=%s", paths)
+        send_response(conn, f"200 Wrote {len(paths)} files: {' '.join(paths) or '-'}\n".encode())
+    elif action == "STATUS":
+        send_response(conn, f"200 Profiling {profiler.status()}\n".encode())
+    else:
+        send_response(conn, b"400 Bad Request: Usage: PROFILE ON|OFF|DUMP|STATUS\n")
+
+def start_recording(name, bodies=False):
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    recorder.start(os.path.join(RECORD_DIR, os.path.basename(name)), bodies)
+    logger.info("recording %s", recorder.status())
+
+def handle_record(conn, state, context, **kwargs):
+    """Handles capturing the command stream for replay (admins only).
+
+    RECORD ON <name> [BODIES], RECORD OFF, RECORD STATUS
+    """
+    username = state.get('name')
+    arg = kwargs.get('arg') or "STATUS"
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if username not in ADMIN_USERS:
+        send_response(conn, b"403 Access denied.\n")
+        return
+
+    action, *options = arg.split()
+    action = action.upper()
+    if action == "ON" and options:
+        start_recording(options[0], bodies=len(options) > 1 and options[1].upper() == "BODIES")
+        send_response(conn, f"200 Recording {recorder.status()}\n".encode())
+    elif action == "OFF":
+        recorder.stop()
+        send_response(conn, f"200 Recording {recorder.status()}\n".encode())
+    elif action == "STATUS":
+        send_response(conn, f"200 Recording {recorder.status()}\n".encode())
+    else:
+        send_response(conn, b"400 Bad Request: Usage: RECORD ON <name> [BODIES] | OFF | STATUS\n")
+
+def handle_sessions(conn, state, context, **kwargs):
+    """Handles listing live sessions or closing one (admins only).
+
+    SESSIONS lists "<id> <user> <ip>:<port> <age> <idle> <command>" lines; SESSIONS KILL <id>
+    """
+    username = state.get('name')
+    arg = kwargs.get('arg') or ""
+
+    if not username:
+        send_response(conn, b"403 You must be logged in to perform this action.\n")
+        return
+
+    if username not in ADMIN_USERS:
+        send_response(conn, b"403 Access denied.\n")
+        return
+
+    action, *options = arg.split() or ["LIST"]
+    action = action.upper()
+    if action == "LIST":
+        now = time.monotonic()
+        with sessions_lock:
+            entries = sorted(sessions.items())
+        lines = [f"{session} {client_state['name'] or '-'} {client_state['addr'][0]}:{client_state['addr'][1]} "
+                 f"{now - started:.0f} {now - session_conn.last_active:.0f} {client_state['command'] or '-'}\n"
+                 for session, (session_conn, client_state, started) in entries]
+        body = "".join(lines).encode()
+        send_response(conn, f"200 OK {len(body)}\n".encode() + body)
+    elif action == "KILL" and options and options[0].isdigit():
+        if close_session(int(options[0]), "killed by " + username):
+            send_response(conn, b"200 Session closed.\n")
+        else:
+            send_response(conn, b"404 No such session.\n")
+    else:
+        send_response(conn, b"400 Bad Request: Usage: SESSIONS [LIST] | KILL <id>\n")
+
+def toggle_profiling(signum, frame):
+    """SIGUSR1: start profiling every command, or stop and dump what was collected."""
+    if profiler.enabled:
+        profiler.stop()
+        logger.info("profile dump files=%s", profiler.dump())
+    else:
+        profiler.start()
+        logger.info("profiling %s", profiler.status())
+
 def handle_quit(conn, state, context, **kwargs):
     """Handles disconnection."""
     send_response(conn, b"221 Goodbye!\n")
@@ -281,6 +1332,12 @@ command_handlers = {
         "separator": "_",
         "description": "Logs in. Usage: LOGIN <username>_<password>"
     },
+    "RESUME": {
+        "handler": handle_resume,
+        "args": ["token"],
+        "separator": None,
+        "description": "Resumes a session without a password. Usage: RESUME <token>"
+    },
     "REGISTER": {
         "handler": handle_register,
         "args": ["username", "password"],
@@ -305,24 +1362,60 @@ command_handlers = {
         "separator": None,
         "description": "Downloads a file. Usage: GET <file_path>"
     },
+    "READ": {
+        "handler": handle_read,
+        "args": ["offset", "length", "arg"],
+        "separator": " ",
+        "description": "Reads part of a file. Usage: READ <offset> <length> <file_path>"
+    },
     "GETDIR": {
         "handler": handle_getdir,
         "args": ["arg"],
         "separator": None,
         "description": "Downloads a directory. Usage: GETDIR <dir_path>"
     },
+    "TREE": {
+        "handler": handle_tree,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Lists all files under a directory with sizes. Usage: TREE <dir_path>"
+    },
     "PUT": {
         "handler": handle_put,
         "args": ["arg"],
         "separator": None,
         "description": "Uploads a file. Usage: PUT <file_path>"
     },
+    "UPLOAD": {
+        "handler": handle_upload,
+        "args": ["size", "arg"],
+        "separator": " ",
+        "description": "Uploads a file of known size. Usage: UPLOAD <size> <file_path>"
+    },
+    "CHECKSUM": {
+        "handler": handle_checksum,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Shows a file's size and SHA-256. Usage: CHECKSUM <file_path>"
+    },
+    "MANIFEST": {
+        "handler": handle_manifest,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Lists files under a directory with size, mtime and SHA-256. Usage: MANIFEST <dir_path>"
+    },
     "MKDIR": {
         "handler": handle_mkdir,
         "args": ["arg"],
         "separator": None,
         "description": "Creates a directory. Usage: MKDIR <dir_path>"
     },
+    "STAT": {
+        "handler": handle_stat,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Shows size and modification time. Usage: STAT <path>"
+    },
     "GETREPOS": {
         "handler": handle_getrepos,
         "args": [],
@@ -335,6 +1428,66 @@ command_handlers = {
         "separator": "_",
         "description": "Shares a repo. Usage: ADDUSER <repo_name>_<user_to_add>"
     },
+    "GETMANY": {
+        "handler": handle_getmany,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Fetches many files in one reply; send the newline-separated paths after the 200. Usage: GETMANY <list size> [max item size [max total size]]"
+    },
+    "COPY": {
+        "handler": handle_copy,
+        "args": ["src", "dst"],
+        "separator": "|",
+        "description": "Copies a file or directory on the server. Usage: COPY <src_path>|<dst_path>"
+    },
+    "MOVE": {
+        "handler": handle_move,
+        "args": ["src", "dst"],
+        "separator": "|",
+        "description": "Moves a file or directory on the server. Usage: MOVE <src_path>|<dst_path>"
+    },
+    "RENAME": {
+        "handler": handle_rename,
+        "args": ["path", "new_name"],
+        "separator": "|",
+        "description": "Renames a file, directory or owned repository in place. Usage: RENAME <path>|<new_name>"
+    },
+    "DELETE": {
+        "handler": handle_delete,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Deletes a file, directory or owned repository. Usage: DELETE <path>"
+    },
+    "SUBSCRIBE": {
+        "handler": handle_subscribe,
+        "args": [],
+        "separator": None,
+        "description": "Streams change events (PUT, MKDIR, COPY, MOVE, DELETE, REPO, ADDUSER) for your repositories. Usage: SUBSCRIBE"
+    },
+    "METRICS": {
+        "handler": handle_metrics,
+        "args": [],
+        "separator": None,
+        "description": "Shows server metrics in Prometheus text format (admins only). Usage: METRICS"
+    },
+    "PROFILE": {
+        "handler": handle_profile,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Controls handler profiling (admins only). Usage: PROFILE ON [command|*] [user|*] [fraction] | OFF | DUMP | STATUS"
+    },
+    "RECORD": {
+        "handler": handle_record,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Captures the command stream for Replay.py (admins only). Usage: RECORD ON <name> [BODIES] | OFF | STATUS"
+    },
+    "SESSIONS": {
+        "handler": handle_sessions,
+        "args": ["arg"],
+        "separator": None,
+        "description": "Lists live sessions or closes one (admins only). Usage: SESSIONS [LIST] | KILL <id>"
+    },
     "QUIT": {
         "handler": handle_quit,
         "args": [],
@@ -343,13 +1496,19 @@ command_handlers = {
     }
 }
 
+REDACTED_COMMANDS = {"LOGIN", "REGISTER", "RESUME"}
+
 def run_command(conn, state, context, command_string):
     """Parses and executes a command using the metadata table."""
-    debug_print(f"Received: {command_string}")
     cmd, _, arg_string = command_string.strip().partition(" ")
     cmd = cmd.upper()
+    if logger.isEnabledFor(logging.DEBUG):
+        # Never write credentials to the log
+        logger.debug("received command=%s args=%s", cmd,
+                     "<redacted>" if cmd in REDACTED_COMMANDS else Payload(arg_string))
 
     if cmd not in command_handlers:
+        metrics.observe_command("UNKNOWN", 0.0, failed=True)
         send_response(conn, b"500 Unknown command.\n")
         return
     config = command_handlers[cmd]
@@ -370,11 +1529,100 @@ def run_command(conn, state, context, command_string):
             return
         parsed_args = dict(zip(expected_args, values))
 
-    debug_print(f"Calling handler for {cmd} with args: {parsed_args}")
-    return config['handler'](conn, state, context, **parsed_args)
+    recording = recorder.enabled and isinstance(conn, SessionSocket)
+    if recording:
+        conn.status = None
+        bytes_before = (conn.bytes_in, conn.bytes_out)
+        started = time.monotonic()
+    sent_before = getattr(conn, "bytes_out", None)
+    start = time.perf_counter()
+    failed = True
+    try:
+        result = profiler.call(cmd, state.get('name'), config['handler'], conn, state, context, **parsed_args)
+        failed = False
+        return result
+    except (ConnectionError, socket.timeout):
+        raise  # the session itself is gone; handle_client cleans up
+    except OSError as e:
+        # A filesystem error inside the handler; the connection is still fine
+        logger.warning("command failed command=%s user=%s error=%s", cmd, state.get('name'), e)
+        if sent_before is None or conn.bytes_out != sent_before:
+            return "QUIT"  # part of the reply is already out, so the client can't resync
+        send_response(conn, b"500 Internal server error.\n")
+        return None
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe_command(cmd, elapsed, failed)
+        if recording:
+            body_path = None
+            if cmd in ("PUT", "UPLOAD") and not failed and state.get('name'):
+                resolved = access_path(state.get('name'), parsed_args["arg"], context['fileDB'])
+                body_path = resolved[1] if resolved else None
+            recorder.record(state.get("session"), state.get('name'), cmd,
+                            "<redacted>" if cmd in REDACTED_COMMANDS else arg_string, started, elapsed,
+                            conn.bytes_in - bytes_before[0] + len(command_string) + 1,
+                            conn.bytes_out - bytes_before[1], conn.status, body_path)
+
+class IdleSessions:
+    """Holds sessions that are between commands without tying up a worker.
+
+    One thread watches the parked sockets with a selector. When a client sends
+    its next command (or disconnects) the session is handed to ready(); one
+    that stays quiet for IDLE_TIMEOUT is handed to expired().
+    """
+    def __init__(self, ready, expired):
+        self.ready = ready
+        self.expired = expired
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.pending = []  # sessions parked since the last wakeup
+        self.count = 0
+        self.wake_recv, self.wake_send = socket.socketpair()
+        self.wake_recv.setblocking(False)
+        self.wake_send.setblocking(False)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ)
+
+    def park(self, session):
+        with self.lock:
+            self.pending.append(session)
+            self.count += 1
+        try:
+            self.wake_send.send(b"\0")
+        except BlockingIOError:
+            pass  # a wakeup is already pending
+
+    def _take(self, conn):
+        self.selector.unregister(conn)
+        with self.lock:
+            self.count -= 1
+
+    def run(self):
+        last_sweep = time.monotonic()
+        while True:
+            events = self.selector.select(timeout=1.0)
+            with self.lock:
+                pending, self.pending = self.pending, []
+            for session in pending:
+                self.selector.register(session[0], selectors.EVENT_READ, session)
+            for key, _ in events:
+                if key.fileobj is self.wake_recv:
+                    with contextlib.suppress(BlockingIOError):
+                        self.wake_recv.recv(4096)
+                    continue
+                self._take(key.fileobj)
+                self.ready(key.data)
+            now = time.monotonic()
+            if now - last_sweep < 1.0:
+                continue
+            last_sweep = now
+            for key in list(self.selector.get_map().values()):
+                if key.data is not None and now - key.data[0].last_active > IDLE_TIMEOUT:
+                    self._take(key.fileobj)
+                    self.expired(key.data)
 
 def handle_client(conn, addr):
-    print(f"[+] Connected by {addr}")
+    """Opens a session for a newly accepted connection and serves it."""
+    logger.info("connected addr=%s", addr)
     ip = addr[0]
     current_time = time.time()
     if ip in last_request_times and current_time - last_request_times[ip] < 60:
@@ -387,26 +1635,131 @@ def handle_client(conn, addr):
         send_response(conn, b"429 Too Many Requests\n")
         conn.close()
         return
-    send_response(conn, b"220 Welcome Server Online\n")
-    client_state = {"name": None}
-    server_context = {
-        "fileDB": DBHandler(),
-        "userDB": UserHandler()
-    }
+    configure_socket(conn)
+    conn = SessionSocket(conn)
+    conn.write_timeout = WRITE_TIMEOUT
+    conn.read_timeout = READ_TIMEOUT
+    client_state = {"name": None, "session": next(session_ids), "addr": addr, "command": None}
+
+    with sessions_lock:
+        sessions[client_state["session"]] = (conn, client_state, time.monotonic())
+    metrics.session_opened()
+    serve_session((conn, client_state, SessionContext()), greet=True)
+
+def forgive_connection(ip):
+    """Takes one connection back off ip's rate-limit count. Sessions attached with
+    a valid token are a client's own pool, feed and reconnects, not new visitors."""
+    if request_counts.get(ip, 0) > 0:
+        request_counts[ip] -= 1
 
+def serve_session(session, greet=False):
+    """Runs a session's commands until it stays quiet for PARK_AFTER seconds, then
+    parks it so this worker can serve someone else. Ends the session on QUIT, a
+    disconnect, a timeout or a drain."""
+    conn, client_state, server_context = session
+    addr = client_state["addr"]
+    handed_off = False
     try:
-        while True:
-            data = conn.recv(1024).decode().strip()
+        if greet:
+            send_response(conn, b"220 Welcome Server Online\n")
+        while not draining.is_set():  # between commands; the client reconnects to the next server
+            if not wait_readable(conn, PARK_AFTER):
+                idle_sessions.park(session)
+                handed_off = True
+                return
+            raw = conn.recv(1024)
+            if not raw:
+                break
+            metrics.add_bytes_in(len(raw))
+            data = raw.decode().strip()
             if not data:
                 break
 
-            if run_command(conn, client_state, server_context, data) == "QUIT":
+            client_state["command"] = data.split(" ", 1)[0].upper()
+            result = run_command(conn, client_state, server_context, data)
+            if result == "DETACH":  # a change feed thread owns the session now
+                handed_off = True
+                return
+            client_state["command"] = None
+            if result == "QUIT":
                 break
+    except socket.timeout:
+        metrics.count("session_timeouts")
+        logger.info("timed out addr=%s user=%s command=%s", addr, client_state.get("name"),
+                    client_state["command"] or "-")
+    except ConnectionError as e:
+        logger.info("connection lost addr=%s user=%s command=%s error=%s", addr, client_state.get("name"),
+                    client_state["command"] or "-", e)
     finally:
-        conn.close()
-        server_context['fileDB'].close()
-        server_context['userDB'].close()
-        print(f"[-] {addr} disconnected")
+        if not handed_off:
+            end_session(session)
+
+def end_session(session):
+    conn, client_state, server_context = session
+    with sessions_lock:
+        sessions.pop(client_state["session"], None)
+    conn.close()
+    server_context.close()
+    metrics.session_closed()
+    logger.info("disconnected addr=%s user=%s", client_state["addr"], client_state.get("name"))
+
+def expire_session(session):
+    """Ends a parked session that sat idle for IDLE_TIMEOUT."""
+    client_state = session[1]
+    metrics.count("session_timeouts")
+    logger.info("timed out addr=%s user=%s command=-", client_state["addr"], client_state.get("name"))
+    end_session(session)
+
+idle_sessions = IdleSessions(lambda session: accept_queue.put(("resume", session, time.monotonic())),
+                             expire_session)
+metrics.register_gauge("sessions_parked", lambda: idle_sessions.count)
+
+def configure_socket(conn):
+    """Turns on TCP keepalive so peers that vanish without a FIN are noticed, and
+    TCP_NODELAY so a reply's body isn't held back behind its header's ACK."""
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                          ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):  # not every platform exposes the tuning knobs
+            conn.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+def wait_readable(conn, timeout):
+    """True once conn has data (or EOF) within timeout seconds. select.select()
+    can't watch descriptors numbered 1024 and up, which a busy server hands out."""
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(conn, select.POLLIN)
+        return bool(poller.poll(timeout * 1000))
+    return bool(select.select([conn], [], [], timeout)[0])  # Windows has no poll() and no such limit
+
+def close_session(session, reason):
+    """Shuts a session's socket down; its worker notices and cleans up."""
+    with sessions_lock:
+        entry = sessions.get(session)
+    if entry is None:
+        return False
+    session_conn, client_state, _ = entry
+    logger.info("closing session=%s user=%s reason=%s", session, client_state.get("name"), reason)
+    try:
+        session_conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # already gone
+    return True
+
+def reap_sessions():
+    """Backstop for the socket deadlines: closes sessions with no I/O for longer
+    than any healthy one could go (e.g. a peer that vanished mid-handler)."""
+    stale_after = IDLE_TIMEOUT + max(READ_TIMEOUT, WRITE_TIMEOUT) + REAPER_INTERVAL
+    while True:
+        time.sleep(REAPER_INTERVAL)
+        now = time.monotonic()
+        with sessions_lock:
+            stale = [session for session, (session_conn, _, _) in sessions.items()
+                     if now - session_conn.last_active > stale_after]
+        for session in stale:
+            if close_session(session, "stale"):
+                metrics.count("sessions_reaped")
 
 def cleanup_request_logs():
     while True:
@@ -418,18 +1771,166 @@ def cleanup_request_logs():
                 if ip in request_counts:
                     del request_counts[ip]
 
+def reject_connection(conn, addr, reason):
+    """Turns a connection away with 503 without tying up a worker."""
+    metrics.count("sessions_rejected")
+    logger.warning("rejected addr=%s reason=%s", addr, reason)
+    try:
+        conn.settimeout(1.0)
+        conn.sendall(b"503 Server busy, try again later.\n")
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+def session_worker():
+    """Serves queued connections one session at a time until told to stop (None)."""
+    while True:
+        item = accept_queue.get()
+        if item is None:
+            return
+        kind, payload, queued_at = item
+        if kind == "resume":  # a parked session sent its next command
+            try:
+                serve_session(payload)
+            except Exception:
+                logger.exception("session crashed addr=%s", payload[1]["addr"])
+            continue
+        conn, addr = payload
+        if time.monotonic() - queued_at > ACCEPT_QUEUE_TIMEOUT:
+            reject_connection(conn, addr, "queue timeout")
+            continue
+        try:
+            handle_client(conn, addr)
+        except Exception:
+            logger.exception("session crashed addr=%s", addr)
+
+def admit(conn, addr):
+    """Queues an accepted connection for a worker, or rejects it if the queue is full."""
+    if accept_queue.qsize() >= ACCEPT_QUEUE_SIZE:
+        reject_connection(conn, addr, "accept queue full")
+    else:
+        accept_queue.put(("connect", (conn, addr), time.monotonic()))
+
+def request_shutdown(signum=None, frame=None):
+    """SIGTERM: stop accepting and drain."""
+    shutdown_requested.set()
+
+def request_restart(signum=None, frame=None):
+    """SIGHUP: start a successor on the same listening socket, then drain."""
+    restart_requested.set()
+
+def inherited_listener():
+    """The listening socket handed over by a previous server (FILENET_LISTEN_FD)
+    or by systemd socket activation (LISTEN_FDS), or None to bind our own."""
+    fd = os.environ.pop("FILENET_LISTEN_FD", None)
+    if fd is None and os.environ.get("LISTEN_FDS", "0") != "0" \
+            and os.environ.get("LISTEN_PID", str(os.getpid())) == str(os.getpid()):
+        fd = 3  # SD_LISTEN_FDS_START
+    if fd is None:
+        return None
+    listener = socket.socket(fileno=int(fd))
+    listener.set_inheritable(False)
+    return listener
+
+def signal_ready():
+    """Tells the server that spawned us (if any) that we are accepting."""
+    fd = os.environ.pop("FILENET_READY_FD", None)
+    if fd is not None:
+        os.write(int(fd), b"1")
+        os.close(int(fd))
+
+def spawn_successor(listener):
+    """Starts a new server on the same listening socket and waits until it is
+    accepting. Returns False (and keeps this server serving) if it fails."""
+    ready_read, ready_write = os.pipe()
+    env = dict(os.environ, FILENET_LISTEN_FD=str(listener.fileno()), FILENET_READY_FD=str(ready_write),
+               FILENET_SESSION_SECRET=SESSION_SECRET.decode())  # so session tokens stay valid
+    env.pop("LISTEN_FDS", None)
+    try:
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env,
+                                 pass_fds=(listener.fileno(), ready_write))
+    except OSError:
+        logger.exception("could not start a successor")
+        return False
+    finally:
+        os.close(ready_write)
+    try:
+        ready = select.select([ready_read], [], [], HANDOFF_TIMEOUT)[0] and os.read(ready_read, 1) == b"1"
+    finally:
+        os.close(ready_read)
+    if not ready:
+        logger.error("successor pid=%d did not start; still serving", child.pid)
+        return False
+    logger.info("handed the listening socket to pid=%d", child.pid)
+    return True
+
+def drain(timeout=DRAIN_TIMEOUT):
+    """Closes sessions as they go idle, waiting up to timeout for running
+    commands (e.g. transfers) to finish, then cuts whatever is left."""
+    draining.set()
+    deadline = time.monotonic() + timeout
+    with sessions_lock:
+        logger.info("draining sessions=%d timeout=%s", len(sessions), timeout)
+    while time.monotonic() < deadline:
+        with sessions_lock:
+            idle = [session for session, (_, client_state, _) in sessions.items() if client_state["command"] is None]
+            if not sessions and accept_queue.empty():
+                break
+        for session in idle:
+            close_session(session, "draining")
+        time.sleep(0.2)
+    with sessions_lock:
+        remaining = list(sessions)
+    for session in remaining:
+        close_session(session, "drain timeout")
+    while sessions and time.monotonic() < deadline + READ_TIMEOUT:
+        time.sleep(0.05)  # give the cut sessions' workers a moment to unwind
+    for _ in range(MAX_SESSIONS):
+        accept_queue.put(None)
+    hash_executor.shutdown(wait=True)  # let queued manifest updates land
+    logger.info("drained; %d sessions were cut at the deadline", len(remaining))
+
 def main():
+    log_listener = setup_logging()
+    if threading.current_thread() is threading.main_thread():
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, toggle_profiling)
+        signal.signal(signal.SIGTERM, request_shutdown)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, request_restart)
     cleanup_thread = threading.Thread(target=cleanup_request_logs, daemon=True)
     cleanup_thread.start()
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    threading.Thread(target=reap_sessions, name="reaper", daemon=True).start()
+    threading.Thread(target=idle_sessions.run, name="parker", daemon=True).start()
+    if RECORD_AT_START:
+        start_recording(RECORD_AT_START)
+    if METRICS_HTTP_PORT:
+        metrics.serve_http(HOST, METRICS_HTTP_PORT)
+    s = inherited_listener()
+    if s is None:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.bind((HOST, PORT))
         s.listen()
-        print(f"[+] FTP-like server listening on {HOST}:{PORT}")
-        while True:
-            conn, addr = s.accept()
-            thread = threading.Thread(target=handle_client, args=(conn, addr))
-            thread.start()
-            print(f"[ACTIVECONNECTIONS] {threading.active_count() - 1}")
+    with s:
+        host, port = s.getsockname()[:2]
+        logger.info("listening host=%s port=%d sessions=%d queue=%d", host, port, MAX_SESSIONS, ACCEPT_QUEUE_SIZE)
+        for i in range(MAX_SESSIONS):
+            threading.Thread(target=session_worker, name=f"session-{i}", daemon=True).start()
+        signal_ready()
+        s.settimeout(ACCEPT_POLL_SECONDS)
+        while not shutdown_requested.is_set():
+            if restart_requested.is_set():
+                restart_requested.clear()
+                if spawn_successor(s):
+                    break
+            try:
+                conn, addr = s.accept()
+            except socket.timeout:
+                continue
+            admit(conn, addr)
+    drain()
+    log_listener.stop()
 
 if __name__ == "__main__":
     main()
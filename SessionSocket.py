@@ -0,0 +1,49 @@
+import socket
+import time
+
+
+class SessionSocket:
+    """Wraps a client socket to count bytes, remember the first reply status
+    of the current command and when data last moved. read_timeout and
+    write_timeout (seconds, None to block) bound each recv and each sendall.
+    Socket errors other than timeouts surface as ConnectionError, so callers can
+    tell a lost peer from a failing disk. Everything else is delegated to the
+    socket."""
+    __slots__ = ("sock", "bytes_in", "bytes_out", "status", "read_timeout", "write_timeout", "last_active")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.status = None
+        self.read_timeout = None
+        self.write_timeout = None
+        self.last_active = time.monotonic()
+
+    def sendall(self, data):
+        if self.status is None:
+            self.status = bytes(data[:3]).decode(errors="ignore")
+        try:
+            self.sock.settimeout(self.write_timeout)
+            self.sock.sendall(data)
+        except (socket.timeout, ConnectionError):
+            raise
+        except OSError as e:
+            raise ConnectionError(e) from e
+        self.bytes_out += len(data)
+        self.last_active = time.monotonic()
+
+    def recv(self, size, *args):
+        try:
+            self.sock.settimeout(self.read_timeout)
+            data = self.sock.recv(size, *args)
+        except (socket.timeout, ConnectionError):
+            raise
+        except OSError as e:
+            raise ConnectionError(e) from e
+        self.bytes_in += len(data)
+        self.last_active = time.monotonic()
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
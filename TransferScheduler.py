@@ -0,0 +1,115 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Byte budget refilled at rate per second up to burst.
+
+    reserve() always takes the bytes and returns how long the caller must wait
+    for the balance to be positive again, so concurrent senders queue up
+    behind each other in the order they asked.
+    """
+    def __init__(self, rate, burst=None):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, n):
+        with self.lock:
+            self._refill()
+            self.tokens -= n
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class TransferScheduler:
+    """Paces bulk file data so no single user or transfer can hog the uplink.
+
+    File bodies are sent in chunks. Each chunk is paced by the global bucket
+    (all bulk data) and by its user's bucket, whose rate is the user's fair
+    share: the smaller of user_rate and global_rate divided by the number of
+    users with a bulk transfer running. Replies under interactive_limit are
+    never paced, so LIST/GET of small files stay fast while bulk transfers
+    queue behind each other.
+    """
+    def __init__(self, global_rate=None, user_rate=None, chunk_size=64 * 1024, interactive_limit=64 * 1024):
+        self.global_rate = global_rate
+        self.user_rate = user_rate
+        self.chunk_size = chunk_size
+        self.interactive_limit = interactive_limit
+        self.lock = threading.Lock()
+        self.global_bucket = TokenBucket(global_rate, max(global_rate, chunk_size)) if global_rate else None
+        self.user_buckets = {}  # user -> TokenBucket
+        self.active = {}  # user -> bulk transfers in progress
+        self.throttled_seconds = 0.0
+
+    def active_transfers(self):
+        with self.lock:
+            return sum(self.active.values())
+
+    def _fair_rate(self):
+        rates = [rate for rate in (self.user_rate,
+                                   self.global_rate / max(1, len(self.active)) if self.global_rate else None)
+                 if rate]
+        return min(rates) if rates else None
+
+    def _rebalance(self):
+        rate = self._fair_rate()
+        for bucket in self.user_buckets.values():
+            bucket.set_rate(rate)
+
+    def _begin(self, user):
+        with self.lock:
+            self.active[user] = self.active.get(user, 0) + 1
+            rate = self._fair_rate()
+            if rate and user not in self.user_buckets:
+                self.user_buckets[user] = TokenBucket(rate, max(rate, self.chunk_size))
+            if self.active[user] == 1:
+                self._rebalance()
+            return self.user_buckets.get(user)
+
+    def _end(self, user):
+        with self.lock:
+            self.active[user] -= 1
+            if not self.active[user]:
+                del self.active[user]
+                self.user_buckets.pop(user, None)
+                self._rebalance()
+
+    def send_file(self, conn, f, size, user):
+        """Send size bytes from the open file f to conn, paced unless it is small.
+        Returns the number of bytes sent, which is short only if the file shrank."""
+        if size <= self.interactive_limit:
+            data = f.read(size)
+            conn.sendall(data)
+            return len(data)
+        bucket = self._begin(user)
+        try:
+            remaining = size
+            while remaining > 0:
+                data = f.read(min(self.chunk_size, remaining))
+                if not data:
+                    break
+                wait = bucket.reserve(len(data)) if bucket else 0.0
+                if self.global_bucket:
+                    wait = max(wait, self.global_bucket.reserve(len(data)))
+                if wait > 0:
+                    with self.lock:
+                        self.throttled_seconds += wait
+                    time.sleep(wait)
+                conn.sendall(data)
+                remaining -= len(data)
+            return size - remaining
+        finally:
+            self._end(user)
@@ -1,13 +1,46 @@
 import hashlib
+import hmac
+import os
 from BaseDBHandler import BaseDBHandler
 
+# scrypt cost: 2**14 * 8 * 128 bytes = 16 MiB and tens of milliseconds per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
 class UserHandler(BaseDBHandler):
     def __init__(self, db_name="UserDB.sqlite"):
         super().__init__(db_name)
         self.create_tables()
 
     def hash_password(self, password: str) -> str:
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Salted scrypt hash of the credential clients send (the password's SHA-256)."""
+        salt = os.urandom(16)
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                maxmem=64 * 1024 * 1024, dklen=32)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+    def verify_password(self, password: str, stored: str):
+        """Checks a credential against a stored hash; returns (ok, new_hash).
+
+        new_hash is set when the stored hash is a legacy unsalted SHA-256 or
+        uses weaker scrypt settings, and should replace it.
+        """
+        if stored.startswith("scrypt$"):
+            try:
+                _, n, r, p, salt, expected = stored.split("$")
+                n, r, p = int(n), int(r), int(p)
+                digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=n, r=r, p=p,
+                                        maxmem=64 * 1024 * 1024, dklen=len(expected) // 2)
+            except ValueError:  # a damaged row matches nothing
+                return False, None
+            ok = hmac.compare_digest(digest.hex().encode(), expected.encode())
+            outdated = (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+            return ok, (self.hash_password(password) if ok and outdated else None)
+        # Legacy rows hold either the credential itself or its SHA-256
+        ok = hmac.compare_digest(stored.encode(), password.encode()) or \
+            hmac.compare_digest(stored.encode(), hashlib.sha256(password.encode()).hexdigest().encode())
+        return ok, (self.hash_password(password) if ok else None)
 
     def create_tables(self):
         self._execute("""
@@ -27,8 +60,12 @@ class UserHandler(BaseDBHandler):
     def delete_user(self, username):
         self._execute("DELETE FROM users WHERE username = ?", (username,))
         
+    def set_password_hash(self, username, hashed_password):
+        self._execute("UPDATE users SET hashed_password = ? WHERE username = ?", (hashed_password, username))
+
     def update_password(self, username, new_password):
-        new_hashed_password = self.hash_password(new_password)
+        """Sets a user's plain-text password (stored as the hash of what clients will send)."""
+        new_hashed_password = self.hash_password(hashlib.sha256(new_password.encode()).hexdigest())
         self._execute("UPDATE users SET hashed_password = ? WHERE username = ?", (new_hashed_password, username))
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import unittest
+
+from ManifestHandler import ManifestHandler
+
+
+class ManifestHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.db = ManifestHandler(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_set_and_get_hash(self):
+        self.db.set_hash("repo/a.txt", 3, 100, "aa")
+        self.assertEqual(self.db.get_hash("repo/a.txt"), (3, 100, "aa"))
+        self.db.set_hash("repo/a.txt", 4, 200, "bb")
+        self.assertEqual(self.db.get_hash("repo/a.txt"), (4, 200, "bb"))
+        self.assertIsNone(self.db.get_hash("repo/missing.txt"))
+
+    def test_get_hashes_only_returns_the_prefix(self):
+        for path in ("repo/a.txt", "repo/sub/b.txt", "repo0/c.txt", "repo-x/d.txt", "repo"):
+            self.db.set_hash(path, 1, 1, path)
+        self.assertEqual(sorted(self.db.get_hashes("repo")), ["repo/a.txt", "repo/sub/b.txt"])
+        self.assertEqual(sorted(self.db.get_hashes("repo/sub")), ["repo/sub/b.txt"])
+
+    def test_delete_hash(self):
+        self.db.set_hash("repo/a.txt", 1, 1, "aa")
+        self.db.delete_hash("repo/a.txt")
+        self.assertIsNone(self.db.get_hash("repo/a.txt"))
+
+
+    def test_move_prefix_rekeys_the_subtree_only(self):
+        for path in ("repo/dir", "repo/dir/a.txt", "repo/dir/sub/b.txt", "repo/dir0/c.txt", "repo/dir-x.txt"):
+            self.db.set_hash(path, 1, 1, path)
+        self.db.move_prefix("repo/dir", "repo/moved")
+        self.assertEqual(sorted(self.db.get_hashes("repo")),
+                         ["repo/dir-x.txt", "repo/dir0/c.txt", "repo/moved", "repo/moved/a.txt", "repo/moved/sub/b.txt"])
+        self.assertEqual(self.db.get_hash("repo/moved"), (1, 1, "repo/dir"))
+        self.assertEqual(self.db.get_hash("repo/moved/sub/b.txt"), (1, 1, "repo/dir/sub/b.txt"))
+        self.assertIsNone(self.db.get_hash("repo/dir/a.txt"))
+
+    def test_move_prefix_replaces_existing_entries(self):
+        self.db.set_hash("repo/a.txt", 1, 1, "old")
+        self.db.set_hash("repo/b.txt", 2, 2, "stale")
+        self.db.move_prefix("repo/a.txt", "repo/b.txt")
+        self.assertEqual(self.db.get_hash("repo/b.txt"), (1, 1, "old"))
+        self.assertIsNone(self.db.get_hash("repo/a.txt"))
+
+    def test_copy_prefix_keeps_the_originals(self):
+        for path in ("repo/dir/a.txt", "repo/dir/sub/b.txt", "repo/dir0/c.txt"):
+            self.db.set_hash(path, 1, 1, path)
+        self.db.copy_prefix("repo/dir", "other/dir")
+        self.assertEqual(sorted(self.db.get_hashes("repo")),
+                         ["repo/dir/a.txt", "repo/dir/sub/b.txt", "repo/dir0/c.txt"])
+        self.assertEqual(sorted(self.db.get_hashes("other")), ["other/dir/a.txt", "other/dir/sub/b.txt"])
+        self.assertEqual(self.db.get_hash("other/dir/a.txt"), (1, 1, "repo/dir/a.txt"))
+
+    def test_delete_prefix(self):
+        for path in ("repo/dir", "repo/dir/a.txt", "repo/dir/sub/b.txt", "repo/dir0/c.txt"):
+            self.db.set_hash(path, 1, 1, path)
+        self.db.delete_prefix("repo/dir")
+        self.assertEqual(sorted(self.db.get_hashes("repo")), ["repo/dir0/c.txt"])
+        self.assertIsNone(self.db.get_hash("repo/dir"))
+
+
+if __name__ == "__main__":
+    unittest.main()
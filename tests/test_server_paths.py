@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+Server = None
+
+
+def setUpModule():
+    # Importing Server creates ftp_root in the working directory
+    global Server
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            import Server
+        finally:
+            os.chdir(cwd)
+
+
+class ResolvePathTest(unittest.TestCase):
+    repos = {"repo", "shared"}
+
+    def test_normalizes_separators_and_dots(self):
+        self.assertEqual(Server.resolve_path("repo\\dir//./a.txt", self.repos),
+                         ("repo/dir/a.txt", os.path.join(Server.BASE_DIR, "repo", "dir", "a.txt")))
+        self.assertEqual(Server.resolve_path("/repo/", self.repos), ("repo", os.path.join(Server.BASE_DIR, "repo")))
+
+    def test_rejects_parent_components(self):
+        for path in ("repo/../shared/a.txt", "repo/..", "..", "../repo/a.txt", "repo\\..\\..\\etc\\passwd"):
+            self.assertIsNone(Server.resolve_path(path, self.repos), path)
+
+    def test_rejects_other_repositories(self):
+        for path in ("secret/a.txt", "repos/a.txt", "rep/a.txt"):
+            self.assertIsNone(Server.resolve_path(path, self.repos), path)
+
+    def test_rejects_empty_paths(self):
+        for path in ("", "/", ".", "./"):
+            self.assertIsNone(Server.resolve_path(path, self.repos), repr(path))
+
+    def test_rejects_drive_letters(self):
+        if not os.path.splitdrive("C:x")[0]:
+            self.skipTest("drive letters only mean something on Windows")
+        self.assertIsNone(Server.resolve_path("repo/C:x", self.repos))
+
+
+if __name__ == "__main__":
+    unittest.main()
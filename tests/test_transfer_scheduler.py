@@ -0,0 +1,105 @@
+import io
+import unittest
+from unittest import mock
+
+from TransferScheduler import TokenBucket, TransferScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        self.sent.append(len(data))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("TransferScheduler.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reserve_within_burst_does_not_wait(self):
+        bucket = TokenBucket(100, 200)
+        self.assertEqual(bucket.reserve(150), 0.0)
+        self.assertEqual(bucket.reserve(50), 0.0)
+
+    def test_reserve_past_burst_waits_for_the_deficit(self):
+        bucket = TokenBucket(100, 200)
+        bucket.reserve(200)
+        self.assertAlmostEqual(bucket.reserve(50), 0.5)
+        # The next caller queues behind the first one's debt
+        self.assertAlmostEqual(bucket.reserve(50), 1.0)
+
+    def test_refill_is_capped_at_burst(self):
+        bucket = TokenBucket(100, 200)
+        bucket.reserve(200)
+        self.clock.now += 1
+        self.assertEqual(bucket.reserve(100), 0.0)
+        self.clock.now += 60
+        self.assertEqual(bucket.reserve(200), 0.0)
+        self.assertAlmostEqual(bucket.reserve(100), 1.0)
+
+
+class TransferSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleeps = []
+        for target, fake in (("TransferScheduler.time.monotonic", self.clock),
+                             ("TransferScheduler.time.sleep", self.sleeps.append)):
+            patcher = mock.patch(target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_global_rate_is_shared_fairly(self):
+        scheduler = TransferScheduler(global_rate=1000, user_rate=800, chunk_size=10)
+        alice = scheduler._begin("alice")
+        self.assertEqual(alice.rate, 800)
+        bob = scheduler._begin("bob")
+        self.assertEqual((alice.rate, bob.rate), (500, 500))
+        # A second transfer by the same user doesn't grow their share
+        self.assertIs(scheduler._begin("bob"), bob)
+        self.assertEqual((alice.rate, bob.rate), (500, 500))
+        self.assertEqual(scheduler.active_transfers(), 3)
+        scheduler._end("bob")
+        scheduler._end("bob")
+        self.assertEqual(alice.rate, 800)
+        self.assertNotIn("bob", scheduler.user_buckets)
+        scheduler._end("alice")
+        self.assertEqual(scheduler.active_transfers(), 0)
+
+    def test_small_replies_are_not_paced(self):
+        scheduler = TransferScheduler(global_rate=10, chunk_size=10, interactive_limit=100)
+        conn = FakeConn()
+        self.assertEqual(scheduler.send_file(conn, io.BytesIO(b"x" * 100), 100, "alice"), 100)
+        self.assertEqual(conn.sent, [100])
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(scheduler.active_transfers(), 0)
+
+    def test_bulk_transfer_is_paced_and_counted(self):
+        scheduler = TransferScheduler(user_rate=100, chunk_size=100, interactive_limit=0)
+        conn = FakeConn()
+        self.assertEqual(scheduler.send_file(conn, io.BytesIO(b"x" * 300), 300, "alice"), 300)
+        self.assertEqual(conn.sent, [100, 100, 100])
+        # The clock never moves, so every chunk after the burst waits one more second
+        self.assertEqual(self.sleeps, [1.0, 2.0])
+        self.assertAlmostEqual(scheduler.throttled_seconds, 3.0)
+        self.assertEqual(scheduler.active_transfers(), 0)
+
+    def test_short_file_returns_bytes_sent(self):
+        scheduler = TransferScheduler(user_rate=1000, chunk_size=100, interactive_limit=0)
+        self.assertEqual(scheduler.send_file(FakeConn(), io.BytesIO(b"x" * 150), 300, "alice"), 150)
+        self.assertEqual(scheduler.active_transfers(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import hashlib
+import unittest
+
+import UserHandler as user_handler
+from UserHandler import UserHandler
+
+
+class VerifyPasswordTest(unittest.TestCase):
+    credential = hashlib.sha256(b"secret").hexdigest()  # what clients send
+
+    def setUp(self):
+        self.db = UserHandler(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_scrypt_hash_is_salted(self):
+        first, second = self.db.hash_password(self.credential), self.db.hash_password(self.credential)
+        self.assertTrue(first.startswith("scrypt$"))
+        self.assertNotEqual(first, second)
+
+    def test_current_hash(self):
+        stored = self.db.hash_password(self.credential)
+        self.assertEqual(self.db.verify_password(self.credential, stored), (True, None))
+        self.assertEqual(self.db.verify_password("wrong", stored), (False, None))
+
+    def test_weaker_scrypt_settings_are_upgraded(self):
+        n = user_handler.SCRYPT_N
+        user_handler.SCRYPT_N = 2 ** 10
+        try:
+            stored = self.db.hash_password(self.credential)
+        finally:
+            user_handler.SCRYPT_N = n
+        ok, new_hash = self.db.verify_password(self.credential, stored)
+        self.assertTrue(ok)
+        self.assertTrue(new_hash.startswith(f"scrypt${n}$"))
+        self.assertEqual(self.db.verify_password(self.credential, new_hash), (True, None))
+        self.assertEqual(self.db.verify_password("wrong", stored), (False, None))
+
+    def test_legacy_sha256_hash(self):
+        stored = hashlib.sha256(self.credential.encode()).hexdigest()
+        ok, new_hash = self.db.verify_password(self.credential, stored)
+        self.assertTrue(ok)
+        self.assertEqual(self.db.verify_password(self.credential, new_hash), (True, None))
+        self.assertEqual(self.db.verify_password("wrong", stored), (False, None))
+
+    def test_legacy_plain_credential(self):
+        ok, new_hash = self.db.verify_password(self.credential, self.credential)
+        self.assertTrue(ok)
+        self.assertTrue(new_hash.startswith("scrypt$"))
+        self.assertEqual(self.db.verify_password("wrong", self.credential), (False, None))
+
+    def test_non_ascii_password_against_legacy_rows(self):
+        stored = hashlib.sha256("é".encode()).hexdigest()
+        ok, new_hash = self.db.verify_password("é", stored)
+        self.assertTrue(ok)
+        self.assertEqual(self.db.verify_password("é", new_hash), (True, None))
+        self.assertEqual(self.db.verify_password("è", stored), (False, None))
+        self.assertEqual(self.db.verify_password("é", self.credential), (False, None))
+
+    def test_malformed_scrypt_row_matches_nothing(self):
+        for stored in ("scrypt$", "scrypt$16384$8$1$salt", "scrypt$x$8$1$00$aa", "scrypt$16384$8$1$zz$aa",
+                       "scrypt$16384$8$1$00$", "scrypt$3$8$1$00$aabb"):
+            self.assertEqual(self.db.verify_password(self.credential, stored), (False, None), stored)
+            self.assertEqual(self.db.verify_password("é", stored), (False, None), stored)
+
+    def test_upgraded_hash_is_stored(self):
+        self.db._execute("INSERT INTO users (username, hashed_password) VALUES (?, ?)",
+                         ("alice", hashlib.sha256(self.credential.encode()).hexdigest()))
+        ok, new_hash = self.db.verify_password(self.credential, self.db.get_user("alice")[1])
+        self.db.set_password_hash("alice", new_hash)
+        self.assertEqual(self.db.verify_password(self.credential, self.db.get_user("alice")[1]), (True, None))
+
+
+if __name__ == "__main__":
+    unittest.main()